@@ -18,6 +18,7 @@ from schemas.auth import OTPVerificationRequest
 from models.user import User
 import logging
 from services.AuthHandler import AuthHandler
+from services.principal_cache import principal_cache
 
 
 
@@ -68,6 +69,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     """Get current authenticated user."""
     return AuthHandler.get_current_user(db, token)
 
+# Hit rate, size and evictions of the cache behind get_current_user
+@router.get("/principal-cache/stats")
+def get_principal_cache_stats(current_user: User = Depends(get_current_user)):
+    return principal_cache.stats()
+
 @router.post("/verify-otp/")
 async def verify_otp(request: OTPVerificationRequest, db: Session = Depends(get_db)):
     """Verify user's email with OTP."""
@@ -1,11 +1,11 @@
 # routers/chat_router.py
 
-from fastapi import APIRouter, Depends, WebSocket, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, WebSocket, UploadFile, File, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List
 from core.dependencies import get_db
 from api.v1.endpoints.auth import get_current_user
-from services.chat_service import fetch_conversations, fetch_chat_history
+from services.chat_service import fetch_conversations, fetch_chat_history, CHAT_HISTORY_PAGE_SIZE
 from services.websocket_service import connect_socket, disconnect_socket, handle_chat_message
 from services.upload_service import validate_and_upload
 import json
@@ -21,25 +21,39 @@ from fastapi.websockets import WebSocketDisconnect
 router = APIRouter()
 
 @router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = Depends(get_db)):
+async def websocket_endpoint(websocket: WebSocket, user_id: int):
+    # No DB session here: messages are persisted by the write-behind batcher
     await connect_socket(websocket, user_id)
     try:
         while True:
             data = await websocket.receive_json()
-            await handle_chat_message(db, user_id, data)
+            await handle_chat_message(user_id, data)
     except WebSocketDisconnect:
-        await disconnect_socket(user_id)
+        await disconnect_socket(user_id, websocket)
     except Exception as e:
-        await disconnect_socket(user_id)
+        await disconnect_socket(user_id, websocket)
         raise e
 
 @router.get("/chat/conversations", response_model=List[ConversationOut])
-async def get_conversations(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    return await fetch_conversations(db, current_user.id)
+async def get_conversations(
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    # Without a limit every conversation is returned, as before
+    return await fetch_conversations(db, current_user.id, limit=limit, offset=offset)
 
 @router.get("/chat/history/{friend_id}", response_model=List[MessageOut])
-async def get_chat_history(friend_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    return await fetch_chat_history(db, current_user.id, friend_id)
+async def get_chat_history(
+    friend_id: int,
+    before: Optional[int] = Query(None, description="Page back: messages with ids below this one"),
+    after: Optional[int] = Query(None, description="Sync: messages that arrived after this id"),
+    limit: int = Query(CHAT_HISTORY_PAGE_SIZE, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    return await fetch_chat_history(db, current_user.id, friend_id, before=before, after=after, limit=limit)
 
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
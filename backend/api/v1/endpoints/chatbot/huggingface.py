@@ -1,4 +1,7 @@
+import asyncio
+import logging
 import os
+from typing import Iterable, Optional
 import google.generativeai as genai
 from dotenv import load_dotenv
 load_dotenv()
@@ -13,13 +16,19 @@ from schemas.huggingface import PromptRequest, PromptResponse, BotResponse
 from core.dependencies import get_db
 from api.v1.endpoints.auth import get_current_user  # Authentication dependency
 from models.user import User  # ✅ Correct model import
+from models.chatbot_session import ChatbotSession
+from services.blob_store import hash_source
+from services.vector_store import VectorRetriever, vector_store
+from services.embedding_service import embedding_service
+from services.pdf_extraction import ExtractionProgress, PdfExtractionError, pdf_extractor, spool_to_tempfile
+from services.chat_session_store import chat_session_store
+from services.llm_client import create_llm_client, record_turn
+from services.response_cache import response_cache, response_key
 from sqlalchemy.orm import Session
 from langchain_huggingface import HuggingFaceEndpoint
 from huggingface_hub import InferenceClient
 from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.chains import ConversationalRetrievalChain
 from langchain_community.llms import HuggingFaceHub
 from langchain.memory import ConversationBufferMemory
@@ -28,36 +37,66 @@ import re
 from langchain_ollama import OllamaEmbeddings
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
 
-gemini_model = genai.GenerativeModel("gemini-2.0-flash")
+# Gemini, or a local stub with LLM_BACKEND=stub (same generate_content / start_chat interface)
+gemini_model = create_llm_client()
 
+# Per-worker cache: user_id -> chat_session and retriever, bounded by count, idle time and memory
+# (chatbot_sessions is the shared record)
+user_sessions = chat_session_store
 
-import fitz  # PyMuPDF
-
-# Global store: user_id -> chat_session and retriever
-user_sessions = {}
+# user_id -> ExtractionProgress of the PDF this worker is indexing for them; removed when it finishes
+upload_progress = {}
 
 # -------------------- Helpers --------------------
 
-def extract_text_from_pdf(file: UploadFile):
-    doc = fitz.open(stream=file.file.read(), filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
-
-def create_retriever(text: str):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    docs = splitter.create_documents([text])
-
-    embeddings = HuggingFaceEmbeddings(
-        model_name="BAAI/bge-small-en",
-        model_kwargs={"device": "cpu"}
-    )
-
-    db = FAISS.from_documents(docs, embeddings)
-    retriever = db.as_retriever()
-    return retriever
+def get_embeddings():
+    # Shared model, loaded once per process; chunks from concurrent uploads are embedded in common batches
+    return embedding_service
+
+def get_splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+
+def create_retriever(chunks: Iterable[str], content_hash: str):
+    """Embed `chunks` into the stored index for `content_hash`; blocking, so run it off the event loop."""
+    embeddings = get_embeddings()
+    index = vector_store.build(content_hash, chunks, embeddings)
+    return VectorRetriever(index, embeddings)
+
+def open_retriever(content_hash: str):
+    """The stored index for an already-uploaded PDF, or None."""
+    index = vector_store.open(content_hash)
+    return VectorRetriever(index, get_embeddings()) if index is not None else None
+
+def save_chatbot_session(db: Session, user_id: int, content_hash: str) -> None:
+    session = db.query(ChatbotSession).filter(ChatbotSession.user_id == user_id).first()
+    if session:
+        session.document_hash = content_hash
+    else:
+        db.add(ChatbotSession(user_id=user_id, document_hash=content_hash))
+    db.commit()
+
+def restore_chatbot_session(db: Session, user_id: int, record: Optional[ChatbotSession] = None):
+    """Rebuild a session started on another worker (or before a restart) from its stored index."""
+    record = record or db.query(ChatbotSession).filter(ChatbotSession.user_id == user_id).first()
+    if record is None:
+        return None
+    retriever = open_retriever(record.document_hash)
+    if retriever is None:
+        return None
+    # Pick up the conversation where it left off if this worker (or another) evicted it
+    history = user_sessions.take_history(user_id, record.document_hash)
+    chat = gemini_model.start_chat(history=history)
+    return user_sessions.put(user_id, {"chat": chat, "retriever": retriever}, record.document_hash)
+
+def get_chatbot_session(db: Session, user_id: int):
+    """The session for the PDF the user uploaded last, on whichever worker, or None."""
+    record = db.query(ChatbotSession).filter(ChatbotSession.user_id == user_id).first()
+    if record is None:
+        user_sessions.discard(user_id)
+        return None
+    return user_sessions.get(user_id, record.document_hash) or restore_chatbot_session(db, user_id, record)
 
 def remove_duplicate_qa(text):
     # Keep only the last Helpful Answer
@@ -68,17 +107,63 @@ def remove_duplicate_qa(text):
 
 # -------------------- Endpoints --------------------
 
+# Pages read and chunks embedded so far for the caller's PDF upload
+@router.get("/upload_pdf/progress")
+def get_upload_progress(current_user: User = Depends(get_current_user)):
+    progress = upload_progress.get(current_user.id)
+    return progress.to_dict() if progress else {"status": "idle"}
+
+# Live chatbot sessions on this worker and the memory they account for
+@router.get("/sessions/stats")
+def get_session_stats(current_user: User = Depends(get_current_user)):
+    return user_sessions.stats()
+
+# Hits, misses and coalesced requests of the chatbot answer cache
+@router.get("/cache/stats")
+def get_response_cache_stats(current_user: User = Depends(get_current_user)):
+    return response_cache.stats()
+
+# Batch sizes, throughput and latency of the shared embedding model
+@router.get("/embeddings/stats")
+def get_embedding_stats(current_user: User = Depends(get_current_user)):
+    return embedding_service.stats()
+
 @router.post("/upload_pdf/", response_model=BotResponse)
-async def upload_pdf(file: UploadFile, current_user: User = Depends(get_current_user)):
-    text = extract_text_from_pdf(file)
-    retriever = create_retriever(text)
+async def upload_pdf(
+    file: UploadFile,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # A PDF indexed before (by anyone) is reused as is: no extraction, no embedding
+    content_hash, _ = await hash_source(file)
+    retriever = open_retriever(content_hash)
+    if retriever is None:
+        progress = upload_progress[current_user.id] = ExtractionProgress()
+        path = await spool_to_tempfile(file)
+        try:
+            # Pages are extracted in worker processes and embedded as they arrive, all off the event loop
+            chunks = pdf_extractor.iter_chunks(path, get_splitter(), progress)
+            retriever = await asyncio.to_thread(create_retriever, chunks, content_hash)
+        except PdfExtractionError as e:
+            logger.info("Rejected PDF %s from user %s: %s", content_hash, current_user.id, e)
+            raise HTTPException(status_code=422, detail="Could not read the PDF")
+        except Exception:
+            # Embedding, index or pool failures are ours, not the user's: a 500, logged
+            logger.exception("Indexing PDF %s for user %s failed", content_hash, current_user.id)
+            raise
+        finally:
+            os.remove(path)
+            if upload_progress.get(current_user.id) is progress:
+                del upload_progress[current_user.id]
+    save_chatbot_session(db, current_user.id, content_hash)
 
     # Start chat session for user
     chat = gemini_model.start_chat(history=[])
-    user_sessions[current_user.id] = {
+    user_sessions.discard_history(current_user.id)
+    user_sessions.put(current_user.id, {
         "chat": chat,
         "retriever": retriever
-    }
+    }, content_hash)
 
     return {"response": "PDF uploaded and AI expert is ready to help you."}
 
@@ -93,12 +178,15 @@ def api_response(
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    session = user_sessions.get(current_user.id)
+    session = get_chatbot_session(db, current_user.id)
 
     if session is None:
-        # No uploaded PDF, so just ask Gemini directly
-        response = gemini_model.generate_content(req)
-        return {"response": response.text.strip()}
+        # No uploaded PDF, so just ask Gemini directly (once per question, while cached)
+        answer, _ = response_cache.get_or_compute(
+            response_key(req),
+            lambda: gemini_model.generate_content(req).text.strip()
+        )
+        return {"response": answer}
 
     # Retrieve related documents from FAISS
     retriever = session["retriever"]
@@ -112,7 +200,17 @@ def api_response(
 ---
 Now answer this question: {req}"""
 
-    # Use the existing chat session for context-aware responses
     chat = session["chat"]
-    response = chat.send_message(full_prompt)
-    return {"response": response.text.strip()}
\ No newline at end of file
+    if chat.history:
+        # A follow-up depends on this user's conversation, so it is never answered from (or into) the cache
+        answer = chat.send_message(full_prompt).text.strip()
+    else:
+        # An opening question has no history to depend on: the same question about the same passages
+        # gets the same stateless answer for everyone, which then starts this user's chat
+        answer, _ = response_cache.get_or_compute(
+            response_key(req, context),
+            lambda: gemini_model.generate_content(full_prompt).text.strip()
+        )
+        record_turn(chat, full_prompt, answer)
+    user_sessions.account_turn(current_user.id, full_prompt, answer)
+    return {"response": answer}
\ No newline at end of file
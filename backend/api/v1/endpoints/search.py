@@ -4,27 +4,43 @@ from typing import List, Dict, Any
 from core.dependencies import get_db
 from models.user import User
 from api.v1.endpoints.auth import get_current_user
-from services.SearchHandler import SearchHandler
+from services.SearchHandler import SearchHandler, DEFAULT_PAGE_SIZE
+from services.suggestion_index import suggestion_index, DEFAULT_SUGGESTION_LIMIT, MAX_SUGGESTIONS
 
 router = APIRouter()
 
 @router.get("/search")
 def search_posts_by_keyword(
     keyword: str = Query(..., min_length=1, title="Search Keyword"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Search for posts by keyword in content or username."""
-    posts = SearchHandler.search_posts(db, keyword)
-    return {"posts": posts}
+    """Search for posts by keyword in content or username, best matches first."""
+    posts = SearchHandler.search_posts(db, keyword, limit, offset)
+    return {"posts": posts, "next_offset": offset + len(posts) if len(posts) == limit else None}
 
 
 
 @router.get("/search/all")
 def search_all_by_keyword(
     keyword: str = Query(..., min_length=1, title="Search Keyword"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Search across all searchable entities (posts and users)."""
-    return SearchHandler.search_all(db, keyword)
\ No newline at end of file
+    """Search posts, users, papers, collaborations and universities; `limit` applies to each."""
+    return SearchHandler.search_all(db, keyword, limit, offset)
+
+
+@router.get("/suggest")
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100, title="Typed prefix"),
+    limit: int = Query(DEFAULT_SUGGESTION_LIMIT, ge=1, le=MAX_SUGGESTIONS),
+    current_user: User = Depends(get_current_user)
+):
+    """Typeahead: usernames, hashtags and universities starting with `q`, answered from memory."""
+    suggestion_index.ensure_loaded()
+    return suggestion_index.suggest(q, limit)
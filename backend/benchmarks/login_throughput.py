@@ -0,0 +1,71 @@
+"""
+Benchmark: concurrent password verification, on the event loop vs the bcrypt process pool.
+
+Run from the backend directory:
+
+    python -m benchmarks.login_throughput
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=4 python -m benchmarks.login_throughput
+
+Starts LOGINS concurrent verifications of one bcrypt hash, first with the
+old inline `verify_password` call and then through
+core.password_hasher, and reports logins per second together with the
+longest time the event loop was blocked (what every other request on the
+worker would have waited).
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from core.security import BCRYPT_ROUNDS, hash_password, verify_password
+from core.password_hasher import password_hasher
+
+LOGINS = 64
+
+
+async def _loop_lag(stop):
+    # Longest gap between ticks of a 1 ms timer = longest time the loop was blocked
+    worst = 0.0
+    while not stop.is_set():
+        before = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - before - 0.001)
+    return worst
+
+async def _inline(hashed):
+    async def login():
+        verify_password("password", hashed)
+    await asyncio.gather(*(login() for _ in range(LOGINS)))
+
+async def _pooled(hashed):
+    await asyncio.gather(*(password_hasher.verify("password", hashed) for _ in range(LOGINS)))
+
+async def _measure(run, hashed):
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await run(hashed)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await lag
+
+async def main():
+    hashed = hash_password("password")
+    password_hasher.max_pending = max(password_hasher.max_pending, LOGINS)
+    await password_hasher.verify("password", hashed)  # Start the worker processes outside the timing
+
+    print(f"{LOGINS} concurrent logins, bcrypt cost {BCRYPT_ROUNDS}, {password_hasher.workers} hash workers")
+    print(f"{'mode':>8} {'logins/s':>9} {'max block':>10}")
+    for name, run in [("inline", _inline), ("pool", _pooled)]:
+        elapsed, lag = await _measure(run, hashed)
+        print(f"{name:>8} {LOGINS / elapsed:>9.1f} {lag * 1000:>8.0f}ms")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark: /search/suggest lookup latency against the in-memory prefix index.
+
+Run from the backend directory:
+
+    python -m benchmarks.suggest_latency
+
+Loads USERS usernames, HASHTAGS weighted hashtags and UNIVERSITIES
+universities into services.suggestion_index.SuggestionIndex (no database
+involved) and times `suggest` for random 1-4 character prefixes, the
+first lookup of each wide prefix included. Also reports how long a
+rebuild of the structure takes and the cost of an incremental update.
+"""
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from services.suggestion_index import PrefixIndex, SuggestionIndex
+
+USERS = 100_000
+HASHTAGS = 10_000
+UNIVERSITIES = 500
+QUERIES = 20_000
+
+
+def _word(rng, low, high):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+def _hashtag_names():
+    return [f"{string.ascii_lowercase[i % 26]}tag{i}" for i in range(HASHTAGS)]
+
+def _index(rng):
+    index = SuggestionIndex(session_factory=None)
+    users, hashtags, universities = PrefixIndex(), PrefixIndex(), PrefixIndex()
+    start = time.perf_counter()
+    users.load([(i, f"{_word(rng, 3, 8)}{i}", 0, {"id": i}) for i in range(USERS)])
+    hashtags.load([(name, name, rng.randint(0, 10_000), {"name": name}) for name in _hashtag_names()])
+    universities.load([(i, _word(rng, 4, 20), rng.randint(1, 5000), {"id": i}) for i in range(UNIVERSITIES)])
+    build = time.perf_counter() - start
+    index._users, index._hashtags, index._universities = users, hashtags, universities
+    index._loaded_at = time.monotonic()
+    return index, build
+
+def main():
+    rng = random.Random(7)
+    index, build = _index(rng)
+    prefixes = [_word(rng, 1, 4) for _ in range(QUERIES)]
+
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, 10)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    # Usage counts only grow, as when posts are tagged
+    names = _hashtag_names()
+    start = time.perf_counter()
+    for i in range(1000):
+        index.set_hashtag(names[i], 10_000 + i)
+    update = (time.perf_counter() - start) / 1000
+
+    print(f"{USERS} users, {HASHTAGS} hashtags, {UNIVERSITIES} universities; build {build * 1000:.0f} ms")
+    print(f"{QUERIES} lookups: p50 {statistics.median(timings) * 1e6:.1f} us, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us, max {timings[-1] * 1e6:.1f} us")
+    print(f"incremental hashtag update: {update * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
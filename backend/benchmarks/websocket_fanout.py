@@ -0,0 +1,97 @@
+"""
+Benchmark: websocket delivery latency with 10k simulated sockets.
+
+Run from the backend directory:
+
+    python -m benchmarks.websocket_fanout
+
+Broadcasts to every connected user every BROADCAST_INTERVAL seconds and
+records, for each fast socket, the time from broadcast to its send_json
+call. A small share of the sockets are slow (each send takes
+SLOW_SEND_SECONDS). Compares the old sequential
+loop, where every send waits for the one before it, with the per-socket
+outbound queues in services.websocket_service.
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import services.websocket_service as websocket_service
+
+SOCKETS = 10_000
+SLOW_EVERY = 100  # 1% of sockets are slow consumers
+SLOW_SEND_SECONDS = 0.01
+BROADCASTS = 5
+BROADCAST_INTERVAL = 0.05
+
+
+class SimulatedSocket:
+    def __init__(self, slow, latencies):
+        self.slow = slow
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_json(self, message):
+        if self.slow:
+            await asyncio.sleep(SLOW_SEND_SECONDS)
+        else:
+            self.latencies.append(time.perf_counter() - message["sent_at"])
+
+
+def _sockets(latencies):
+    return {user_id: SimulatedSocket(user_id % SLOW_EVERY == 0, latencies) for user_id in range(SOCKETS)}
+
+async def _sequential(latencies):
+    # The pre-queue implementation: one socket per user, sends awaited in turn
+    sockets = _sockets(latencies)
+    start = time.perf_counter()
+    for _ in range(BROADCASTS):
+        message = {"type": "message", "sent_at": time.perf_counter()}
+        for user_id in range(SOCKETS):
+            await sockets[user_id].send_json(message)
+        await asyncio.sleep(BROADCAST_INTERVAL)
+    return time.perf_counter() - start
+
+async def _queued(latencies):
+    websocket_service.clients.clear()
+    connections = [
+        await websocket_service.connect_socket(socket, user_id)
+        for user_id, socket in _sockets(latencies).items()
+    ]
+    start = time.perf_counter()
+    for _ in range(BROADCASTS):
+        message = {"type": "message", "sent_at": time.perf_counter()}
+        await websocket_service.deliver_local_message({"user_ids": list(range(SOCKETS)), "message": message})
+        await asyncio.sleep(BROADCAST_INTERVAL)
+    await asyncio.gather(*(connection.drain() for connection in connections if not connection.websocket.slow))
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        connection.close()
+    return elapsed
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+def main():
+    print(f"{SOCKETS} sockets, {SOCKETS // SLOW_EVERY} slow ({SLOW_SEND_SECONDS * 1000:.0f} ms/send), {BROADCASTS} broadcasts")
+    print(f"{'mode':>10} {'total (s)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10}")
+    for name, run in [("sequential", _sequential), ("queued", _queued)]:
+        latencies = []
+        elapsed = asyncio.run(run(latencies))
+        ordered = sorted(latencies)
+        print(f"{name:>10} {elapsed:>10.3f} {_percentile(ordered, 0.5):>10.2f} "
+              f"{_percentile(ordered, 0.95):>10.2f} {ordered[-1] * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
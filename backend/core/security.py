@@ -1,3 +1,4 @@
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta, timezone
@@ -11,7 +12,12 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b")
+# Changing the cost rehashes each user's password at their next login (see verify_and_update_password)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__ident="2b", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# These block for the whole bcrypt computation; async code goes through core.password_hasher
 
 # Hash Password
 def hash_password(password: str):
@@ -21,6 +27,10 @@ def hash_password(password: str):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
+# Verify Password, and return a new hash if the stored one uses outdated settings
+def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 # Create JWT Token
 def create_access_token(data: dict):
     to_encode = data.copy()
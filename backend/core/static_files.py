@@ -0,0 +1,75 @@
+# core/static_files.py
+#serving of the local uploads/ directories: immutable caching, ETags, Range requests and zero-copy sends
+import os
+from typing import Optional
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Receive, Scope, Send
+
+# Uploaded files get a fresh random name and are never rewritten, so clients may cache them for good
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ZERO_COPY_SEND = "http.response.zerocopysend"
+
+
+class UploadedFileResponse(FileResponse):
+    """
+    FileResponse that hands the file descriptor to the server instead of
+    copying it through Python, when the ASGI server supports the
+    `http.response.zerocopysend` extension (sendfile(2) under the hood).
+
+    Other servers get starlette's regular chunked reads, with a larger
+    chunk size. ETag, Last-Modified and Range handling are starlette's.
+    """
+
+    chunk_size = 256 * 1024
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._zero_copy = ZERO_COPY_SEND in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_file(self, send: Send, offset: int, count: int) -> None:
+        file = await anyio.to_thread.run_sync(open, self.path, "rb")
+        try:
+            await send({"type": ZERO_COPY_SEND, "file": file, "offset": offset, "count": count, "more_body": False})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool) -> None:
+        if not self._zero_copy or send_header_only:
+            return await super()._handle_simple(send, send_header_only)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._send_file(send, 0, int(self.headers["content-length"]))
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if not self._zero_copy or send_header_only:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._send_file(send, start, end - start)
+
+
+class UploadsStaticFiles(StaticFiles):
+    """StaticFiles for directories of uploaded files, served with UploadedFileResponse."""
+
+    def __init__(self, *args, cache_control: Optional[str] = IMMUTABLE_CACHE_CONTROL, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = cache_control
+
+    def file_response(
+        self,
+        full_path: "os.PathLike[str] | str",
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        headers = {"cache-control": self.cache_control} if self.cache_control else None
+        response = UploadedFileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
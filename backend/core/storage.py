@@ -0,0 +1,140 @@
+# core/storage.py
+#where uploaded files are kept: Cloudinary and Supabase Storage, or the local uploads/ directories
+import asyncio
+import mimetypes
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Optional
+import cloudinary
+from dotenv import load_dotenv
+from core.upload_pipeline import UploadPipeline, iter_chunks, rewind, upload_pipeline
+load_dotenv()
+
+# remote: media on Cloudinary, documents on Supabase. local: both under UPLOAD_ROOT, served by main.py
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "remote").lower()
+UPLOAD_ROOT = os.getenv("UPLOAD_ROOT", "uploads")
+SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "noobsquad")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", f"{os.getenv('VITE_API_URL', '')}/uploads")
+
+# Remote folder or section -> directory under UPLOAD_ROOT (each one mounted in main.py)
+LOCAL_FOLDERS = {
+    "noobsquad/media_uploads": "media",
+    "noobsquad/event_media_uploads": "event_images",
+    "noobsquad/profile_pictures": "profile_pictures",
+    "upload_documents": "document",
+    "research_papers": "research_papers",
+    "chat": "chat",
+}
+
+# {"url": ..., "public_id": ..., "resource_type": ...}
+StoredFile = Dict[str, Optional[str]]
+
+
+def guess_content_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+class Storage(ABC):
+    """A place uploaded files are written to and served from."""
+
+    name: str
+
+    @abstractmethod
+    async def save(self, source, folder: str, filename: str, content_type: str) -> StoredFile:
+        """Write `source` (an UploadFile or binary file) under `folder` and return where it is served from."""
+
+
+class CloudinaryStorage(Storage):
+    name = "cloudinary"
+
+    def __init__(self, pipeline: UploadPipeline = upload_pipeline):
+        self.pipeline = pipeline
+
+    async def save(self, source, folder: str, filename: str, content_type: str) -> StoredFile:
+        # Credentials are read at call time; utils.cloudinary configures them
+        config = cloudinary.config()
+        result = await self.pipeline.upload_to_cloudinary(
+            source, folder, cloud_name=config.cloud_name, api_key=config.api_key,
+            api_secret=config.api_secret, filename=filename
+        )
+        return {"url": result["secure_url"], "public_id": result["public_id"], "resource_type": result["resource_type"]}
+
+
+class SupabaseStorage(Storage):
+    name = "supabase"
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        bucket: str = SUPABASE_BUCKET,
+        pipeline: UploadPipeline = upload_pipeline
+    ):
+        self.url = url or os.getenv("SUPABASE_URL")
+        self.key = key or os.getenv("SUPABASE_KEY")
+        self.bucket = bucket
+        self.pipeline = pipeline
+
+    async def save(self, source, folder: str, filename: str, content_type: str) -> StoredFile:
+        url = await self.pipeline.upload_to_supabase(
+            source, f"{folder.strip('/')}/{filename}", content_type,
+            url=self.url, key=self.key, bucket=self.bucket
+        )
+        return {"url": url, "public_id": None, "resource_type": None}
+
+
+class LocalStorage(Storage):
+    """
+    Files on local disk under `root`, for self-hosted, offline and test setups.
+
+    Every file gets a fresh random name and is written to a temporary file
+    first, then renamed into place, so a URL always points at the same
+    complete bytes and can be cached as immutable.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = UPLOAD_ROOT, base_url: str = LOCAL_STORAGE_URL):
+        self.root = Path(root)
+        self.base_url = base_url.rstrip("/")
+
+    def directory(self, folder: str) -> str:
+        folder = folder.strip("/")
+        return LOCAL_FOLDERS.get(folder) or Path(folder).name or "media"
+
+    async def save(self, source, folder: str, filename: str, content_type: str) -> StoredFile:
+        directory = self.directory(folder)
+        name = f"{uuid.uuid4().hex}{Path(filename).suffix.lower()}"
+        path = self.root / directory / name
+        tmp_path = path.with_name(f".{name}.tmp")
+        await asyncio.to_thread(path.parent.mkdir, parents=True, exist_ok=True)
+        out = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in iter_chunks(source):
+                await asyncio.to_thread(out.write, chunk)
+        except BaseException:
+            out.close()
+            os.unlink(tmp_path)
+            raise
+        await asyncio.to_thread(out.close)
+        os.replace(tmp_path, path)
+        await rewind(source)
+        resource_type = content_type.split("/")[0] if content_type.startswith(("image/", "video/")) else "raw"
+        return {"url": f"{self.base_url}/{directory}/{name}", "public_id": None, "resource_type": resource_type}
+
+
+_remote_media = CloudinaryStorage()
+_remote_documents = SupabaseStorage()
+_local = LocalStorage()
+
+
+def media_storage() -> Storage:
+    """Where images and videos go (post media, event images, profile pictures)."""
+    return _local if STORAGE_BACKEND == "local" else _remote_media
+
+
+def document_storage() -> Storage:
+    """Where documents go (document posts, research papers, chat attachments)."""
+    return _local if STORAGE_BACKEND == "local" else _remote_documents
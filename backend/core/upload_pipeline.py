@@ -0,0 +1,207 @@
+# core/upload_pipeline.py
+#streaming uploads to Cloudinary and Supabase Storage, so a file upload never blocks the event loop
+import asyncio
+import inspect
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+import httpx
+from cloudinary.utils import api_sign_request
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def iter_chunks(source, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Read `source` one chunk at a time: an UploadFile (async read) or a plain
+    binary file object, whose blocking reads run on a worker thread.
+    """
+    read = source.read
+    blocking = not inspect.iscoroutinefunction(read)
+    while True:
+        chunk = await asyncio.to_thread(read, chunk_size) if blocking else await read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def remaining_size(source) -> Optional[int]:
+    """Bytes left to read in `source`, or None when it can't be seeked."""
+    file = getattr(source, "file", source)
+    try:
+        position = file.tell()
+        end = file.seek(0, os.SEEK_END)
+        file.seek(position)
+    except (AttributeError, OSError, TypeError, ValueError):
+        return None
+    return end - position if isinstance(end, int) and isinstance(position, int) else None
+
+
+async def rewind(source) -> None:
+    # So the caller can read the file again (UploadFile.seek is a coroutine)
+    seek = getattr(source, "seek", None)
+    if seek is None:
+        return
+    result = seek(0)
+    if inspect.isawaitable(result):
+        await result
+
+
+class UploadPipeline:
+    """
+    Streams request bodies to the storage backends with httpx.
+
+    Files are sent in `chunk_size` pieces as they are read, so only one
+    chunk per upload is ever in memory, and sockets are only awaited on the
+    event loop. Each backend (base URL) gets one AsyncClient whose
+    connection pool is reused across uploads, and at most `concurrency`
+    uploads run at once; the rest wait their turn rather than opening more
+    connections to the same host.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        chunk_size: int = CHUNK_SIZE,
+        timeout: float = 120.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_sent = 0
+
+    def _bind_loop(self) -> None:
+        # Clients and the semaphore belong to one event loop (tests run several)
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._clients = {}
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def _client(self, base_url: str) -> httpx.AsyncClient:
+        client = self._clients.get(base_url)
+        if client is None:
+            client = self._clients[base_url] = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                transport=self._transport
+            )
+        return client
+
+    async def _counted(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            self.bytes_sent += len(chunk)
+            yield chunk
+
+    async def _send(self, base_url: str, path: str, body: AsyncIterator[bytes], headers: Dict[str, str]) -> httpx.Response:
+        self._bind_loop()
+        async with self._semaphore:
+            self.active += 1
+            try:
+                response = await self._client(base_url).post(path, content=self._counted(body), headers=headers)
+                response.raise_for_status()
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.active -= 1
+        self.completed += 1
+        return response
+
+    async def upload_to_supabase(
+        self,
+        source,
+        destination_path: str,
+        content_type: str,
+        *,
+        url: str,
+        key: str,
+        bucket: str,
+        cache_control: str = "3600"
+    ) -> str:
+        """Stream `source` into a Supabase Storage bucket and return its public URL."""
+        headers = {
+            "Authorization": f"Bearer {key}",
+            "apikey": key,
+            "Content-Type": content_type,
+            "cache-control": f"max-age={cache_control}",
+            "x-upsert": "false"
+        }
+        size = remaining_size(source)
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        base_url = f"{url.rstrip('/')}/storage/v1"
+        await self._send(base_url, f"/object/{bucket}/{destination_path}", iter_chunks(source, self.chunk_size), headers)
+        await rewind(source)
+        return f"{base_url}/object/public/{bucket}/{destination_path}"
+
+    async def upload_to_cloudinary(
+        self,
+        source,
+        folder: str,
+        *,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        filename: str = "file",
+        api_base: str = "https://api.cloudinary.com"
+    ) -> Dict[str, Any]:
+        """Stream `source` to Cloudinary's signed upload API (resource_type auto) and return its JSON reply."""
+        params = {"folder": folder, "timestamp": str(int(time.time()))}
+        fields = {**params, "api_key": api_key, "signature": api_sign_request(params, api_secret)}
+
+        # multipart/form-data written by hand so the file part can be streamed
+        boundary = uuid.uuid4().hex
+        preamble = "".join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in fields.items()
+        ) + (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        )
+        preamble, epilogue = preamble.encode(), f"\r\n--{boundary}--\r\n".encode()
+
+        async def body() -> AsyncIterator[bytes]:
+            yield preamble
+            async for chunk in iter_chunks(source, self.chunk_size):
+                yield chunk
+            yield epilogue
+
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        size = remaining_size(source)
+        if size is not None:
+            headers["Content-Length"] = str(len(preamble) + size + len(epilogue))
+        response = await self._send(api_base.rstrip("/"), f"/v1_1/{cloud_name}/auto/upload", body(), headers)
+        await rewind(source)
+        return response.json()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes_sent": self.bytes_sent,
+            "clients": len(self._clients)
+        }
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+upload_pipeline = UploadPipeline(
+    concurrency=int(os.getenv("UPLOAD_CONCURRENCY", "8")),
+    chunk_size=int(os.getenv("UPLOAD_CHUNK_SIZE", str(CHUNK_SIZE)))
+)
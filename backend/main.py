@@ -1,23 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
-from database.session import engine, Base
+from database.session import engine, Base, SessionLocal
 from api.v1.endpoints import auth, connections, research, chat
 from routes import profile, post,  notification, group, user, topuni, events
-from routes import postReaction
-from fastapi.staticfiles import StaticFiles
+from routes import postReaction, jobs
+import asyncio
+import os
 from api.v1.endpoints import search
 from api.v1.endpoints.chatbot import huggingface
 from routes import google_auth
 from starlette.middleware.sessions import SessionMiddleware
+from services.reaction import ensure_comment_count_column, reconcile_comment_counts, RECONCILE_COUNTERS
+from services.chat_service import ensure_message_indexes
+from services.search_backends import ensure_search_schema, SEARCH_BACKEND
+from services.search_index import search_index
+from services.job_queue import job_queue
+from services.pubsub import pubsub
+from services.message_batcher import message_batcher
+from services.websocket_service import stop_watchdog
+from core.password_hasher import password_hasher
+from core.upload_pipeline import upload_pipeline
+from core.storage import LOCAL_FOLDERS, UPLOAD_ROOT
+from core.static_files import UploadsStaticFiles
+from services.embedding_service import embedding_service, EMBEDDING_WARMUP
+from services.pdf_extraction import pdf_extractor
 
 app = FastAPI()
 
-# Mount directories for other uploads that are still stored locally
-app.mount("/uploads/media", StaticFiles(directory="uploads/media"), name="media")
-app.mount("/uploads/document", StaticFiles(directory="uploads/document"), name="document")
-app.mount("/uploads/event_images", StaticFiles(directory="uploads/event_images"), name="event_images") 
-app.mount("/uploads/research_papers", StaticFiles(directory="uploads/research_papers"), name="research_papers")
+# Mount the local upload directories (older uploads, and every upload with STORAGE_BACKEND=local)
+for directory in sorted(set(LOCAL_FOLDERS.values())):
+    os.makedirs(os.path.join(UPLOAD_ROOT, directory), exist_ok=True)
+    app.mount(f"/uploads/{directory}", UploadsStaticFiles(directory=os.path.join(UPLOAD_ROOT, directory)), name=directory)
 
 
 # Add CORS middleware
@@ -33,6 +47,93 @@ app.add_middleware(SessionMiddleware, secret_key="your_super_secret_key")
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+# Full-text search column and indexes (Postgres only; safe to re-run)
+ensure_search_schema(engine)
+
+# Denormalized comment counter on posts (safe to re-run; counts filled in by reconcile_counters)
+ensure_comment_count_column(engine)
+
+# Inbox and chat history indexes on messages (safe to re-run)
+ensure_message_indexes(engine)
+
+# Recount denormalized counters, e.g. once after upgrading an existing database (RECONCILE_COUNTERS=true)
+@app.on_event("startup")
+def reconcile_counters():
+    if not RECONCILE_COUNTERS:
+        return
+    db = SessionLocal()
+    try:
+        reconcile_comment_counts(db)
+    finally:
+        db.close()
+
+# Background job workers; pending jobs left in the outbox are resumed on start
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+# Cross-worker pub/sub for websocket delivery (PUBSUB_BACKEND=memory|postgres)
+@app.on_event("startup")
+async def start_pubsub():
+    await pubsub.start()
+
+@app.on_event("shutdown")
+async def stop_pubsub():
+    await pubsub.stop()
+
+# Chat messages are group-committed off the websocket loop; flush what's queued on shutdown
+@app.on_event("startup")
+async def start_message_batcher():
+    await message_batcher.start()
+
+@app.on_event("shutdown")
+async def stop_message_batcher():
+    await message_batcher.stop()
+
+# Watchdog evicting websockets whose sends stalled; started by the first connection
+@app.on_event("shutdown")
+async def stop_websocket_watchdog():
+    await stop_watchdog()
+
+# bcrypt worker processes start on first use; stop them with the app
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+# Pooled storage connections used by the upload pipeline
+@app.on_event("shutdown")
+async def close_upload_clients():
+    await upload_pipeline.aclose()
+
+# Chatbot embedding model: optionally loaded at startup (EMBEDDING_WARMUP=true) instead of on the first upload
+@app.on_event("startup")
+async def warm_up_embeddings():
+    if EMBEDDING_WARMUP:
+        await asyncio.to_thread(embedding_service.warm_up)
+
+@app.on_event("shutdown")
+def stop_embedding_service():
+    embedding_service.shutdown()
+
+# PDF text extraction worker processes start on the first chatbot upload; stop them with the app
+@app.on_event("shutdown")
+def stop_pdf_extractor():
+    pdf_extractor.shutdown()
+
+# In-memory search index (SEARCH_BACKEND=memory): load the snapshot or build it, snapshot again on shutdown
+@app.on_event("startup")
+def load_search_index():
+    if SEARCH_BACKEND == "memory":
+        search_index.load(SessionLocal)
+
+@app.on_event("shutdown")
+def save_search_index():
+    search_index.save_snapshot()
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(google_auth.router, prefix="/auth/google", tags=["Google Authentication"])
@@ -49,3 +150,4 @@ app.include_router(group.router, prefix="/universities", tags=["University Group
 app.include_router(user.router, prefix="/user", tags=["Username"])
 app.include_router(topuni.router, prefix="/top", tags=["Top Uni"])
 app.include_router(events.router, prefix="/top", tags=["Events"])
+app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, UniqueConstraint
+from database.session import Base
+from datetime import datetime, timezone
+
+class Blob(Base):
+    """One stored copy of an uploaded file, shared by every upload with the same content."""
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 hex digest of the file
+    backend = Column(String, nullable=False)  # "cloudinary" or "supabase"
+    folder = Column(String, nullable=False, default="")  # Section the copy lives in, e.g. "posts", "chat/"
+    url = Column(String, nullable=False, index=True)
+    public_id = Column(String, nullable=True)  # Cloudinary only
+    resource_type = Column(String, nullable=True)  # Cloudinary only
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=1, nullable=False)  # Posts, profiles, papers and messages using the URL
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint("content_hash", "backend", "folder", name="uq_blobs_content_hash_backend_folder"),
+    )
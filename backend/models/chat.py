@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, String, DateTime, Boolean, Index
 from sqlalchemy.sql.sqltypes import Enum
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -24,4 +24,12 @@ class Message(Base):
     is_read = Column(Boolean, default=False)
 
     sender = relationship("User", foreign_keys=[sender_id], back_populates="messages_sent")
-    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="messages_received")
\ No newline at end of file
+    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="messages_received")
+
+    __table_args__ = (
+        # Each side of the inbox query: everything a user sent / received, newest first
+        Index("ix_messages_sender_id_timestamp", "sender_id", "timestamp"),
+        Index("ix_messages_receiver_id_timestamp", "receiver_id", "timestamp"),
+        # One direction of a conversation, walked by the id cursors of the history endpoint
+        Index("ix_messages_sender_id_receiver_id_id", "sender_id", "receiver_id", "id"),
+    )
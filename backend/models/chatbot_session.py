@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from database.session import Base
+from datetime import datetime, timezone
+
+class ChatbotSession(Base):
+    """The PDF a user is currently chatting about, so any worker can pick the conversation up."""
+    __tablename__ = "chatbot_sessions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    document_hash = Column(String(64), nullable=False)  # Key of the document's index in the vector store
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
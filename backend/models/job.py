@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, Index
+from database.session import Base
+from datetime import datetime, timezone
+import enum
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class OutboxJob(Base):
+    """Persistent record of a background job, so queued work survives a restart."""
+    __tablename__ = "job_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # Registered handler name
+    payload = Column(Text, nullable=False, default="{}")  # JSON-encoded keyword arguments
+    status = Column(Enum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # When a worker claimed it
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_job_outbox_status_id", "status", "id"),
+    )
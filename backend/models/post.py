@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Date, Text, CheckConstraint, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Date, Text, CheckConstraint, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
 from database.session import Base
 from datetime import datetime, timezone
@@ -28,6 +28,7 @@ class Post(Base):
     post_type = Column(Enum(PostTypeEnum), default=PostTypeEnum.TEXT)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     like_count = Column(Integer, default=0)
+    comment_count = Column(Integer, nullable=False, default=0, server_default=text("0"))  # Denormalized, includes replies
    
 
     # Relationships
@@ -41,6 +42,15 @@ class Post(Base):
 
     notifications = relationship("Notification", back_populates="post", cascade="all, delete-orphan")
     hashtags = relationship("Hashtag", secondary=post_hashtags, back_populates="posts")
+
+    # On Postgres the table also has a generated `search_vector` tsvector column,
+    # added by services.search_backends.ensure_search_schema and left unmapped here.
+
+    # Keyset pagination indexes for the global feed and per-user profile feeds
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
    
 class PostMedia(Base):
     __tablename__ = "post_media"
@@ -66,7 +76,7 @@ class Event(Base):
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, ForeignKey(POSTS_ID_FOREIGN_KEY, ondelete="CASCADE"), nullable=False)
+    post_id = Column(Integer, ForeignKey(POSTS_ID_FOREIGN_KEY, ondelete="CASCADE"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey(USER_ID_FOREIGN_KEY), nullable=False)  # ✅ Tracks who created the event
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
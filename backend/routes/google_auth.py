@@ -7,7 +7,10 @@ from sqlalchemy.orm import Session
 from core.dependencies import get_db
 from models.user import User
 from services.AuthHandler import AuthHandler
+from services.search_index import search_index
+from services.suggestion_index import suggestion_index
 from core.security import create_access_token
+from core.password_hasher import password_hasher
 import os
 
 router = APIRouter()
@@ -41,12 +44,11 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="No userinfo in Google response")    # Find or create user
     user = db.query(User).filter(User.email == user_info["email"]).first()
     if not user:
-        from core.security import hash_password
         # Generate a strong random password for Google OAuth users
         # They won't use this password since they'll always login via Google
         import secrets
         random_password = secrets.token_urlsafe(16)
-        hashed_password = hash_password(random_password)
+        hashed_password = await password_hasher.hash(random_password)
         
         # Create username from email and make it unique with a random suffix
         base_username = user_info["email"].split("@")[0]
@@ -61,7 +63,10 @@ async def google_callback(request: Request, db: Session = Depends(get_db)):
         )
         db.add(user)
         db.commit()
-        db.refresh(user)# Generate JWT token
+        db.refresh(user)
+        search_index.index_user(user)
+        suggestion_index.add_user(user)
+    # Generate JWT token
     access_token = create_access_token({"sub": user.username})
     # Redirect to frontend with token as query param
     frontend_url = os.getenv("FRONTEND_URL")
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from models.user import User
+from api.v1.endpoints.auth import get_current_user
+from services.job_queue import job_queue
+
+router = APIRouter()
+
+# Queue depth, throughput and wait/run latency of the background job queue
+@router.get("/stats")
+def get_job_queue_stats(current_user: User = Depends(get_current_user)):
+    return job_queue.stats()
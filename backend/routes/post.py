@@ -2,7 +2,7 @@ from uuid import uuid4
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile, Query, Request
 from sqlalchemy.orm import Session
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Literal
 import os
 import secrets
 from pathlib import Path
@@ -19,10 +19,12 @@ from core.connection_crud import get_connections
 from crud.notification import create_notification
 from AI.moderation import moderate_text
 from services.services import   get_post_and_event, update_post_and_event, try_convert_datetime, format_updated_event_response
-from services.PostHandler import get_newer_posts, get_user_like_status, get_comments_for_post, create_post_entry, update_post_content , extract_hashtags, get_post_by_id
+from services.PostHandler import get_newer_posts, get_user_like_status, get_comments_for_post, create_post_entry, update_post_content , extract_hashtags, get_post_by_id, apply_post_cursor, encode_post_cursor
 from services.FileHandler import remove_old_file_if_exists, save_upload_file, generate_secure_filename, validate_file_extension
-from services.NotificationHandler import send_post_notifications
+from services.post_jobs import enqueue_post_side_effects
+from services.search_index import search_index
 from services.PostTypeHandler import get_post_additional_data
+from services.FeedHandler import hydrate_posts, with_feed_relations
 from models.hashtag import Hashtag
 from models.university import University
 from dotenv import load_dotenv
@@ -31,6 +33,7 @@ from utils.cloudinary import upload_to_cloudinary
 from utils.post_utils import validate_post_ownership, prepare_post_response, handle_media_upload, create_base_post
 from services.EventHandler import create_event_post as create_event_post_entry, format_event_response, handle_event_upload, update_event_post as update_event_post_entry
 from utils.supabase import upload_file_to_supabase
+from services.blob_store import post_file_urls, release_urls
 
 # Load environment variables
 load_dotenv()
@@ -67,30 +70,50 @@ ALLOWED_DOCS = {".pdf", ".docx", ".txt", ".pptx"}
 @router.get("/")
 def get_posts(
     limit: int = Query(10, alias="limit"),  # Default to 10 posts
-    offset: int = Query(0, alias="offset"),  # Start at 0
-    last_seen_post: Optional[int] = Query(None, alias="last_seen"),  # Last post ID seen
+    offset: int = Query(0, alias="offset"),  # Legacy pagination, ignored when a cursor is given
+    last_seen_post: Optional[int] = Query(None, alias="last_seen"),  # Legacy: last post ID seen
+    cursor: Optional[str] = Query(None, alias="cursor"),  # Opaque (created_at, id) cursor from a previous page
+    direction: Literal["older", "newer"] = Query("older", alias="direction"),
     user_id: Optional[int] = Query(None, alias="user_id"),  # User ID to filter posts (for profile)
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    ✅ Fetch posts with pagination.
-    ✅ If `last_seen_post` is provided, fetch **newer** posts than the last seen post.
+    ✅ Fetch posts with keyset pagination.
+    ✅ Pass `next_cursor` back with `direction=older` to scroll down, or `prev_cursor`
+       with `direction=newer` to fetch posts created since the top of the feed.
+    ✅ `offset` and `last_seen` are still honoured for clients that don't send a cursor.
     ✅ Include total likes, user liked status, and comments for each post.
     """
 
-    # ✅ Get the posts query with the optional filter for newer posts
-    query = get_newer_posts(last_seen_post, db)
+    if cursor:
+        query = db.query(Post)
+    else:
+        # ✅ Without a cursor both directions start at the top of the feed
+        direction = "older"
+        # ✅ Get the posts query with the optional filter for newer posts
+        query = get_newer_posts(last_seen_post, db)
 
     if user_id:
         query = query.filter(Post.user_id == user_id)
-    
-    # ✅ Apply pagination
-    posts = query.order_by(Post.created_at.desc()).offset(offset).limit(limit).all()
 
-    post_list = [prepare_post_response(post, current_user, db) for post in posts]
+    # ✅ Apply pagination, eager-loading what each feed item renders
+    query = apply_post_cursor(with_feed_relations(query), cursor, direction)
+    if not cursor:
+        query = query.offset(offset)
+    posts = query.limit(limit).all()
+    if direction == "newer":
+        posts.reverse()
+
+    # ✅ Hydrate the whole page at once instead of querying per post
+    post_list = hydrate_posts(posts, current_user, db)
 
-    return {"posts": post_list, "count": len(post_list)}
+    return {
+        "posts": post_list,
+        "count": len(post_list),
+        "next_cursor": encode_post_cursor(posts[-1]) if posts else None,
+        "prev_cursor": encode_post_cursor(posts[0]) if posts else cursor,
+    }
 
 
 
@@ -135,8 +158,9 @@ async def create_media_post(
     db.commit()
     db.refresh(media_entry)
     
-    # Send notifications
-    send_post_notifications(db, current_user, post)
+    # Moderation, hashtags and notifications run on the job queue after the response
+    enqueue_post_side_effects(db, post.id)
+    search_index.index_post(post)
     return media_entry
 
 
@@ -164,8 +188,9 @@ async def create_document_post(
     db.commit()
     db.refresh(doc_entry)
     
-    # Send notifications
-    send_post_notifications(db, current_user, post)
+    # Moderation, hashtags and notifications run on the job queue after the response
+    enqueue_post_side_effects(db, post.id)
+    search_index.index_post(post)
     return doc_entry
 
 
@@ -177,10 +202,10 @@ async def create_text_post(
 ):
     """Create a new text post."""
     post = create_base_post(db, current_user.id, content, "text")
-    send_post_notifications(db, current_user, post)
+    enqueue_post_side_effects(db, post.id)
+    search_index.index_post(post)
     
     # Add required fields for response
-    post.comment_count = 0  # New post has no comments
     post.user_liked = False  # User hasn't liked their own post yet
     
     return post
@@ -217,7 +242,8 @@ async def create_event_post(
         image_url=upload_result
     )
     
-    send_post_notifications(db, current_user, post)
+    enqueue_post_side_effects(db, post.id)
+    search_index.index_post(post)
     return format_event_response(post, event)
 
 @router.get("/posts/")
@@ -240,6 +266,7 @@ async def update_text_post(
     update_post_content(post, update_data.content)
     db.commit()
     db.refresh(post)
+    search_index.index_post(post)
     return post
 
 
@@ -258,8 +285,8 @@ async def update_media_post(
     if media_file and media_file.filename:
         ext = validate_file_extension(media_file.filename, ALLOWED_MEDIA)
         
-        upload_result = upload_to_cloudinary(
-            media_file.file,
+        upload_result = await upload_to_cloudinary(
+            media_file,
             folder_name="noobsquad/media_uploads"
         )
 
@@ -269,6 +296,7 @@ async def update_media_post(
         media_entry = db.query(PostMedia).filter(PostMedia.post_id == post.id).first()
         if media_entry:
             # (Optional) Here you can delete old Cloudinary media if you want
+            release_urls(db, [media_entry.media_url])
             media_entry.media_url = secure_url
             media_entry.media_type = resource_type  # You can also keep ext if needed
         else:
@@ -282,6 +310,7 @@ async def update_media_post(
         db.commit()
 
     db.refresh(post)
+    search_index.index_post(post)
     media_url = db.query(PostMedia).filter(PostMedia.post_id == post.id).first().media_url
 
     return {
@@ -317,6 +346,7 @@ async def update_document_post(
         doc_entry = db.query(PostDocument).filter(PostDocument.post_id == post.id).first()
         if doc_entry:
             # No need to remove old file as Supabase handles versioning
+            release_urls(db, [doc_entry.document_url])
             doc_entry.document_url = document_url
             doc_entry.document_type = ext
         else:
@@ -326,6 +356,7 @@ async def update_document_post(
         db.commit()
 
     db.refresh(post)
+    search_index.index_post(post)
     document_url = db.query(PostDocument).filter(PostDocument.post_id == post.id).first().document_url
 
     return {
@@ -376,6 +407,7 @@ async def update_event_post(
     }
     
     post, event = update_event_post_entry(db, post, event, update_data)
+    search_index.index_post(post)
     return format_event_response(post, event)
 
 
@@ -386,8 +418,10 @@ async def delete_post(
     db: Session = Depends(get_db)
 ):
     post = get_post_by_id(db, post_id, current_user.id)
+    release_urls(db, post_file_urls(post))
     db.delete(post)
     db.commit()
+    search_index.remove_post(post_id)
     return {"message": "Post deleted successfully"}
 
 @router.get("/events/", response_model=Union[List[EventResponse], EventResponse])
@@ -16,7 +16,7 @@ from models.post import Post, PostMedia, PostDocument, Event, Like, Comment
 from zoneinfo import ZoneInfo
 from crud.notification import create_notification
 from schemas.notification import NotificationCreate
-from services.reaction import get_like_count, add_like, remove_like, notify_if_not_self, build_comment_response
+from services.reaction import get_like_count, add_like, remove_like, notify_if_not_self, build_comment_response, add_comment, delete_comment
 from models.post import Like, Comment, Share, Post, Event, EventAttendee
 from schemas.post import PostResponse
 from database.session import SessionLocal
@@ -107,9 +107,7 @@ def comment_post(comment_data: CommentCreate, db: Session = Depends(get_db), cur
         content=comment_data.content,
         created_at=datetime.now(ZoneInfo("UTC"))
     )
-    db.add(new_comment)
-    db.commit()
-    db.refresh(new_comment)
+    add_comment(db, new_comment)
     
     notify_if_not_self(db, current_user.id, new_comment.post.user_id, "comment", new_comment.post_id)
     
@@ -130,15 +128,26 @@ def reply_comment(comment_data: CommentCreate, db: Session = Depends(get_db), cu
         parent_id=parent.id,
         created_at=datetime.now(ZoneInfo("UTC"))
     )
-    db.add(reply)
-    db.commit()
-    db.refresh(reply)
+    add_comment(db, reply)
 
     notify_if_not_self(db, current_user.id, parent.user_id, "reply", reply.post_id)
 
     return reply
 
 
+@router.delete("/{post_id}/comment/{comment_id}")
+def delete_comment_action(post_id: int, comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    comment = get_comment_by_id(db, comment_id)
+    if comment.post_id != post_id:
+        raise HTTPException(status_code=404, detail="Comment not found.")
+
+    if comment.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to delete this comment.")
+
+    delete_comment(db, comment)
+    return {"message": "Comment deleted successfully"}
+
+
 @router.get("/{post_id}/comments")
 def get_comments(post_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     parent_comments = db.query(Comment).filter(Comment.post_id == post_id, Comment.parent_id == None).all()
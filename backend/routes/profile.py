@@ -14,6 +14,9 @@ import secrets
 from core.dependencies import get_db
 from dotenv import load_dotenv
 from utils.cloudinary import upload_to_cloudinary
+from services.blob_store import release_urls
+from services.university_cache import invalidate_university_names
+from services.suggestion_index import suggestion_index
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +44,7 @@ def get_or_create_university(db: Session, uni_name: str, dept_name: str):
         db.add(new_uni)
         db.commit()
         db.refresh(new_uni)
+        invalidate_university_names()
         return new_uni
 
     # University exists — add department if not already present
@@ -74,6 +78,7 @@ def complete_profile_step1(
     if uni:
         uni.total_members = db.query(User).filter(User.university_name == university_name).count()
         db.commit()
+        suggestion_index.set_university(uni)
 
     # Update user fields
     db_user.university_name = university_name
@@ -92,7 +97,7 @@ def complete_profile_step1(
 
 
 @router.post("/upload_picture")
-def upload_profile_picture(
+async def upload_profile_picture(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -112,8 +117,8 @@ def upload_profile_picture(
         )
 
     # ✅ Upload directly to Cloudinary
-    upload_result = upload_to_cloudinary(
-        file.file,  # sending the file object
+    upload_result = await upload_to_cloudinary(
+        file,  # streamed in chunks, never read whole
         folder_name="noobsquad/profile_pictures"
     )
 
@@ -121,6 +126,7 @@ def upload_profile_picture(
     # resource_type = upload_result["resource_type"]  # optional if you want to store type
 
     # ✅ Update database
+    release_urls(db, [db_user.profile_picture])  # The new upload took its own reference
     db_user.profile_picture = secure_url  # Save Cloudinary URL directly
     db.commit()
     db.refresh(db_user)
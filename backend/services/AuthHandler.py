@@ -4,8 +4,12 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 import jwt
 from models.user import User
-from core.security import hash_password, verify_password, create_access_token, generate_otp, store_otp
+from core.security import create_access_token, generate_otp, store_otp
+from core.password_hasher import password_hasher
 from core.email import send_email
+from services.search_index import search_index
+from services.suggestion_index import suggestion_index
+from services.principal_cache import principal_cache
 import os
 from dotenv import load_dotenv
 
@@ -50,13 +54,15 @@ class AuthHandler:
         new_user = User(
             username=username,
             email=email,
-            hashed_password=hash_password(password),
+            hashed_password=await password_hasher.hash(password),
             profile_completed=False,
             is_verified=False
         )
         db.add(new_user)
         db.commit()
         db.refresh(new_user)
+        search_index.index_user(new_user)
+        suggestion_index.add_user(new_user)
 
         otp = generate_otp()
         store_otp(db, new_user, otp)
@@ -68,8 +74,15 @@ class AuthHandler:
     async def authenticate_user(db: Session, username_or_email: str, password: str) -> Dict[str, str]:
         """Authenticate user and return access token."""
         user = AuthHandler._get_user_by_username_or_email(db, username_or_email)
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid credentials")
+        if new_hash:
+            # Stored with an outdated bcrypt cost; upgrade it now that we have the plain password
+            user.hashed_password = new_hash
+            db.commit()
 
         if not user.is_verified:
             raise HTTPException(status_code=403, detail="Please verify your email")
@@ -87,9 +100,13 @@ class AuthHandler:
             username = payload.get("sub")
             if not username:
                 raise HTTPException(status_code=401, detail="Invalid token")
+            user = principal_cache.get(db, username)
+            if user is not None:
+                return user
             user = AuthHandler._get_user_by_username(db, username)
             if not user:
                 raise HTTPException(status_code=404, detail="User not found")
+            principal_cache.put(username, user)
             return user
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expired")
@@ -155,7 +172,7 @@ class AuthHandler:
 
         AuthHandler._check_otp_validity(user, otp)
 
-        user.hashed_password = hash_password(new_password)
+        user.hashed_password = await password_hasher.hash(new_password)
         user.otp = None
         user.otp_expiry = None
         db.commit()
@@ -36,8 +36,8 @@ async def handle_event_upload(
     media_file: Optional[UploadFile],
     folder_name: str
 ) -> Dict[str, str]:
-    upload_result = upload_to_cloudinary(
-        media_file.file,
+    upload_result = await upload_to_cloudinary(
+        media_file,
         folder_name=folder_name
     )
     return upload_result["secure_url"]
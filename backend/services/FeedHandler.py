@@ -0,0 +1,58 @@
+#all helper functions related to building the post feed, will be here
+from typing import Any, Dict, List, Set
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from models.user import User
+from models.post import Post, Like
+from services.PostTypeHandler import get_loaded_post_additional_data
+
+
+def with_feed_relations(query: Query) -> Query:
+    """Eager-load everything a feed item renders, so hydration never lazy-loads per post."""
+    return query.options(
+        joinedload(Post.user),
+        selectinload(Post.media),
+        selectinload(Post.documents),
+        selectinload(Post.event),
+    )
+
+def _get_liked_post_ids(post_ids: List[int], user_id: int, db: Session) -> Set[int]:
+    rows = db.query(Like.post_id).filter(Like.user_id == user_id, Like.post_id.in_(post_ids)).all()
+    return {post_id for (post_id,) in rows}
+
+def build_post_response(post: Post, user_liked: bool) -> Dict[str, Any]:
+    """Standard feed item without the type-specific fields."""
+    return {
+        "id": post.id,
+        "user_id": post.user_id,
+        "post_type": post.post_type,
+        "content": post.content,
+        "created_at": post.created_at,
+        "user": {
+            "id": post.user.id,
+            "username": post.user.username,
+            "profile_picture": post.user.profile_picture,
+            "university_name": post.user.university_name
+        },
+        "total_likes": post.like_count,
+        "user_liked": user_liked,
+        "comment_count": post.comment_count or 0
+    }
+
+def _build_feed_item(post: Post, user_liked: bool) -> Dict[str, Any]:
+    response = build_post_response(post, user_liked)
+    response.update(get_loaded_post_additional_data(post))
+    return response
+
+def hydrate_posts(posts: List[Post], current_user: User, db: Session) -> List[Dict[str, Any]]:
+    """
+    Build feed responses for a whole page of posts in a fixed number of queries.
+    Posts should come from a query wrapped in `with_feed_relations`; the output
+    matches `prepare_post_response` item for item.
+    """
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+    liked_ids = _get_liked_post_ids(post_ids, current_user.id, db)
+
+    return [_build_feed_item(post, post.id in liked_ids) for post in posts]
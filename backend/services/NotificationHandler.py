@@ -1,5 +1,7 @@
 #all helper functions related to post, will be here
 from typing import List, Optional
+from datetime import datetime, timezone
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models.user import User
 from models.post import Post
@@ -28,24 +30,64 @@ def create_notification(
     db.refresh(notification)
     return notification
 
+def bulk_create_notifications(
+    db: Session,
+    user_ids: List[int],
+    actor_id: int,
+    type: str,
+    post_id: Optional[int] = None
+) -> int:
+    """Create one notification per recipient with a single multi-row INSERT. The caller commits."""
+    if not user_ids:
+        return 0
+    created_at = datetime.now(timezone.utc)
+    db.execute(
+        insert(Notification),
+        [
+            {
+                "user_id": user_id,
+                "actor_id": actor_id,
+                "type": type,
+                "post_id": post_id,
+                "is_read": False,
+                "created_at": created_at
+            }
+            for user_id in user_ids
+        ]
+    )
+    return len(user_ids)
+
+def _get_connection_ids(db: Session, user_id: int) -> List[int]:
+    return [
+        connection["friend_id"] if connection["user_id"] == user_id else connection["user_id"]
+        for connection in get_connections(db, user_id)
+    ]
+
+def notify_connections(
+    db: Session,
+    author_id: int,
+    post_id: int,
+    notification_type: str = "new_post"
+) -> int:
+    """Notify all of the author's connections about a post (not committed). Returns the number of notifications."""
+    return bulk_create_notifications(
+        db=db,
+        user_ids=_get_connection_ids(db, author_id),
+        actor_id=author_id,
+        type=notification_type,
+        post_id=post_id
+    )
+
 def send_post_notifications(
     db: Session,
     author: User,
     post: Post,
     notification_type: str = "new_post"
-) -> List[Notification]:
+) -> int:
     """Send notifications to all connections when a user creates a new post."""
-    connections = get_connections(db, author.id)
-    return [
-        create_notification(
-            db=db,
-            user_id=connection["friend_id"] if connection["user_id"] == author.id else connection["user_id"],
-            actor_id=author.id,
-            type=notification_type,
-            post_id=post.id
-        )
-        for connection in connections
-    ]
+    sent = notify_connections(db, author.id, post.id, notification_type)
+    db.commit()
+    return sent
 
 def mark_notification_as_read(
     db: Session,
@@ -20,6 +20,9 @@ from core.connection_crud import get_connections
 from crud.notification import create_notification
 from AI.moderation import moderate_text
 import re
+import base64
+import json
+from sqlalchemy import tuple_
 
 STATUS_404_ERROR = "Post not found"
 
@@ -36,6 +39,34 @@ def _get_post_query(db: Session, last_seen_post: Optional[int]) -> Session:
 def get_newer_posts(last_seen_post: Optional[int], db: Session):
     return _get_post_query(db, last_seen_post)
 
+def encode_post_cursor(post: Post) -> str:
+    """Opaque cursor pointing at a post's (created_at, id) position in the feed."""
+    raw = json.dumps([post.created_at.isoformat(), post.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_post_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def apply_post_cursor(query, cursor: Optional[str], direction: str = "older"):
+    """
+    Keyset pagination over (created_at, id), served by the composite index on posts.
+    "older" walks the feed downwards from the cursor; "newer" returns the posts
+    right above it, oldest first, so callers can reverse them for display.
+    """
+    position = tuple_(Post.created_at, Post.id)
+    if direction == "newer":
+        if cursor:
+            query = query.filter(position > tuple_(*decode_post_cursor(cursor)))
+        return query.order_by(Post.created_at.asc(), Post.id.asc())
+
+    if cursor:
+        query = query.filter(position < tuple_(*decode_post_cursor(cursor)))
+    return query.order_by(Post.created_at.desc(), Post.id.desc())
+
 def get_user_like_status(post_id: int, user_id: int, db: Session):
     return db.query(Like).filter(Like.post_id == post_id, Like.user_id == user_id).first() is not None
 
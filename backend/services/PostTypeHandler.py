@@ -4,7 +4,7 @@ from models.post import Post, PostMedia, PostDocument, Event
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 # Load environment variables
 load_dotenv()
@@ -14,20 +14,17 @@ API_URL = os.getenv("VITE_API_URL")
 
 STATUS_404_ERROR = "Post not found"
 
-def _get_media_post_data(post: Post, db: Session) -> Dict[str, Any]:
-    media = db.query(PostMedia).filter(PostMedia.post_id == post.id).first()
+def _format_media_data(media: Optional[PostMedia]) -> Dict[str, Any]:
     return {
         "media_url": media.media_url if media else None
     }
 
-def _get_document_post_data(post: Post, db: Session) -> Dict[str, Any]:
-    document = db.query(PostDocument).filter(PostDocument.post_id == post.id).first()
+def _format_document_data(document: Optional[PostDocument]) -> Dict[str, Any]:
     return {
         "document_url": document.document_url if document else None
     }
 
-def _get_event_post_data(post: Post, db: Session) -> Dict[str, Any]:
-    event = db.query(Event).filter(Event.post_id == post.id).first()
+def _format_event_data(event: Optional[Event]) -> Dict[str, Any]:
     if not event:
         return {}
     return {
@@ -39,6 +36,18 @@ def _get_event_post_data(post: Post, db: Session) -> Dict[str, Any]:
         }
     }
 
+def _get_media_post_data(post: Post, db: Session) -> Dict[str, Any]:
+    media = db.query(PostMedia).filter(PostMedia.post_id == post.id).first()
+    return _format_media_data(media)
+
+def _get_document_post_data(post: Post, db: Session) -> Dict[str, Any]:
+    document = db.query(PostDocument).filter(PostDocument.post_id == post.id).first()
+    return _format_document_data(document)
+
+def _get_event_post_data(post: Post, db: Session) -> Dict[str, Any]:
+    event = db.query(Event).filter(Event.post_id == post.id).first()
+    return _format_event_data(event)
+
 def get_post_additional_data(post: Post, db: Session) -> Dict[str, Any]:
     """Get additional data based on the post type (media, document, event)."""
     handlers = {
@@ -48,3 +57,15 @@ def get_post_additional_data(post: Post, db: Session) -> Dict[str, Any]:
     }
     handler = handlers.get(post.post_type)
     return handler(post, db) if handler else {}
+
+
+def get_loaded_post_additional_data(post: Post) -> Dict[str, Any]:
+    """Same as get_post_additional_data, but reads the already eager-loaded relationships."""
+    post_type = post.post_type
+    if post_type == "media":
+        return _format_media_data(post.media[0] if post.media else None)
+    if post_type == "document":
+        return _format_document_data(post.documents[0] if post.documents else None)
+    if post_type == "event":
+        return _format_event_data(post.event)
+    return {}
\ No newline at end of file
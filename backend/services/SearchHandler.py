@@ -1,12 +1,29 @@
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models.post import Post
 from models.user import User
+from models.research_paper import ResearchPaper
+from models.research_collaboration import ResearchCollaboration
+from models.university import University
+from services.search_backends import get_search_backend
+from utils.query_utils import escape_like
+from services.research_service import search_papers, search_research_collaborations
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 20
+
+# Shared by every /search/all request; each source runs on its own session
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_WORKERS", "8")),
+    thread_name_prefix="search"
+)
+
 def _format_post_response(post: Post) -> Dict[str, Any]:
     return {
         "id": post.id,
@@ -25,27 +42,47 @@ def _format_user_response(user: User) -> Dict[str, Any]:
         "profile_picture": user.profile_picture
     }
 
-def _search_posts_by_keyword(db: Session, keyword: str) -> List[Post]:
-    return db.query(Post).filter(
-        (Post.content.ilike(f"%{keyword}%") & (Post.event == None)) |  # Posts with matching content, not tied to events
-        (Post.user.has(User.username.ilike(f"%{keyword}%")))  # Posts by users with matching username
-    ).all()
+def _format_paper_response(paper: ResearchPaper) -> Dict[str, Any]:
+    return {
+        "id": paper.id,
+        "title": paper.title,
+        "author": paper.author,
+        "research_field": paper.research_field,
+        "created_at": paper.created_at.isoformat() if paper.created_at else None
+    }
+
+def _format_collaboration_response(research: ResearchCollaboration) -> Dict[str, Any]:
+    return {
+        "id": research.id,
+        "title": research.title,
+        "research_field": research.research_field,
+        "creator_id": research.creator_id
+    }
+
+def _format_university_response(university: University) -> Dict[str, Any]:
+    return {
+        "id": university.id,
+        "name": university.name,
+        "total_members": university.total_members
+    }
+
+def _search_posts_by_keyword(db: Session, keyword: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> List[Post]:
+    return get_search_backend(db).search_posts(db, keyword, limit, offset)
 
-def _search_users_by_keyword(db: Session, keyword: str) -> List[User]:
-    return db.query(User).filter(
-        User.username.ilike(f"%{keyword}%") |
-        User.email.ilike(f"%{keyword}%")
-    ).all()
+def _search_users_by_keyword(db: Session, keyword: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0) -> List[User]:
+    return get_search_backend(db).search_users(db, keyword, limit, offset)
 
 class SearchHandler:
     @staticmethod
     def search_posts(
         db: Session,
-        keyword: str
+        keyword: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0
     ) -> List[Dict[str, Any]]:
-        """Search for posts by keyword in content or username."""
+        """Search for posts by keyword in content or username, best matches first."""
         try:
-            posts = _search_posts_by_keyword(db, keyword)
+            posts = _search_posts_by_keyword(db, keyword, limit, offset)
             return [_format_post_response(post) for post in posts]
         except Exception as e:
             logger.error(f"Error searching for keyword '{keyword}': {str(e)}")
@@ -54,11 +91,13 @@ class SearchHandler:
     @staticmethod
     def search_users(
         db: Session,
-        keyword: str
+        keyword: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0
     ) -> List[Dict[str, Any]]:
         """Search for users by username or email."""
         try:
-            users = _search_users_by_keyword(db, keyword)
+            users = _search_users_by_keyword(db, keyword, limit, offset)
             return [_format_user_response(user) for user in users]
         except Exception as e:
             logger.error(f"Error searching users with keyword '{keyword}': {str(e)}")
@@ -67,17 +106,122 @@ class SearchHandler:
     @staticmethod
     def search_all(
         db: Session,
-        keyword: str
-    ) -> Dict[str, List[Dict[str, Any]]]:
-        """Search across all searchable entities (posts and users)."""
+        keyword: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        offset: int = 0,
+        session_factory: Optional[Callable[[], Session]] = None
+    ) -> Dict[str, Any]:
+        """
+        Search posts, users, research papers, collaborations and universities at once.
+
+        The sources are queried concurrently, each on its own session (from
+        `session_factory`, by default bound like `db`), and each returns at
+        most `limit` hits. Besides the per-source lists, `results` merges
+        every hit into one list ordered by how closely it matches the
+        keyword, and `timings` has each source's time in milliseconds.
+        """
+        if session_factory is None:
+            bind = db.get_bind()
+            session_factory = lambda: Session(bind=bind)
         try:
-            posts = SearchHandler.search_posts(db, keyword)
-            users = SearchHandler.search_users(db, keyword)
-            
-            return {
-                "posts": posts,
-                "users": users
+            futures = {
+                name: _search_executor.submit(_run_source, search, session_factory, keyword, limit, offset)
+                for name, search in SEARCH_SOURCES.items()
             }
+            response: Dict[str, Any] = {"timings": {}}
+            for name, future in futures.items():
+                response[name], response["timings"][name] = future.result()
+            response["results"] = _merge_results(keyword, {name: response[name] for name in futures})
+            return response
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error performing global search with keyword '{keyword}': {str(e)}")
-            raise HTTPException(status_code=500, detail="Internal server error") 
\ No newline at end of file
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+
+def _search_posts(db: Session, keyword: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    return SearchHandler.search_posts(db, keyword, limit, offset)
+
+def _search_users(db: Session, keyword: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    return SearchHandler.search_users(db, keyword, limit, offset)
+
+def _search_papers(db: Session, keyword: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    return [_format_paper_response(paper) for paper in search_papers(db, keyword, limit, offset)]
+
+def _search_collaborations(db: Session, keyword: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    return [
+        _format_collaboration_response(research)
+        for research in search_research_collaborations(db, keyword, limit, offset)
+    ]
+
+def _search_universities(db: Session, keyword: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+    pattern = f"%{escape_like(keyword)}%"
+    universities = db.query(University).filter(University.name.ilike(pattern, escape="\\")).order_by(
+        University.total_members.desc(), University.id
+    ).offset(offset).limit(limit).all()
+    return [_format_university_response(university) for university in universities]
+
+# Source name -> search function; all of them run for every /search/all request
+SEARCH_SOURCES: Dict[str, Callable[[Session, str, int, int], List[Dict[str, Any]]]] = {
+    "posts": _search_posts,
+    "users": _search_users,
+    "papers": _search_papers,
+    "collaborations": _search_collaborations,
+    "universities": _search_universities,
+}
+
+# The field of each hit compared with the keyword when merging
+_TITLE_FIELDS = {
+    "posts": "content",
+    "users": "username",
+    "papers": "title",
+    "collaborations": "title",
+    "universities": "name",
+}
+
+def _run_source(
+    search: Callable[[Session, str, int, int], List[Dict[str, Any]]],
+    session_factory: Callable[[], Session],
+    keyword: str,
+    limit: int,
+    offset: int
+) -> Tuple[List[Dict[str, Any]], float]:
+    start = time.perf_counter()
+    db = session_factory()
+    try:
+        hits = search(db, keyword, limit, offset)
+    finally:
+        db.close()
+    return hits, round((time.perf_counter() - start) * 1000, 2)
+
+def _match_score(keyword: str, text: Optional[str]) -> float:
+    """1.0 for an exact match, then whole-text prefix, word prefix, anywhere, and 0.1 for hits matched on another field."""
+    keyword = keyword.strip().lower()
+    text = (text or "").lower()
+    if not keyword or keyword not in text:
+        return 0.1
+    if text == keyword:
+        return 1.0
+    if text.startswith(keyword):
+        return 0.8
+    if f" {keyword}" in text:
+        return 0.6
+    return 0.4
+
+def _merge_results(keyword: str, hits_by_source: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    merged = []
+    for name, hits in hits_by_source.items():
+        field = _TITLE_FIELDS.get(name)
+        for position, hit in enumerate(hits):
+            merged.append({
+                "type": name,
+                "score": _match_score(keyword, hit.get(field) if field else None),
+                "position": position,
+                "item": hit
+            })
+    # Ties keep each source's own ranking, interleaving sources
+    merged.sort(key=lambda result: (-result["score"], result["position"]))
+    for result in merged:
+        del result["position"]
+    return merged
@@ -0,0 +1,130 @@
+#content-addressed uploads: a file already in storage is never uploaded again, its URL is shared
+import asyncio
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from core.upload_pipeline import iter_chunks, rewind
+from database.session import SessionLocal
+from models.blob import Blob
+from models.post import Post
+
+logger = logging.getLogger(__name__)
+
+# What an upload function hands back: {"url": ..., "public_id": ..., "resource_type": ...}
+StoredFile = Dict[str, Optional[str]]
+
+
+async def hash_source(source) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of `source`, read one chunk at a time, then rewound."""
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in iter_chunks(source):
+        # hashlib releases the GIL on large buffers, so a big file doesn't stall the loop
+        await asyncio.to_thread(digest.update, chunk)
+        size += len(chunk)
+    await rewind(source)
+    return digest.hexdigest(), size
+
+
+class BlobStore:
+    """
+    Maps content hashes to stored files in the `blobs` table.
+
+    Before a file goes to a storage backend it is hashed from the local
+    spooled copy (cheap next to the network upload); when that backend
+    already holds the same bytes in the same folder, the upload is skipped
+    and the existing URL reused with its reference count bumped. Copies
+    are never shared across folders, so a chat attachment or research
+    paper always gets a URL in its own section.
+
+    Deleting or replacing a post's files, or replacing a profile picture,
+    releases their references. Research papers and chat files have no
+    delete path, so their references only grow. Nothing is deleted from
+    storage at zero, so a later upload of the same file is still free.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+
+    async def store(
+        self,
+        source,
+        backend: str,
+        upload: Callable[[], Awaitable[StoredFile]],
+        folder: str = ""
+    ) -> StoredFile:
+        """Return the stored copy of `source`, calling `upload` only if `folder` on `backend` doesn't have it yet."""
+        content_hash, size = await hash_source(source)
+        existing = await asyncio.to_thread(self._acquire, content_hash, backend, folder)
+        if existing is not None:
+            self.hits += 1
+            return existing
+        self.misses += 1
+        stored = await upload()
+        return await asyncio.to_thread(self._record, content_hash, backend, folder, size, stored)
+
+    def _acquire(self, content_hash: str, backend: str, folder: str) -> Optional[StoredFile]:
+        db = self._session_factory()
+        try:
+            blob = db.query(Blob).filter(
+                Blob.content_hash == content_hash, Blob.backend == backend, Blob.folder == folder
+            ).first()
+            if blob is None:
+                return None
+            blob.ref_count = Blob.ref_count + 1  # In SQL, so concurrent acquires don't lose counts
+            db.commit()
+            return _stored_file(blob)
+        finally:
+            db.close()
+
+    def _record(self, content_hash: str, backend: str, folder: str, size: int, stored: StoredFile) -> StoredFile:
+        db = self._session_factory()
+        try:
+            blob = Blob(content_hash=content_hash, backend=backend, folder=folder, size=size, ref_count=1, **stored)
+            db.add(blob)
+            try:
+                db.commit()
+                return stored
+            except IntegrityError:
+                # Uploaded concurrently by another request; share its copy (ours is left unreferenced)
+                db.rollback()
+                logger.info("Duplicate upload of %s to %s raced; reusing %s", content_hash, backend, stored["url"])
+        finally:
+            db.close()
+        return self._acquire(content_hash, backend, folder) or stored
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+
+def _stored_file(blob: Blob) -> StoredFile:
+    return {"url": blob.url, "public_id": blob.public_id, "resource_type": blob.resource_type}
+
+
+def post_file_urls(post: Post) -> List[str]:
+    """URLs of every uploaded file a post references."""
+    urls = [media.media_url for media in post.media] + [document.document_url for document in post.documents]
+    if post.event is not None and post.event.image_url:
+        urls.append(post.event.image_url)
+    return urls
+
+
+def release_urls(db: Session, urls: Iterable[Optional[str]]) -> None:
+    """Drop one reference per URL; part of the caller's transaction, so commit alongside the delete."""
+    for url in urls:
+        if url:
+            db.query(Blob).filter(Blob.url == url, Blob.ref_count > 0).update(
+                {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+            )
+
+
+blob_store = BlobStore()
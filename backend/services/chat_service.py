@@ -1,48 +1,117 @@
 # services/chat_service.py
 
+import logging
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, case, func, select
 from models.chat import Message
 from models.user import User
-from typing import List
+from typing import List, Optional
 
-async def fetch_conversations(db: Session, user_id: int) -> List[dict]:
-    messages = db.query(Message).filter(
-        or_(
-            Message.sender_id == user_id,
-            Message.receiver_id == user_id
-        )
-    ).order_by(Message.timestamp.desc()).all()
-    
-    conversations = {}
-    for msg in messages:
-        friend_id = msg.receiver_id if msg.sender_id == user_id else msg.sender_id
-        if friend_id not in conversations:
-            friend = db.query(User).filter(User.id == friend_id).first()
-            if not friend:
-                continue
-            conversations[friend_id] = {
-                "user_id": friend_id,
-                "username": friend.username,
-                "avatar": friend.profile_picture,
-                "last_message": msg.content,
-                "file_url": msg.file_url,
-                "message_type": msg.message_type,
-                "timestamp": msg.timestamp,
-                "is_sender": msg.sender_id == user_id,
-                "unread_count": get_unread_count(db, friend_id, user_id)
-            }
-    return list(conversations.values())
-
-async def fetch_chat_history(db: Session, user_id: int, friend_id: int) -> List[dict]:
-    messages = db.query(Message).filter(
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_PAGE_SIZE = 50
+
+
+def ensure_message_indexes(engine: Engine) -> None:
+    """Create the messages indexes on databases made before they existed (create_all never alters tables)."""
+    for index in Message.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    logger.info("Ensured messages indexes")
+
+async def fetch_conversations(
+    db: Session,
+    user_id: int,
+    limit: Optional[int] = None,
+    offset: int = 0
+) -> List[dict]:
+    """
+    One row per chat partner, newest conversation first, in a single query.
+
+    Every message the user sent or received is ranked within its conversation
+    by a window function; the newest one per partner is kept and the unread
+    count is summed over the same partition.
+    """
+    partner_id = case((Message.sender_id == user_id, Message.receiver_id), else_=Message.sender_id)
+    ranked = select(
+        Message.id,
+        Message.sender_id,
+        Message.content,
+        Message.file_url,
+        Message.message_type,
+        Message.timestamp,
+        partner_id.label("partner_id"),
+        func.row_number().over(
+            partition_by=partner_id,
+            order_by=(Message.timestamp.desc(), Message.id.desc())
+        ).label("recency"),
+        func.sum(
+            case((and_(Message.receiver_id == user_id, Message.is_read.is_(False)), 1), else_=0)
+        ).over(partition_by=partner_id).label("unread_count")
+    ).where(
+        or_(Message.sender_id == user_id, Message.receiver_id == user_id)
+    ).subquery()
+
+    query = select(ranked, User.username, User.profile_picture).join(
+        User, User.id == ranked.c.partner_id
+    ).where(
+        ranked.c.recency == 1
+    ).order_by(
+        ranked.c.timestamp.desc(), ranked.c.id.desc()
+    ).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [
+        {
+            "user_id": row.partner_id,
+            "username": row.username,
+            "avatar": row.profile_picture,
+            "last_message": row.content,
+            "file_url": row.file_url,
+            "message_type": getattr(row.message_type, "value", row.message_type),
+            "timestamp": row.timestamp,
+            "is_sender": row.sender_id == user_id,
+            "unread_count": row.unread_count
+        }
+        for row in db.execute(query)
+    ]
+
+async def fetch_chat_history(
+    db: Session,
+    user_id: int,
+    friend_id: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = CHAT_HISTORY_PAGE_SIZE
+) -> List[Message]:
+    """
+    One page of a conversation, oldest first.
+
+    By default the latest `limit` messages. `before` pages back through older
+    history (ids below it); `after` is the sync mode for a reconnecting client
+    and returns the messages that arrived since that id, oldest first.
+    Only the delivered page is marked as read.
+    """
+    query = db.query(Message).filter(
         or_(
             and_(Message.sender_id == user_id, Message.receiver_id == friend_id),
             and_(Message.sender_id == friend_id, Message.receiver_id == user_id)
         )
-    ).order_by(Message.timestamp.asc()).all()
-    
-    mark_as_read(db, friend_id, user_id)
+    )
+    if before is not None:
+        query = query.filter(Message.id < before)
+    if after is not None:
+        query = query.filter(Message.id > after)
+
+    if after is not None:
+        messages = query.order_by(Message.id.asc()).limit(limit).all()
+    else:
+        messages = query.order_by(Message.id.desc()).limit(limit).all()
+        messages.reverse()
+
+    if any(m.sender_id == friend_id and not m.is_read for m in messages):
+        mark_as_read(db, friend_id, user_id, messages[0].id, messages[-1].id)
     return messages
 
 def get_unread_count(db: Session, sender_id: int, receiver_id: int) -> int:
@@ -52,10 +121,22 @@ def get_unread_count(db: Session, sender_id: int, receiver_id: int) -> int:
         Message.is_read.is_(False)
     ).count()
 
-def mark_as_read(db: Session, sender_id: int, receiver_id: int) -> None:
-    db.query(Message).filter(
+def mark_as_read(
+    db: Session,
+    sender_id: int,
+    receiver_id: int,
+    from_id: Optional[int] = None,
+    to_id: Optional[int] = None
+) -> None:
+    """Mark messages from sender to receiver as read, optionally only ids in [from_id, to_id]."""
+    query = db.query(Message).filter(
         Message.sender_id == sender_id,
         Message.receiver_id == receiver_id,
         Message.is_read.is_(False)
-    ).update({"is_read": True})
+    )
+    if from_id is not None:
+        query = query.filter(Message.id >= from_id)
+    if to_id is not None:
+        query = query.filter(Message.id <= to_id)
+    query.update({"is_read": True}, synchronize_session="fetch")
     db.commit()
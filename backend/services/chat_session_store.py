@@ -0,0 +1,251 @@
+#bounded per-worker store of chatbot sessions: LRU with an idle TTL and a memory budget, evicted chats spilled to disk
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from services.vector_store import DocumentIndex
+
+logger = logging.getLogger(__name__)
+
+CHATBOT_SESSION_DIR = os.getenv("CHATBOT_SESSION_DIR", "chatbot_sessions")
+
+
+def chat_history(chat) -> List[Dict[str, Any]]:
+    """A Gemini chat's history as plain dicts, in the form `start_chat(history=...)` accepts."""
+    return [
+        {"role": content.role, "parts": [part.text for part in content.parts if getattr(part, "text", None)]}
+        for content in getattr(chat, "history", None) or []
+    ]
+
+
+class _Entry:
+    __slots__ = ("session", "document_hash", "index_bytes", "history_bytes", "expires")
+
+    def __init__(self, session: Dict[str, Any], document_hash: str, index_bytes: int):
+        self.session = session
+        self.document_hash = document_hash
+        self.index_bytes = index_bytes
+        self.history_bytes = 0
+        self.expires = 0.0
+
+    @property
+    def nbytes(self) -> int:
+        return self.index_bytes + self.history_bytes
+
+
+class ChatSessionStore:
+    """
+    user_id -> {"chat", "retriever"} for the users this worker has served.
+
+    Sessions are kept in LRU order and dropped when idle for `ttl` seconds,
+    when there are more than `max_sessions`, or when together they account
+    for more than `memory_budget` bytes: the size of each session's index
+    files (memory-mapped, so resident once searched) plus its chat history.
+    The most recently used session is always kept, whatever its size.
+
+    Sizes are kept as running totals: a session's history is measured once
+    when it is stored and then grows by each turn passed to `account_turn`.
+
+    An evicted session's index is already on disk; only the references are
+    dropped, and the mappings go away once no request is still using them.
+    Its chat history is written to `spill_dir` (after the lock is released)
+    and picked up again by `take_history` when the user comes back, on this
+    worker or another one sharing the directory.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 200,
+        ttl: float = 1800.0,
+        memory_budget: int = 256 * 1024 * 1024,
+        spill_dir: str = CHATBOT_SESSION_DIR
+    ):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self.spill_dir = Path(spill_dir)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._index_bytes = 0
+        self._history_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spilled = 0
+
+    # Access
+
+    def get(self, user_id: int, document_hash: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The user's session, or None; also None (and dropped) if it isn't about `document_hash`."""
+        with self._lock:
+            evicted = self._expire()
+            entry = self._entries.get(user_id)
+            if entry is not None and document_hash is not None and entry.document_hash != document_hash:
+                # The user has since uploaded another PDF, possibly on another worker
+                self._remove(user_id)
+                entry = None
+            if entry is not None:
+                self._touch(user_id, entry)
+        self._spill_evicted(evicted)
+        return entry.session if entry is not None else None
+
+    def put(self, user_id: int, session: Dict[str, Any], document_hash: str) -> Dict[str, Any]:
+        """Store a session for `user_id`, replacing (not spilling) any previous one."""
+        index = getattr(session.get("retriever"), "index", None)
+        entry = _Entry(session, document_hash, index.nbytes if isinstance(index, DocumentIndex) else 0)
+        entry.history_bytes = _history_bytes(session)
+        with self._lock:
+            self._remove(user_id)
+            evicted = self._expire()
+            self._entries[user_id] = entry
+            self._index_bytes += entry.index_bytes
+            self._history_bytes += entry.history_bytes
+            self._touch(user_id, entry)
+            evicted += self._enforce()
+        self._spill_evicted(evicted)
+        return session
+
+    def account_turn(self, user_id: int, prompt: str, answer: str) -> None:
+        """Count a question and answer just added to the user's chat against the budget."""
+        nbytes = len(prompt.encode("utf-8")) + len(answer.encode("utf-8"))
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            entry.history_bytes += nbytes
+            self._history_bytes += nbytes
+            evicted = self._enforce()
+        self._spill_evicted(evicted)
+
+    def __getitem__(self, user_id: int) -> Dict[str, Any]:
+        session = self.get(user_id)
+        if session is None:
+            raise KeyError(user_id)
+        return session
+
+    def discard(self, user_id: int) -> None:
+        with self._lock:
+            self._remove(user_id)
+
+    def __contains__(self, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index_bytes = self._history_bytes = 0
+
+    # Eviction (under the lock; the evicted entries are spilled by the caller once it is released)
+
+    def _remove(self, user_id: int) -> Optional[_Entry]:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._index_bytes -= entry.index_bytes
+            self._history_bytes -= entry.history_bytes
+        return entry
+
+    def _touch(self, user_id: int, entry: _Entry) -> None:
+        entry.expires = time.monotonic() + self.ttl
+        self._entries.move_to_end(user_id)
+
+    def _expire(self) -> List[Tuple[int, _Entry]]:
+        # A sliding TTL keeps expiry in LRU order: expired sessions are at the front
+        now = time.monotonic()
+        evicted = []
+        while self._entries:
+            user_id, entry = next(iter(self._entries.items()))
+            if entry.expires > now:
+                break
+            evicted.append((user_id, self._remove(user_id)))
+            self.expirations += 1
+        return evicted
+
+    def _enforce(self) -> List[Tuple[int, _Entry]]:
+        evicted = []
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_sessions
+            or self._index_bytes + self._history_bytes > self.memory_budget
+        ):
+            user_id = next(iter(self._entries))
+            evicted.append((user_id, self._remove(user_id)))
+            self.evictions += 1
+        return evicted
+
+    def _spill_evicted(self, evicted: List[Tuple[int, _Entry]]) -> None:
+        for user_id, entry in evicted:
+            history = chat_history(entry.session.get("chat"))
+            if history:
+                self._spill(user_id, entry.document_hash, history)
+
+    # Spilled chat histories
+
+    def _path(self, user_id: int) -> Path:
+        return self.spill_dir / f"{user_id}.json"
+
+    def _spill(self, user_id: int, document_hash: str, history: List[Dict[str, Any]]) -> None:
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.spill_dir / f".{user_id}.{uuid.uuid4().hex}.tmp"
+            tmp_path.write_text(json.dumps({"document_hash": document_hash, "history": history}), encoding="utf-8")
+            os.replace(tmp_path, self._path(user_id))
+            with self._lock:
+                self.spilled += 1
+        except OSError:
+            logger.exception("Could not spill the chatbot history of user %s", user_id)
+
+    def take_history(self, user_id: int, document_hash: str) -> List[Dict[str, Any]]:
+        """The spilled history of `user_id`'s chat about `document_hash` (removed from disk), or []."""
+        path = self._path(user_id)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+            path.unlink()
+        except (OSError, ValueError):
+            return []
+        return record["history"] if record.get("document_hash") == document_hash else []
+
+    def discard_history(self, user_id: int) -> None:
+        """Forget a spilled chat, e.g. once the user uploads a different PDF."""
+        try:
+            self._path(user_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    # Metrics
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            evicted = self._expire()
+        self._spill_evicted(evicted)
+        with self._lock:
+            return {
+                "sessions": len(self._entries),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl,
+                "bytes": self._index_bytes + self._history_bytes,
+                "index_bytes": self._index_bytes,
+                "history_bytes": self._history_bytes,
+                "memory_budget_bytes": self.memory_budget,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "spilled": self.spilled
+            }
+
+
+def _history_bytes(session: Dict[str, Any]) -> int:
+    return sum(len(text.encode("utf-8")) for content in chat_history(session.get("chat")) for text in content["parts"])
+
+
+chat_session_store = ChatSessionStore(
+    max_sessions=int(os.getenv("CHATBOT_MAX_SESSIONS", "200")),
+    ttl=float(os.getenv("CHATBOT_SESSION_TTL", "1800")),
+    memory_budget=int(float(os.getenv("CHATBOT_SESSION_MEMORY_MB", "256")) * 1024 * 1024)
+)
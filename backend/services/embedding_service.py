@@ -0,0 +1,183 @@
+#one embedding model per process, with embedding requests from concurrent uploads batched together
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from statistics import median
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en")
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "false").lower() == "true"
+LATENCY_SAMPLES = 1000
+
+
+def load_huggingface_embeddings() -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"})
+
+
+class EmbeddingService(Embeddings):
+    """
+    The process-wide embedding model behind the chatbot.
+
+    The model is loaded once, on first use or by `warm_up()` at startup.
+    Callers block on `embed_documents` / `embed_query` as with any
+    langchain Embeddings, but their texts go through a queue: a collector
+    thread takes whatever is waiting (up to `max_batch_size` texts, or
+    whatever arrived within `max_wait` seconds of the first request) and
+    runs it as one model call on a dedicated pool of `workers` threads.
+    Concurrent uploads therefore share large CPU batches instead of
+    running many small ones side by side.
+    """
+
+    def __init__(
+        self,
+        model_factory: Callable[[], Embeddings] = load_huggingface_embeddings,
+        max_batch_size: int = 128,
+        max_wait: float = 0.01,
+        workers: int = 1
+    ):
+        self._model_factory = model_factory
+        self._model: Optional[Embeddings] = None
+        self._model_lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self._queue: "queue.Queue[Tuple[List[str], Future, float]]" = queue.Queue()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._collector: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.model_load_seconds: Optional[float] = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+
+    # Model
+
+    @property
+    def model(self) -> Embeddings:
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    self._model = self._model_factory()
+                    self.model_load_seconds = time.perf_counter() - started
+                    logger.info("Embedding model loaded in %.2fs", self.model_load_seconds)
+        return self._model
+
+    def warm_up(self) -> None:
+        """Load the model and run one embedding, so the first upload doesn't pay for either."""
+        self.model.embed_query("warm up")
+
+    # Langchain Embeddings interface
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.submit(list(texts)).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit([text]).result()[0]
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue `texts` for the next batch; the future resolves to their vectors, in order."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future
+
+    # Batching
+
+    def _ensure_started(self) -> None:
+        if self._collector is None:
+            with self._start_lock:
+                if self._collector is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embedding")
+                    self._collector = threading.Thread(target=self._collect, name="embedding-batcher", daemon=True)
+                    self._collector.start()
+
+    def _collect(self) -> None:
+        # At most `workers` batches in flight; the rest keep accumulating in the queue
+        slots = threading.Semaphore(self.workers)
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                try:
+                    request = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)  # Finish this batch, then stop
+                    break
+                batch.append(request)
+                size += len(request[0])
+            slots.acquire()
+            self._executor.submit(self._run_batch, batch).add_done_callback(lambda _: slots.release())
+
+    def _run_batch(self, batch: List[Tuple[List[str], Future, float]]) -> None:
+        texts = [text for request_texts, _, _ in batch for text in request_texts]
+        started = time.perf_counter()
+        try:
+            vectors = self.model.embed_documents(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        position = 0
+        for request_texts, future, queued_at in batch:
+            future.set_result(vectors[position:position + len(request_texts)])
+            position += len(request_texts)
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.busy_seconds += finished - started
+            self._latencies.extend(finished - queued_at for _, _, queued_at in batch)
+
+    # Metrics and lifecycle
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            return {
+                "model_loaded": self._model is not None,
+                "model_load_seconds": round(self.model_load_seconds, 3) if self.model_load_seconds is not None else None,
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "queued": self._queue.qsize(),
+                "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else None,
+                "texts_per_second": round(self.texts / self.busy_seconds, 1) if self.busy_seconds else None,
+                "latency_ms_p50": round(median(latencies) * 1000, 2) if latencies else None,
+                "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2)
+                if latencies else None,
+            }
+
+    def shutdown(self) -> None:
+        if self._collector is not None:
+            self._queue.put(None)
+            self._collector.join()
+            self._executor.shutdown(wait=True)
+            self._collector = self._executor = None
+
+
+embedding_service = EmbeddingService(
+    max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "128")),
+    max_wait=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "10")) / 1000,
+    workers=int(os.getenv("EMBEDDING_WORKERS", "1"))
+)
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from database.session import SessionLocal
+from models.job import OutboxJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# name -> handler(db, **payload); filled by the @job decorator
+JOB_HANDLERS: Dict[str, Callable[..., Any]] = {}
+
+# Session.info key holding the ids of jobs enqueued by the handler running in that session
+_CHILD_JOBS = "job_queue_children"
+
+def job(name: str):
+    """
+    Register a function as a background job handler under `name`.
+
+    Handlers must not commit: the queue commits their writes together with
+    marking the job done, so a job that dies halfway leaves nothing behind
+    and can safely run again.
+    """
+    def register(func: Callable[..., Any]) -> Callable[..., Any]:
+        JOB_HANDLERS[name] = func
+        return func
+    return register
+
+
+class JobQueue:
+    """
+    In-process async job queue backed by the `job_outbox` table.
+
+    Jobs are written to the outbox before they are dispatched, so pending work
+    is picked up again after a restart. Handlers are synchronous (they use the
+    ORM) and run on worker threads; failures are retried with exponential
+    backoff until `max_attempts` is reached. Finished jobs are deleted once
+    they are older than `retention_seconds`, at start and then every
+    `purge_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_attempts: int = 5,
+        retry_base_delay: float = 0.5,
+        lease_seconds: int = 300,
+        retention_seconds: float = 7 * 24 * 3600,
+        purge_interval: float = 3600.0,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.lease = timedelta(seconds=lease_seconds)
+        self.retention = timedelta(seconds=retention_seconds)
+        self.purge_interval = purge_interval
+        self._session_factory = session_factory
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._enqueued_at: Dict[int, float] = {}
+        self._delayed = 0
+        self._in_flight = 0
+        self._unfinished = 0  # Dispatched but not yet run, across threads
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=1000)
+        self._run_times = deque(maxlen=1000)
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.purged = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self.purge)
+        for job_id in await asyncio.to_thread(self._recover):
+            self._dispatch(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_periodically()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self._unfinished = 0
+        self._delayed = 0
+
+    async def join(self) -> None:
+        """Wait until every dispatched job, including scheduled retries, has finished."""
+        while self._unfinished:
+            await asyncio.sleep(0.01)
+
+    def enqueue(self, db: Session, name: str, **payload: Any) -> OutboxJob:
+        return self.enqueue_many(db, [(name, payload)])[0]
+
+    def enqueue_many(self, db: Session, jobs: List[Tuple[str, Dict[str, Any]]]) -> List[OutboxJob]:
+        """
+        Persist the jobs in one commit, then hand them to the workers.
+
+        Called from a job handler, the jobs are only flushed: they are committed
+        with that job and dispatched once it is done.
+        """
+        for name, _ in jobs:
+            if name not in JOB_HANDLERS:
+                raise ValueError(f"Unknown job: {name}")
+        rows = [OutboxJob(name=name, payload=json.dumps(payload)) for name, payload in jobs]
+        db.add_all(rows)
+        children = db.info.get(_CHILD_JOBS)
+        if children is not None:
+            db.flush()
+            children.extend(row.id for row in rows)
+            return rows
+        db.commit()
+        for row in rows:
+            self._dispatch(row.id)
+        return rows
+
+    def purge(self) -> int:
+        """Delete done and failed jobs that finished more than `retention` ago. Returns how many."""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        db = self._session_factory()
+        try:
+            deleted = db.query(OutboxJob).filter(
+                OutboxJob.status.in_([JobStatus.DONE, JobStatus.FAILED]),
+                OutboxJob.finished_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        with self._lock:
+            self.purged += deleted
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            processed, failed, retried, purged = self.processed, self.failed, self.retried, self.purged
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "depth": (self._queue.qsize() if self._queue else 0) + self._delayed,
+            "in_flight": self._in_flight,
+            "processed": processed,
+            "failed": failed,
+            "retried": retried,
+            "purged": purged,
+            "wait_ms": _summarize(self._wait_times),
+            "run_ms": _summarize(self._run_times),
+        }
+
+    # ----------------------------------------
+    # Dispatch
+    # ----------------------------------------
+
+    def _dispatch(self, job_id: int, delay: float = 0) -> None:
+        # Without a running loop the job stays pending in the outbox until the next start()
+        if self._loop is None:
+            return
+        with self._lock:
+            self._unfinished += 1
+        self._loop.call_soon_threadsafe(self._schedule, job_id, delay)
+
+    def _schedule(self, job_id: int, delay: float) -> None:
+        if delay:
+            self._delayed += 1
+            self._loop.call_later(delay, self._put_delayed, job_id)
+        else:
+            self._put(job_id)
+
+    def _put_delayed(self, job_id: int) -> None:
+        self._delayed -= 1
+        self._put(job_id)
+
+    def _put(self, job_id: int) -> None:
+        self._enqueued_at[job_id] = time.monotonic()
+        self._queue.put_nowait(job_id)
+
+    def _recover(self) -> List[int]:
+        db = self._session_factory()
+        try:
+            rows = db.query(OutboxJob.id).filter(self._claimable()).order_by(OutboxJob.id).all()
+            return [job_id for (job_id,) in rows]
+        finally:
+            db.close()
+
+    def _claimable(self):
+        # Pending jobs, plus running ones whose worker died without releasing them
+        stale = datetime.now(timezone.utc) - self.lease
+        return or_(
+            OutboxJob.status == JobStatus.PENDING,
+            (OutboxJob.status == JobStatus.RUNNING) & (OutboxJob.locked_at < stale)
+        )
+
+    # ----------------------------------------
+    # Execution
+    # ----------------------------------------
+
+    async def _purge_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await asyncio.to_thread(self.purge)
+            except Exception:
+                logger.exception("Purging finished jobs failed")
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await asyncio.to_thread(self._run, job_id)
+            except Exception:
+                logger.exception("Job %s crashed the worker", job_id)
+            finally:
+                self._in_flight -= 1
+                with self._lock:
+                    self._unfinished -= 1
+                self._queue.task_done()
+
+    def _claim(self, db: Session, job_id: int) -> Optional[OutboxJob]:
+        # Conditional UPDATE so two workers (or processes) never run the same job
+        claimed = db.query(OutboxJob).filter(OutboxJob.id == job_id, self._claimable()).update(
+            {
+                OutboxJob.status: JobStatus.RUNNING,
+                OutboxJob.attempts: OutboxJob.attempts + 1,
+                OutboxJob.locked_at: datetime.now(timezone.utc)
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        return db.get(OutboxJob, job_id) if claimed else None
+
+    def _run(self, job_id: int) -> None:
+        enqueued_at = self._enqueued_at.pop(job_id, None)
+        db = self._session_factory()
+        try:
+            row = self._claim(db, job_id)
+            if not row:
+                return
+            if enqueued_at is not None:
+                self._wait_times.append((time.monotonic() - enqueued_at) * 1000)
+
+            # The handler's writes, the jobs it enqueues and the DONE mark commit together
+            children = db.info[_CHILD_JOBS] = []
+            started = time.monotonic()
+            try:
+                JOB_HANDLERS[row.name](db, **json.loads(row.payload))
+                row.status = JobStatus.DONE
+                row.finished_at = datetime.now(timezone.utc)
+                row.last_error = None
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                del db.info[_CHILD_JOBS]
+                self._record_failure(db, row, e)
+                return
+            finally:
+                self._run_times.append((time.monotonic() - started) * 1000)
+
+            del db.info[_CHILD_JOBS]
+            with self._lock:
+                self.processed += 1
+            for child_id in children:
+                self._dispatch(child_id)
+        finally:
+            db.close()
+
+    def _record_failure(self, db: Session, row: OutboxJob, error: Exception) -> None:
+        row.last_error = repr(error)
+        if row.attempts >= self.max_attempts:
+            logger.error("Job %s (%s) failed permanently: %r", row.id, row.name, error)
+            row.status = JobStatus.FAILED
+            row.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            with self._lock:
+                self.failed += 1
+            return
+
+        row.status = JobStatus.PENDING
+        db.commit()
+        with self._lock:
+            self.retried += 1
+        self._dispatch(row.id, delay=self.retry_base_delay * 2 ** (row.attempts - 1))
+
+
+def _summarize(samples: deque) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"avg": None, "p95": None, "max": None}
+    ordered = sorted(samples)
+    return {
+        "avg": round(sum(ordered) / len(ordered), 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+job_queue = JobQueue(
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_DAYS", "7")) * 24 * 3600
+)
@@ -0,0 +1,79 @@
+#the language model behind the chatbot: Gemini, or a local stub for tests and benchmarks (LLM_BACKEND=gemini|stub)
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+
+
+def _content(message: Any) -> Any:
+    # Dicts as accepted by Gemini's start_chat(history=...), stored like its Content objects
+    if isinstance(message, dict):
+        return SimpleNamespace(role=message["role"], parts=[SimpleNamespace(text=text) for text in message["parts"]])
+    return message
+
+
+class StubChat:
+    """A chat that answers locally; same surface as a Gemini ChatSession."""
+
+    def __init__(self, model: "StubModel", history: Optional[Iterable[Any]] = None):
+        self._model = model
+        self._history = [_content(message) for message in history or []]
+
+    @property
+    def history(self) -> List[Any]:
+        return list(self._history)
+
+    @history.setter
+    def history(self, history: Iterable[Any]) -> None:
+        self._history = [_content(message) for message in history]
+
+    def send_message(self, prompt: str) -> SimpleNamespace:
+        response = self._model.generate_content(prompt)
+        self._history += [_content({"role": "user", "parts": [prompt]}), _content({"role": "model", "parts": [response.text]})]
+        return response
+
+
+class StubModel:
+    """
+    Stands in for a Gemini GenerativeModel without network access or an API key.
+
+    Answers echo the question (the last line of the prompt) after `delay`
+    seconds, so tests can assert on them and benchmarks can simulate the
+    latency of the real model. `calls` counts upstream requests.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str) -> SimpleNamespace:
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        question = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+        return SimpleNamespace(text=f"Stub answer: {question}")
+
+    def start_chat(self, history: Optional[Iterable[Any]] = None) -> StubChat:
+        return StubChat(self, history)
+
+
+def create_llm_client(backend: str = LLM_BACKEND):
+    """A model with Gemini's `generate_content` / `start_chat` interface."""
+    if backend == "stub":
+        return StubModel(delay=float(os.getenv("LLM_STUB_DELAY_MS", "0")) / 1000)
+    if backend != "gemini":
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}")
+    import google.generativeai as genai
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+def record_turn(chat, prompt: str, answer: str) -> None:
+    """Add a question and its answer to `chat` without asking the model (an answer served from cache)."""
+    turn: List[Dict[str, Any]] = [{"role": "user", "parts": [prompt]}, {"role": "model", "parts": [answer]}]
+    chat.history = [*chat.history, *turn]
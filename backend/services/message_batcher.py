@@ -0,0 +1,173 @@
+# services/message_batcher.py
+#write-behind persistence for chat messages, so the websocket loop never blocks on a commit
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from database.session import SessionLocal
+from models.chat import Message, MessageType
+from services.message_service import prepare_message_event
+
+logger = logging.getLogger(__name__)
+
+_Result = Union[Dict[str, Any], Exception]
+
+
+class MessageBatcher:
+    """
+    Group-commits chat messages on a worker thread.
+
+    `submit` validates a message, stamps it, queues it and waits until it is
+    stored. A single flusher task writes whatever has queued up once
+    `max_delay` seconds have passed or `max_batch` messages are waiting,
+    using one multi-row INSERT ... RETURNING and one commit. Batches are
+    written one at a time in arrival order, so ids, timestamps and history
+    order within every conversation follow the order messages came in.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 200,
+        max_delay: float = 0.005,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._session_factory = session_factory
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._has_pending: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.batches = 0
+        self.written = 0
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything still queued, then stop the flusher."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._has_pending.set()
+        self._batch_full.set()
+        await self._flusher
+        self._flusher = None
+
+    async def submit(
+        self,
+        sender_id: int,
+        receiver_id: int,
+        content: Optional[str],
+        file_url: Optional[str] = None,
+        message_type: str = "text"
+    ) -> Dict[str, Any]:
+        """Queue a message and return its event (with the assigned id) once it is stored."""
+        # Checked here so one bad message cannot fail the batch it would have joined
+        message_type = MessageType(message_type)
+        if not self.running:
+            await self.start()
+
+        row = {
+            "sender_id": sender_id,
+            "receiver_id": receiver_id,
+            "content": content,
+            "file_url": file_url,
+            "message_type": message_type,
+            "timestamp": datetime.now(timezone.utc),
+            "is_read": False
+        }
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((row, future))
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._batch_full.set()
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            if not self._stopping:
+                # Give the batch a moment to fill, unless it already has
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            if self._pending:
+                await self._flush()
+            if self._stopping and not self._pending:
+                return
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if not self._pending:
+            self._has_pending.clear()
+        if len(self._pending) < self.max_batch:
+            self._batch_full.clear()
+
+        try:
+            results = await asyncio.to_thread(self._write, [row for row, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        self.batches += 1
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue  # Sender went away while waiting
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> List[_Result]:
+        db = self._session_factory()
+        try:
+            try:
+                ids = db.execute(
+                    insert(Message).returning(Message.id, sort_by_parameter_order=True), rows
+                ).scalars().all()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(rows) == 1:
+                    return [e]
+                # Find the offending rows without failing the rest of the batch
+                logger.warning("Batch insert of %d chat messages failed; retrying one by one", len(rows))
+                return [self._write_one(db, row) for row in rows]
+            self.written += len(rows)
+            return [_message_event(row, message_id) for row, message_id in zip(rows, ids)]
+        finally:
+            db.close()
+
+    def _write_one(self, db: Session, row: Dict[str, Any]) -> _Result:
+        try:
+            message_id = db.execute(insert(Message).returning(Message.id), row).scalar_one()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            return e
+        self.written += 1
+        return _message_event(row, message_id)
+
+
+def _message_event(row: Dict[str, Any], message_id: int) -> Dict[str, Any]:
+    return prepare_message_event(Message(id=message_id, **row))
+
+
+message_batcher = MessageBatcher(
+    max_batch=int(os.getenv("CHAT_BATCH_SIZE", "200")),
+    max_delay=float(os.getenv("CHAT_BATCH_DELAY_MS", "5")) / 1000
+)
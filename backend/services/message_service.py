@@ -26,7 +26,7 @@ def prepare_message_event(message: Message) -> dict:
         "receiver_id": message.receiver_id,
         "content": message.content,
         "file_url": message.file_url,
-        "message_type": message.message_type,
+        "message_type": getattr(message.message_type, "value", message.message_type),
         "timestamp": message.timestamp.isoformat(),
         "is_read": message.is_read
     }
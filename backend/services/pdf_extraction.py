@@ -0,0 +1,165 @@
+#PDF text extraction for the chatbot: spooled to disk, pages extracted in parallel processes, streamed out as chunks
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional
+import fitz  # PyMuPDF
+from langchain_text_splitters import TextSplitter
+from core.upload_pipeline import iter_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class PdfExtractionError(Exception):
+    """The file could not be read as a PDF (as opposed to a fault of the server)."""
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    # Runs in a worker process; each one opens the spooled file itself
+    try:
+        with fitz.open(path) as doc:
+            return [doc[number].get_text() for number in range(start, stop)]
+    except RuntimeError as e:  # PyMuPDF's FileDataError and other MuPDF errors
+        raise PdfExtractionError(str(e)) from e
+
+
+async def spool_to_tempfile(upload, suffix: str = ".pdf") -> str:
+    """Copy an upload to a named temporary file chunk by chunk; the caller deletes it."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="chatbot-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in iter_chunks(upload):
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class ExtractionProgress:
+    """How far an upload has got; read by the progress endpoint while the upload runs."""
+
+    def __init__(self):
+        self.pages_total = 0
+        self.pages_done = 0
+        self.chunks = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": "processing",
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "chunks": self.chunks
+        }
+
+
+class PdfExtractor:
+    """
+    Extracts page text on a pool of worker processes (PyMuPDF holds the GIL).
+
+    Pages are handed out in slices of `pages_per_task`, at most two slices
+    per worker ahead of the consumer, and come back in page order, so a
+    500-page document is never held in memory as a whole: the text is
+    split into chunks as the pages arrive and each chunk can be embedded
+    while later pages are still being read. Documents of a single slice
+    are read in the calling thread. The pool starts on first use.
+    """
+
+    def __init__(self, workers: Optional[int] = None, pages_per_task: int = 16):
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent has an event loop and worker threads running
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def iter_pages(self, path: str, progress: Optional[ExtractionProgress] = None) -> Iterator[str]:
+        """Text of each page, in order. Blocking; run it off the event loop. Raises PdfExtractionError."""
+        try:
+            with fitz.open(path) as doc:
+                page_count = doc.page_count
+        except RuntimeError as e:
+            raise PdfExtractionError(str(e)) from e
+        if progress is not None:
+            progress.pages_total = page_count
+        slices = [(start, min(start + self.pages_per_task, page_count))
+                  for start in range(0, page_count, self.pages_per_task)]
+        if len(slices) <= 1:
+            results = iter([_extract_pages(path, start, stop) for start, stop in slices])
+        else:
+            results = self._parallel(path, slices)
+        for pages in results:
+            if progress is not None:
+                progress.pages_done += len(pages)
+            yield from pages
+
+    def _parallel(self, path: str, slices) -> Iterator[List[str]]:
+        executor = self._get_executor()
+        pending: Deque[Future] = deque()
+        remaining = iter(slices)
+        try:
+            for start, stop in remaining:
+                pending.append(executor.submit(_extract_pages, path, start, stop))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                pages = pending.popleft().result()
+                for start, stop in remaining:
+                    pending.append(executor.submit(_extract_pages, path, start, stop))
+                    break
+                yield pages
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def iter_chunks(
+        self,
+        path: str,
+        splitter: TextSplitter,
+        progress: Optional[ExtractionProgress] = None
+    ) -> Iterator[str]:
+        """
+        The document's text split by `splitter`, as pages arrive.
+
+        The last chunk of what has been read so far is carried over and
+        re-split with the next page, so chunks span page boundaries the same
+        way they would if the whole text were split at once.
+        """
+        carry = ""
+        for page in self.iter_pages(path, progress):
+            # The splitter strips the carried piece; put back the page break it ended on
+            text = f"{carry}\n{page}" if carry else page
+            pieces = splitter.split_text(text) if text.strip() else []
+            if not pieces:
+                continue
+            for piece in pieces[:-1]:
+                if progress is not None:
+                    progress.chunks += 1
+                yield piece
+            carry = pieces[-1]
+        if carry:
+            if progress is not None:
+                progress.chunks += 1
+            yield carry
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+pdf_extractor = PdfExtractor(workers=int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or None)
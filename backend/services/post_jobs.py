@@ -0,0 +1,44 @@
+#background side effects of creating a post, run by the job queue after the response is sent
+import logging
+from sqlalchemy.orm import Session
+from models.post import Post
+from AI.moderation import moderate_text
+from services.job_queue import job, job_queue
+from services.NotificationHandler import notify_connections
+from utils.post_utils import tag_post_hashtags
+
+logger = logging.getLogger(__name__)
+
+SEND_POST_NOTIFICATIONS = "send_post_notifications"
+TAG_POST_HASHTAGS = "tag_post_hashtags"
+MODERATE_POST = "moderate_post"
+
+
+@job(SEND_POST_NOTIFICATIONS)
+def send_post_notifications_job(db: Session, author_id: int, post_id: int, notification_type: str = "new_post") -> None:
+    if db.query(Post.id).filter(Post.id == post_id).first():
+        notify_connections(db, author_id, post_id, notification_type)
+
+@job(TAG_POST_HASHTAGS)
+def tag_post_hashtags_job(db: Session, post_id: int) -> None:
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if post:
+        tag_post_hashtags(db, post)
+
+@job(MODERATE_POST)
+def moderate_post_job(db: Session, post_id: int) -> None:
+    """Queue a post's side effects; a post whose text fails moderation is held back from its author's connections."""
+    post = db.query(Post).filter(Post.id == post_id).first()
+    if not post:
+        return
+    jobs = [(TAG_POST_HASHTAGS, {"post_id": post.id})]
+    if moderate_text(post.content):
+        # Flagged for review only: the post stays up, it just isn't announced
+        logger.warning("Post %s flagged by moderation; not notifying connections", post_id)
+    else:
+        jobs.append((SEND_POST_NOTIFICATIONS, {"author_id": post.user_id, "post_id": post.id}))
+    job_queue.enqueue_many(db, jobs)
+
+def enqueue_post_side_effects(db: Session, post_id: int) -> None:
+    """Queue everything a new post triggers. Moderation goes first, so flagged posts notify nobody."""
+    job_queue.enqueue(db, MODERATE_POST, post_id=post_id)
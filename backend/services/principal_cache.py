@@ -0,0 +1,119 @@
+#process-wide cache of the users behind JWTs, so authenticated requests skip the user lookup
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from models.user import User
+
+
+class PrincipalCache:
+    """
+    LRU of token subject (username) -> detached copy of the user, with a TTL.
+
+    Entries are dropped whenever a User row is updated or deleted through
+    the ORM (profile updates, email verification, password resets), so a
+    worker never serves a stale user it changed itself. Other workers catch
+    up within `ttl` seconds. Entries are dropped again when the change
+    commits, in case another request re-cached the old row in between.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, db: Session, subject: str) -> Optional[User]:
+        """The cached user attached to `db` without a query, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            snapshot = entry[1]
+        # A per-request copy: the session can lazy-load and persist changes as usual
+        return db.merge(snapshot, load=False)
+
+    def put(self, subject: str, user: User) -> None:
+        snapshot = _detached_copy(user)
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str) -> None:
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+def _detached_copy(user: User) -> User:
+    # Column values only; relationships are loaded by whichever session the copy is merged into
+    copy = User(**{column.key: getattr(user, column.key) for column in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+principal_cache = PrincipalCache(
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "60"))
+)
+
+
+_STALE_SUBJECTS = "principal_cache_stale_subjects"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User) -> None:
+    # Both the current and, after a rename, the previous username
+    history = inspect(target).attrs.username.history
+    subjects = {username for username in (target.username, *history.deleted) if username}
+    for username in subjects:
+        principal_cache.invalidate(username)
+    # Until commit, other requests still read (and may re-cache) the old row; drop it again then
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(_STALE_SUBJECTS, set()).update(subjects)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for username in session.info.pop(_STALE_SUBJECTS, ()):
+        principal_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop(_STALE_SUBJECTS, None)
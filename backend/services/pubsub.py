@@ -0,0 +1,184 @@
+# services/pubsub.py
+#publish/subscribe used to fan real-time events out to every worker process
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PubSubBackend(ABC):
+    """
+    Delivers JSON messages published on a channel to every subscribed handler.
+
+    Handlers are registered with `subscribe` before `start`; each process
+    registers its own and only ever touches its own local state (e.g. the
+    websockets it holds), so a backend that reaches every process is enough
+    to make fan-out work across workers.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._subscribers[channel].append(handler)
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        """Deliver `message` to the `channel` subscribers of every process."""
+
+    async def _deliver(self, channel: str, message: Dict[str, Any]) -> None:
+        for handler in list(self._subscribers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("Subscriber on %s failed", channel)
+
+
+class InMemoryPubSub(PubSubBackend):
+    """Single-process backend: publishing calls the local subscribers directly."""
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        await self._deliver(channel, message)
+
+
+class PostgresPubSub(PubSubBackend):
+    """
+    Cross-process backend built on Postgres LISTEN/NOTIFY.
+
+    Each process keeps one dedicated autocommit connection that LISTENs on
+    every subscribed channel; the event loop watches its socket and hands
+    notifications to the subscribers in arrival order. Publishing is a
+    `pg_notify` on a pooled connection, so a publisher also receives its own
+    messages back and local delivery takes the same path as remote delivery.
+    """
+
+    # NOTIFY payloads must be shorter than 8000 bytes
+    MAX_PAYLOAD_BYTES = 7999
+
+    def __init__(self, engine: Engine, reconnect_delay: float = 1.0):
+        super().__init__()
+        self._engine = engine
+        self.reconnect_delay = reconnect_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._conn = None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._reconnect: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._consumer:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._inbox = asyncio.Queue()
+        self._consumer = asyncio.create_task(self._consume())
+        await self._connect()
+
+    async def stop(self) -> None:
+        for task in (self._reconnect, self._consumer):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._reconnect = self._consumer = None
+        self._close_listener()
+
+    async def publish(self, channel: str, message: Dict[str, Any]) -> None:
+        payload = json.dumps(message)
+        if len(payload.encode()) > self.MAX_PAYLOAD_BYTES:
+            raise ValueError(f"Payload of {len(payload.encode())} bytes is too large for NOTIFY")
+        await asyncio.to_thread(self._notify, channel, payload)
+
+    def _notify(self, channel: str, payload: str) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+    # ----------------------------------------
+    # Listener connection
+    # ----------------------------------------
+
+    async def _connect(self) -> None:
+        self._conn = await asyncio.to_thread(self._open_listener)
+        self._loop.add_reader(self._conn.fileno(), self._on_readable)
+
+    def _open_listener(self):
+        # Take a connection out of the pool for good; LISTEN is bound to the session
+        pooled = self._engine.raw_connection()
+        pooled.detach()
+        conn = pooled.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for channel in self._subscribers:
+                cursor.execute(f'LISTEN "{channel}"')
+        return conn
+
+    def _close_listener(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._conn.fileno())
+        except Exception:
+            pass
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    def _on_readable(self) -> None:
+        try:
+            self._conn.poll()
+        except Exception:
+            logger.exception("Lost the LISTEN connection; reconnecting")
+            self._close_listener()
+            self._reconnect = self._loop.create_task(self._reconnect_loop())
+            return
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            self._inbox.put_nowait((notify.channel, notify.payload))
+
+    async def _reconnect_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self._connect()
+                return
+            except Exception:
+                logger.exception("Reconnecting the LISTEN connection failed")
+
+    async def _consume(self) -> None:
+        while True:
+            channel, payload = await self._inbox.get()
+            try:
+                message = json.loads(payload)
+            except ValueError:
+                logger.warning("Dropping malformed payload on %s", channel)
+                continue
+            await self._deliver(channel, message)
+
+
+def create_pubsub_backend(name: Optional[str] = None) -> PubSubBackend:
+    """Build the backend named by `name` or the PUBSUB_BACKEND env var ("memory" or "postgres")."""
+    name = (name or os.getenv("PUBSUB_BACKEND", "memory")).lower()
+    if name == "memory":
+        return InMemoryPubSub()
+    if name == "postgres":
+        from database.session import engine
+        return PostgresPubSub(engine)
+    raise ValueError(f"Unknown pub/sub backend: {name}")
+
+
+pubsub = create_pubsub_backend()
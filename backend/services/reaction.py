@@ -1,3 +1,6 @@
+import logging
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from models.post import Like, Comment, Post
 from models.user import User
@@ -14,7 +17,11 @@ from typing import Any
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 API_URL = os.getenv("VITE_API_URL")
+# Recount Post.comment_count at startup; turn on for one deploy after upgrading, then off again
+RECONCILE_COUNTERS = os.getenv("RECONCILE_COUNTERS", "false").lower() == "true"
 
 def _get_like_target(like_data: LikeCreate) -> tuple[type, int]:
     return (Post, like_data.post_id) if like_data.post_id else (Comment, like_data.comment_id)
@@ -27,6 +34,57 @@ def _update_like_count(db: Session, like_data: LikeCreate, action: str) -> None:
         instance.like_count = max(0, instance.like_count + delta)
         db.commit()
 
+def _update_comment_count(db: Session, post_id: int, delta: int) -> None:
+    # Atomic in-SQL increment, flushed in the same transaction as the comment change
+    db.query(Post).filter(Post.id == post_id).update(
+        {Post.comment_count: func.coalesce(Post.comment_count, 0) + delta},
+        synchronize_session=False
+    )
+
+def add_comment(db: Session, comment: Comment) -> Comment:
+    db.add(comment)
+    _update_comment_count(db, comment.post_id, 1)
+    db.commit()
+    db.refresh(comment)
+    return comment
+
+def _count_thread(comment: Comment) -> int:
+    return 1 + sum(_count_thread(reply) for reply in comment.replies)
+
+def delete_comment(db: Session, comment: Comment) -> None:
+    removed = _count_thread(comment)  # Replies, and theirs, are cascade-deleted with their parent
+    post_id = comment.post_id
+    db.delete(comment)
+    _update_comment_count(db, post_id, -removed)
+    db.commit()
+
+def ensure_comment_count_column(engine: Engine) -> None:
+    """Add posts.comment_count to databases created before it existed (create_all never alters tables)."""
+    if engine.dialect.name == "postgresql":
+        statement = "ALTER TABLE posts ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0"
+    elif "comment_count" not in {column["name"] for column in inspect(engine).get_columns("posts")}:
+        statement = "ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0"
+    else:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(statement))
+    logger.info("Ensured posts.comment_count")
+
+def reconcile_comment_counts(db: Session) -> int:
+    """
+    Recompute Post.comment_count wherever it drifted from the comments table. Returns rows fixed.
+
+    A full-table correlated UPDATE: run it once after adding the column to an
+    existing database (RECONCILE_COUNTERS=true), not on every start.
+    """
+    actual = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    fixed = db.query(Post).filter(Post.comment_count != actual).update(
+        {Post.comment_count: actual},
+        synchronize_session=False
+    )
+    db.commit()
+    return fixed
+
 def notify_if_not_self(db: Session, actor_id: int, recipient_id: int, notif_type: str, post_id: int) -> None:
     if actor_id != recipient_id:
         create_notification(db, recipient_id, actor_id, notif_type, post_id)
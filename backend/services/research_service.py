@@ -1,4 +1,5 @@
 # services/research_service.py
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, or_
 from fastapi import HTTPException
@@ -6,6 +7,7 @@ from models.research_paper import ResearchPaper
 from models.research_collaboration import ResearchCollaboration
 from models.collaboration_request import CollaborationRequest
 from models.user import User
+from utils.query_utils import escape_like
 
 def get_paper_by_id(db: Session, paper_id: int) -> ResearchPaper:
     paper = db.query(ResearchPaper).filter(ResearchPaper.id == paper_id).first()
@@ -22,17 +24,35 @@ def get_research_by_id(db: Session, research_id: int) -> ResearchCollaboration:
         raise HTTPException(status_code=404, detail="Research work not found")
     return research
 
-def search_papers(db: Session, keyword: str):
-    key_word = f"%{keyword}%"
-    papers = db.query(ResearchPaper).filter(
+def search_papers(db: Session, keyword: str, limit: Optional[int] = None, offset: int = 0):
+    key_word = f"%{escape_like(keyword)}%"
+    query = db.query(ResearchPaper).filter(
         or_(
-            ResearchPaper.title.ilike(key_word),
-            ResearchPaper.author.ilike(key_word),
-            ResearchPaper.original_filename.ilike(key_word)
+            ResearchPaper.title.ilike(key_word, escape="\\"),
+            ResearchPaper.author.ilike(key_word, escape="\\"),
+            ResearchPaper.original_filename.ilike(key_word, escape="\\")
         )
-    ).all()
+    )
+    if limit is not None:
+        query = query.order_by(ResearchPaper.created_at.desc(), ResearchPaper.id.desc()).offset(offset).limit(limit)
+    papers = query.all()
     return papers
 
+def search_research_collaborations(
+    db: Session, keyword: str, limit: Optional[int] = None, offset: int = 0
+) -> List[ResearchCollaboration]:
+    key_word = f"%{escape_like(keyword)}%"
+    query = db.query(ResearchCollaboration).filter(
+        or_(
+            ResearchCollaboration.title.ilike(key_word, escape="\\"),
+            ResearchCollaboration.research_field.ilike(key_word, escape="\\"),
+            ResearchCollaboration.details.ilike(key_word, escape="\\")
+        )
+    ).order_by(ResearchCollaboration.id.desc())
+    if limit is not None:
+        query = query.offset(offset).limit(limit)
+    return query.all()
+
 def save_new_paper(db: Session, paper: ResearchPaper):
     db.add(paper)
     db.commit()
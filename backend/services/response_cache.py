@@ -0,0 +1,106 @@
+#process-wide cache of chatbot answers, with identical in-flight questions sent upstream once
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question."""
+    return _WHITESPACE.sub(" ", prompt).strip().lower().rstrip("?!. ")
+
+
+def response_key(prompt: str, context: Optional[str] = None) -> str:
+    """Cache key of a question asked against `context` (the retrieved chunks; None without a PDF)."""
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest() if context is not None else "-"
+    return hashlib.sha256(f"{context_hash}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    LRU of response key -> answer, with a TTL.
+
+    `get_or_compute` returns a cached answer if there is one. Otherwise the
+    first caller asks the model and any caller with the same key arriving
+    meanwhile waits for that answer instead of sending its own request.
+    Failures reach every waiting caller and are not cached.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], str]) -> Tuple[str, bool]:
+        """The answer for `key`, and whether this call computed it (False: cached or coalesced)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], False
+            if entry is not None:
+                del self._entries[key]
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), False
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        future.set_result(value)
+        return value, True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+                "evictions": self.evictions
+            }
+
+
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("CHATBOT_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("CHATBOT_CACHE_TTL", "3600"))
+)
@@ -0,0 +1,194 @@
+#search backends behind SearchHandler: Postgres full-text search, with a substring fallback for other databases
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional
+from sqlalchemy import case, desc, func, inspect, literal, literal_column, select, text, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models.post import Post
+from models.user import User
+from services.search_index import search_index
+from utils.query_utils import escape_like
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "english"
+
+# auto (by database dialect) | postgres | like | memory
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+
+# Generated, so it never has to be written by the application; see ensure_search_schema
+POST_SEARCH_VECTOR = literal_column("posts.search_vector", TSVECTOR)
+
+# Idempotent so they also bring existing databases up to date (create_all never alters tables)
+SEARCH_SCHEMA_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_CONFIG}', coalesce(content, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON users USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)",
+]
+
+# Cleared by ensure_search_schema when posts.search_vector could not be created
+_search_vector_ready = True
+
+
+def ensure_search_schema(engine: Engine) -> None:
+    """
+    Create the full-text search column and indexes on Postgres; a no-op elsewhere.
+
+    A missing extension or index only makes search slower. Without the column
+    there is no full-text search at all, so post search falls back to the
+    LIKE backend (see get_search_backend).
+    """
+    global _search_vector_ready
+    if engine.dialect.name != "postgresql":
+        return
+    for statement in SEARCH_SCHEMA_STATEMENTS:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(statement))
+        except Exception as e:
+            # e.g. no permission to create the extension
+            logger.warning("Search schema statement failed (%s): %s", statement, e)
+    _search_vector_ready = "search_vector" in {column["name"] for column in inspect(engine).get_columns("posts")}
+    if not _search_vector_ready:
+        logger.error("posts.search_vector is missing; searching with LIKE instead of full-text search")
+
+def build_prefix_tsquery(keyword: str) -> Optional[str]:
+    """Turn free text into a to_tsquery string matching every word as a prefix, e.g. 'data:* & scien:*'."""
+    words = re.findall(r"\w+", keyword.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+def _not_an_event():
+    return ~Post.event.has()
+
+
+class SearchBackend(ABC):
+    """Finds posts and users for a keyword; results are ranked and paginated by the backend."""
+
+    name: str
+
+    @abstractmethod
+    def search_posts(self, db: Session, keyword: str, limit: int, offset: int) -> List[Post]:
+        """Posts whose content (events excluded) or author matches `keyword`, best first."""
+
+    @abstractmethod
+    def search_users(self, db: Session, keyword: str, limit: int, offset: int) -> List[User]:
+        """Users whose username or email matches `keyword`, best first."""
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Substring matching with LIKE, newest first.
+
+    Works on any database (SQLite in tests and local development) but has to
+    scan `posts` and `users`; PostgresSearchBackend replaces it in production.
+    """
+
+    name = "like"
+
+    def search_posts(self, db: Session, keyword: str, limit: int, offset: int) -> List[Post]:
+        pattern = f"%{escape_like(keyword)}%"
+        return db.query(Post).join(User, User.id == Post.user_id).filter(
+            (Post.content.ilike(pattern, escape="\\") & _not_an_event()) |  # Matching content, not tied to events
+            User.username.ilike(pattern, escape="\\")  # Posts by users with matching username
+        ).order_by(Post.created_at.desc(), Post.id.desc()).offset(offset).limit(limit).all()
+
+    def search_users(self, db: Session, keyword: str, limit: int, offset: int) -> List[User]:
+        pattern = f"%{escape_like(keyword)}%"
+        return db.query(User).filter(
+            User.username.ilike(pattern, escape="\\") |
+            User.email.ilike(pattern, escape="\\")
+        ).order_by(User.id).offset(offset).limit(limit).all()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Postgres full-text search.
+
+    Post content is matched against the GIN-indexed `posts.search_vector`
+    (every word of the keyword as a prefix) and ranked with ts_rank_cd.
+    Usernames and emails keep substring semantics, served by pg_trgm GIN
+    indexes. Posts whose author matches are unioned in as a separate
+    index-driven branch rather than OR-ed into one scan.
+    """
+
+    name = "postgres"
+
+    def search_posts(self, db: Session, keyword: str, limit: int, offset: int) -> List[Post]:
+        pattern = f"%{escape_like(keyword)}%"
+        branches = [
+            select(Post.id.label("post_id"), literal(0.0).label("rank")).join(
+                User, User.id == Post.user_id
+            ).where(User.username.ilike(pattern, escape="\\"))
+        ]
+        tsquery_text = build_prefix_tsquery(keyword)
+        if tsquery_text:
+            tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+            branches.append(
+                select(Post.id.label("post_id"), func.ts_rank_cd(POST_SEARCH_VECTOR, tsquery).label("rank")).where(
+                    POST_SEARCH_VECTOR.op("@@")(tsquery), _not_an_event()
+                )
+            )
+
+        hits = union_all(*branches).subquery()
+        ranked = select(hits.c.post_id, func.max(hits.c.rank).label("rank")).group_by(hits.c.post_id).subquery()
+        return db.query(Post).join(ranked, ranked.c.post_id == Post.id).order_by(
+            desc(ranked.c.rank), Post.created_at.desc(), Post.id.desc()
+        ).offset(offset).limit(limit).all()
+
+    def search_users(self, db: Session, keyword: str, limit: int, offset: int) -> List[User]:
+        escaped = escape_like(keyword)
+        pattern = f"%{escaped}%"
+        prefix_match = case((User.username.ilike(f"{escaped}%", escape="\\"), 1), else_=0)
+        return db.query(User).filter(
+            User.username.ilike(pattern, escape="\\") |
+            User.email.ilike(pattern, escape="\\")
+        ).order_by(
+            # Prefix matches first, then the closest (shortest) usernames
+            desc(prefix_match), func.length(User.username), User.id
+        ).offset(offset).limit(limit).all()
+
+
+class MemorySearchBackend(SearchBackend):
+    """
+    Answers from services.search_index, never from the database.
+
+    The session is only used to build the index if it was not loaded at
+    startup. Words match as prefixes of content and username tokens, like
+    the Postgres backend, and results come back newest first.
+    """
+
+    name = "memory"
+
+    def search_posts(self, db: Session, keyword: str, limit: int, offset: int) -> List[Post]:
+        search_index.ensure_loaded(db)
+        return search_index.search_posts(keyword, limit, offset)
+
+    def search_users(self, db: Session, keyword: str, limit: int, offset: int) -> List[User]:
+        search_index.ensure_loaded(db)
+        return search_index.search_users(keyword, limit, offset)
+
+
+_BACKENDS = {
+    "like": LikeSearchBackend(),
+    "postgres": PostgresSearchBackend(),
+    "memory": MemorySearchBackend(),
+}
+
+def get_search_backend(db: Session) -> SearchBackend:
+    """The backend named by SEARCH_BACKEND; by default full-text search on Postgres, substring matching elsewhere."""
+    if SEARCH_BACKEND in _BACKENDS:
+        name = SEARCH_BACKEND
+    else:
+        name = "postgres" if db.get_bind().dialect.name == "postgresql" else "like"
+    if name == "postgres" and not _search_vector_ready:
+        name = "like"
+    return _BACKENDS[name]
@@ -0,0 +1,329 @@
+#in-process inverted index over post content and usernames, for deployments without Postgres full-text search
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models.post import Post, Event
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+SEARCH_INDEX_SNAPSHOT = os.getenv("SEARCH_INDEX_SNAPSHOT", "search_index.json.gz")
+
+# (user_id, content, post_type, created_at, like_count, is_event)
+_PostDoc = Tuple[int, Optional[str], str, Optional[datetime], int, bool]
+# (username, email, profile_picture)
+_UserDoc = Tuple[str, str, Optional[str]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return re.findall(r"\w+", text.lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    Token -> sorted array of document ids.
+
+    Posting lists are `array('q')` rather than sets (8 bytes per entry, no
+    per-object overhead). The vocabulary is kept sorted so a query word can
+    be matched as a prefix of every token with a bisect. Not thread-safe on
+    its own; SearchIndex serializes access.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, array] = {}
+        self._vocabulary: List[str] = []
+        self._doc_tokens: Dict[int, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+
+    def add(self, doc_id: int, text: Optional[str]) -> None:
+        self.remove(doc_id)
+        tokens = tuple(set(tokenize(text)))
+        self._doc_tokens[doc_id] = tokens
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = array("q")
+                insort(self._vocabulary, token)
+            if not postings or postings[-1] < doc_id:
+                postings.append(doc_id)  # New documents have the highest ids
+            else:
+                insort(postings, doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        for token in self._doc_tokens.pop(doc_id, ()):
+            postings = self._postings[token]
+            del postings[bisect_left(postings, doc_id)]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        matches: Set[int] = set()
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            matches.update(self._postings[self._vocabulary[position]])
+            position += 1
+        return matches
+
+    def search(self, words: Iterable[str]) -> Set[int]:
+        """Ids of documents with a token starting with each of `words`."""
+        result: Optional[Set[int]] = None
+        for word in words:
+            matches = self._prefix_matches(word)
+            result = matches if result is None else result & matches
+            if not result:
+                return set()
+        return result or set()
+
+
+class SearchIndex:
+    """
+    Post and user search answered from memory.
+
+    Holds an InvertedIndex over post content, one over usernames and one
+    over emails, plus the fields SearchHandler returns, so a query never
+    reaches the database. Built from the database once (or loaded from a
+    snapshot), then kept current by the post create/update/delete routes
+    and user signup. Those hooks are no-ops until the index is loaded, so
+    nothing is held in memory unless SEARCH_BACKEND=memory.
+
+    Each worker process has its own copy and only sees writes made through
+    it; this is meant for single-process and small deployments. `like_count`
+    is as of the last time a post was indexed.
+    """
+
+    def __init__(self, snapshot_path: str = SEARCH_INDEX_SNAPSHOT):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._content = InvertedIndex()
+        self._usernames = InvertedIndex()
+        self._emails = InvertedIndex()
+        self._posts: Dict[int, _PostDoc] = {}
+        self._users: Dict[int, _UserDoc] = {}
+        self._posts_by_user: Dict[int, array] = {}
+        self.ready = False
+
+    # Loading
+
+    def build(self, db: Session) -> None:
+        """(Re)build the whole index from the database."""
+        posts = _post_docs(_post_rows(db))
+        users = _user_docs(db)
+        with self._lock:
+            self._load_docs(posts, users)
+        logger.info("Search index built: %d posts, %d users", len(posts), len(users))
+
+    def load(self, session_factory: Callable[[], Session]) -> None:
+        """Load the snapshot if there is one, otherwise build from the database."""
+        db = session_factory()
+        try:
+            if self._load_snapshot():
+                self._catch_up(db)
+            else:
+                self.build(db)
+        finally:
+            db.close()
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self.ready:
+            self.build(db)
+
+    def _load_docs(self, posts: Dict[int, _PostDoc], users: Dict[int, _UserDoc]) -> None:
+        self._clear()
+        for user_id, user in users.items():
+            self._put_user(user_id, user)
+        for post_id in sorted(posts):
+            self._put_post(post_id, posts[post_id])
+        self.ready = True
+
+    def _catch_up(self, db: Session) -> None:
+        # Posts created or deleted while no worker had the index loaded; posts edited then need a rebuild
+        with self._lock:
+            last_id = max(self._posts, default=0)
+            known_ids = set(self._posts)
+        live_ids = {post_id for (post_id,) in db.query(Post.id)}
+        new_posts = _post_docs(_post_rows(db).filter(Post.id > last_id))
+        users = _user_docs(db)
+        with self._lock:
+            for post_id in known_ids - live_ids:
+                self._drop_post(post_id)
+            for user_id, user in users.items():
+                self._put_user(user_id, user)
+            for post_id in sorted(new_posts):
+                self._put_post(post_id, new_posts[post_id])
+
+    # Snapshots
+
+    def save_snapshot(self) -> None:
+        """Write the indexed documents to `snapshot_path`; the posting lists are rebuilt on load."""
+        if not self.ready:
+            return
+        with self._lock:
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "posts": [
+                    [post_id, user_id, content, post_type, created_at.isoformat() if created_at else None,
+                     like_count, is_event]
+                    for post_id, (user_id, content, post_type, created_at, like_count, is_event) in self._posts.items()
+                ],
+                "users": [[user_id, *user] for user_id, user in self._users.items()],
+            }
+        # A temp file of our own, as every worker process saves on shutdown; renamed into place
+        # so the snapshot is never half-written
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as raw:
+            tmp_path = raw.name
+            try:
+                with gzip.open(raw, "wt", encoding="utf-8") as f:
+                    json.dump(data, f)
+            except BaseException:
+                raw.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _load_snapshot(self) -> bool:
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable search index snapshot %s: %s", self.snapshot_path, e)
+            return False
+        if data.get("version") != SNAPSHOT_VERSION:
+            return False
+        posts = {
+            post_id: (user_id, content, post_type, datetime.fromisoformat(created_at) if created_at else None,
+                      like_count, is_event)
+            for post_id, user_id, content, post_type, created_at, like_count, is_event in data["posts"]
+        }
+        users = {user_id: (username, email, picture) for user_id, username, email, picture in data["users"]}
+        with self._lock:
+            self._load_docs(posts, users)
+        return True
+
+    # Incremental updates
+
+    def index_post(self, post: Post) -> None:
+        """Add or refresh a post; call after it (and its Event row, if any) is committed."""
+        if not self.ready:
+            return
+        post_type = post.post_type.value if hasattr(post.post_type, "value") else post.post_type
+        # An event is a post with an Event row, as in the rebuild (_post_docs) and the LIKE backend
+        doc = (post.user_id, post.content, post_type, post.created_at, post.like_count or 0,
+               post.event is not None)
+        with self._lock:
+            self._put_post(post.id, doc)
+
+    def remove_post(self, post_id: int) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            self._drop_post(post_id)
+
+    def index_user(self, user: User) -> None:
+        if not self.ready:
+            return
+        with self._lock:
+            self._put_user(user.id, (user.username, user.email, user.profile_picture))
+
+    def _put_post(self, post_id: int, doc: _PostDoc) -> None:
+        previous = self._posts.get(post_id)
+        if previous and previous[0] != doc[0]:
+            self._unlink_author(post_id, previous[0])
+        self._posts[post_id] = doc
+        self._content.add(post_id, doc[1])
+        by_user = self._posts_by_user.setdefault(doc[0], array("q"))
+        position = bisect_left(by_user, post_id)
+        if position == len(by_user) or by_user[position] != post_id:
+            by_user.insert(position, post_id)
+
+    def _drop_post(self, post_id: int) -> None:
+        doc = self._posts.pop(post_id, None)
+        if doc is None:
+            return
+        self._content.remove(post_id)
+        self._unlink_author(post_id, doc[0])
+
+    def _unlink_author(self, post_id: int, user_id: int) -> None:
+        by_user = self._posts_by_user.get(user_id)
+        if by_user:
+            position = bisect_left(by_user, post_id)
+            if position < len(by_user) and by_user[position] == post_id:
+                del by_user[position]
+
+    def _put_user(self, user_id: int, doc: _UserDoc) -> None:
+        self._users[user_id] = doc
+        self._usernames.add(user_id, doc[0])
+        self._emails.add(user_id, doc[1])
+
+    # Queries
+
+    def search_posts(self, keyword: str, limit: int, offset: int) -> List[Post]:
+        """Posts whose content or author's username has every word as a prefix, newest first."""
+        words = tokenize(keyword)
+        if not words:
+            return []
+        with self._lock:
+            matches = {post_id for post_id in self._content.search(words) if not self._posts[post_id][5]}
+            for user_id in self._usernames.search(words):
+                matches.update(self._posts_by_user.get(user_id, ()))
+            page = sorted(matches, reverse=True)[offset:offset + limit]
+            docs = [(post_id, self._posts[post_id]) for post_id in page]
+        # Detached instances: nothing is loaded from (or added to) a session
+        return [
+            Post(id=post_id, user_id=user_id, content=content, post_type=post_type,
+                 created_at=created_at, like_count=like_count)
+            for post_id, (user_id, content, post_type, created_at, like_count, _) in docs
+        ]
+
+    def search_users(self, keyword: str, limit: int, offset: int) -> List[User]:
+        words = tokenize(keyword)
+        if not words:
+            return []
+        with self._lock:
+            matches = self._usernames.search(words) | self._emails.search(words)
+            page = sorted(matches)[offset:offset + limit]
+            docs = [(user_id, self._users[user_id]) for user_id in page]
+        return [
+            User(id=user_id, username=username, email=email, profile_picture=picture)
+            for user_id, (username, email, picture) in docs
+        ]
+
+
+def _post_rows(db: Session):
+    return db.query(
+        Post.id, Post.user_id, Post.content, Post.post_type, Post.created_at, Post.like_count, Event.id
+    ).outerjoin(Event, Event.post_id == Post.id)
+
+def _post_docs(rows) -> Dict[int, _PostDoc]:
+    docs = {}
+    for post_id, user_id, content, post_type, created_at, like_count, event_id in rows:
+        post_type = post_type.value if hasattr(post_type, "value") else post_type
+        docs[post_id] = (user_id, content, post_type, created_at, like_count or 0, event_id is not None)
+    return docs
+
+def _user_docs(db: Session) -> Dict[int, _UserDoc]:
+    return {
+        user_id: (username, email, picture)
+        for user_id, username, email, picture in db.query(User.id, User.username, User.email, User.profile_picture)
+    }
+
+
+search_index = SearchIndex()
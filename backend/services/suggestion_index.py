@@ -0,0 +1,217 @@
+#in-memory prefix index behind /search/suggest, so typeahead never waits on the database
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database.session import SessionLocal
+from models.hashtag import Hashtag
+from models.university import University
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGESTION_LIMIT = 10
+MAX_SUGGESTIONS = 20
+
+
+def normalize_prefix(text: str) -> str:
+    return text.strip().lstrip("#@").lower()
+
+
+class PrefixIndex:
+    """
+    Weighted keys in a sorted array, answering "top k by weight for this prefix".
+
+    `_keys` holds (key, entry id) pairs kept sorted with bisect, so every key
+    starting with a prefix is one contiguous slice. Short slices are ranked
+    on the fly. Slices longer than SCAN_LIMIT (one- or two-letter prefixes)
+    have their top MAX_SUGGESTIONS cached, and a change to an entry patches
+    the cached lists of its own prefixes; only removing an entry or lowering
+    the weight of a listed one drops a list. Not thread-safe on its own.
+    """
+
+    SCAN_LIMIT = 256
+
+    def __init__(self):
+        self._keys: List[Tuple[str, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[str, float, Dict[str, Any]]] = {}
+        self._cache: Dict[str, List[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def set(self, entry_id: Hashable, key: str, weight: float, payload: Dict[str, Any]) -> None:
+        key = key.lower()
+        previous = self._entries.get(entry_id)
+        if previous is not None and previous[0] != key:
+            self.remove(entry_id)
+            previous = None
+        if previous is None:
+            insort(self._keys, (key, entry_id))
+        self._entries[entry_id] = (key, weight, payload)
+        self._update_cached(key, entry_id, lowered=previous is not None and weight < previous[1])
+
+    def remove(self, entry_id: Hashable) -> None:
+        previous = self._entries.pop(entry_id, None)
+        if previous is None:
+            return
+        del self._keys[bisect_left(self._keys, (previous[0], entry_id))]
+        for prefix in self._cached_prefixes(previous[0]):
+            if entry_id in self._cache[prefix]:
+                del self._cache[prefix]
+
+    def load(self, entries: List[Tuple[Hashable, str, float, Dict[str, Any]]]) -> None:
+        """Replace the contents in one sort instead of an insertion per entry."""
+        self._entries = {entry_id: (key.lower(), weight, payload) for entry_id, key, weight, payload in entries}
+        self._keys = sorted((key, entry_id) for entry_id, (key, _, _) in self._entries.items())
+        self._cache = {}
+        # Rank the widest slices (one-letter prefixes) now rather than on a user's keystroke
+        for first in {key[:1] for key, _ in self._keys if key}:
+            self.top(first, MAX_SUGGESTIONS)
+
+    def top(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        lo = bisect_left(self._keys, (prefix,))
+        hi = bisect_left(self._keys, (prefix + "\uffff",), lo)
+        if hi - lo <= self.SCAN_LIMIT:
+            ids = self._rank(self._keys[lo:hi], limit)
+        else:
+            ids = self._cache.get(prefix)
+            if ids is None:
+                ids = self._cache[prefix] = self._rank(self._keys[lo:hi], MAX_SUGGESTIONS)
+        return [self._entries[entry_id][2] for entry_id in ids[:limit]]
+
+    def _rank_key(self, entry_id: Hashable) -> Tuple[float, int, str]:
+        # Heaviest first, then the shortest (closest) key
+        key, weight, _ = self._entries[entry_id]
+        return -weight, len(key), key
+
+    def _rank(self, keys: List[Tuple[str, Hashable]], limit: int) -> List[Hashable]:
+        return nsmallest(limit, (entry_id for _, entry_id in keys), key=self._rank_key)
+
+    def _cached_prefixes(self, key: str) -> List[str]:
+        return [key[:end] for end in range(1, len(key) + 1) if key[:end] in self._cache]
+
+    def _update_cached(self, key: str, entry_id: Hashable, lowered: bool) -> None:
+        # Patch the cached top lists this entry belongs to instead of rescanning the slice
+        for prefix in self._cached_prefixes(key):
+            ids = self._cache[prefix]
+            if entry_id in ids:
+                if lowered and len(ids) == MAX_SUGGESTIONS:
+                    del self._cache[prefix]  # Something outside the list may now outrank it
+                    continue
+            elif len(ids) < MAX_SUGGESTIONS or self._rank_key(entry_id) < self._rank_key(ids[-1]):
+                ids.append(entry_id)
+            else:
+                continue
+            ids.sort(key=self._rank_key)
+            del ids[MAX_SUGGESTIONS:]
+
+
+class SuggestionIndex:
+    """
+    Username, hashtag and university suggestions served from memory.
+
+    Hashtags are weighted by usage_count and universities by total_members;
+    usernames only by length. Loaded from the database on first use, then
+    kept current by signup, hashtag tagging and profile completion. Every
+    worker has its own copy and only sees writes made through it, so the
+    whole index is also rebuilt in the background once it is older than
+    `refresh_seconds`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        refresh_seconds: float = 300
+    ):
+        self._session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._users = PrefixIndex()
+        self._hashtags = PrefixIndex()
+        self._universities = PrefixIndex()
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def ensure_loaded(self) -> None:
+        """Build the index on first use; afterwards start a background rebuild when it is stale."""
+        if not self.ready:
+            self.rebuild()
+        elif time.monotonic() - self._loaded_at > self.refresh_seconds and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh, name="suggestion-index-refresh", daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("Rebuilding the suggestion index failed")
+        finally:
+            self._refreshing = False
+
+    def rebuild(self) -> None:
+        db = self._session_factory()
+        try:
+            users, hashtags, universities = PrefixIndex(), PrefixIndex(), PrefixIndex()
+            users.load([
+                (user_id, username, 0, {"id": user_id, "username": username})
+                for user_id, username in db.query(User.id, User.username) if username
+            ])
+            hashtags.load([
+                (name, name, usage_count or 0, {"name": name, "usage_count": usage_count or 0})
+                for name, usage_count in db.query(Hashtag.name, Hashtag.usage_count)
+            ])
+            universities.load([
+                (university_id, name, total_members or 0, {"id": university_id, "name": name})
+                for university_id, name, total_members in db.query(
+                    University.id, University.name, University.total_members
+                ) if name
+            ])
+        finally:
+            db.close()
+        with self._lock:
+            self._users, self._hashtags, self._universities = users, hashtags, universities
+            self._loaded_at = time.monotonic()
+
+    # Incremental updates; no-ops until the index is loaded
+
+    def add_user(self, user: User) -> None:
+        if self.ready and user.username:
+            with self._lock:
+                self._users.set(user.id, user.username, 0, {"id": user.id, "username": user.username})
+
+    def set_hashtag(self, name: str, usage_count: int) -> None:
+        if self.ready:
+            with self._lock:
+                self._hashtags.set(name, name, usage_count, {"name": name, "usage_count": usage_count})
+
+    def set_university(self, university: University) -> None:
+        if self.ready and university.name:
+            with self._lock:
+                self._universities.set(
+                    university.id, university.name, university.total_members or 0,
+                    {"id": university.id, "name": university.name}
+                )
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTION_LIMIT) -> Dict[str, List[Dict[str, Any]]]:
+        prefix = normalize_prefix(query)
+        if not prefix:
+            return {"users": [], "hashtags": [], "universities": []}
+        limit = min(limit, MAX_SUGGESTIONS)
+        with self._lock:
+            return {
+                "users": self._users.top(prefix, limit),
+                "hashtags": self._hashtags.top(prefix, limit),
+                "universities": self._universities.top(prefix, limit),
+            }
+
+
+suggestion_index = SuggestionIndex(refresh_seconds=float(os.getenv("SUGGEST_REFRESH_SECONDS", "300")))
@@ -0,0 +1,35 @@
+#process-wide cache of university names, used to decide which hashtags name a university
+import os
+import threading
+import time
+from typing import FrozenSet, Optional, Tuple
+from sqlalchemy.orm import Session
+from models.university import University
+
+# Other workers don't see invalidate_university_names(); they reload after this many seconds
+UNIVERSITY_CACHE_TTL = float(os.getenv("UNIVERSITY_CACHE_TTL", "300"))
+
+_lock = threading.Lock()
+_university_names: Optional[Tuple[float, FrozenSet[str]]] = None  # (expires, names)
+
+def normalize_university_name(name: str) -> str:
+    return name.strip().lower()
+
+def get_university_names(db: Session) -> FrozenSet[str]:
+    """Return the normalized names of all universities, loading them on first use and after the TTL."""
+    global _university_names
+    cached = _university_names
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    with _lock:
+        if _university_names is None or _university_names[0] <= time.monotonic():
+            rows = db.query(University.name).all()
+            names = frozenset(normalize_university_name(name) for (name,) in rows if name)
+            _university_names = (time.monotonic() + UNIVERSITY_CACHE_TTL, names)
+        return _university_names[1]
+
+def invalidate_university_names() -> None:
+    """Drop the cached names; call after a university is created or renamed."""
+    global _university_names
+    with _lock:
+        _university_names = None
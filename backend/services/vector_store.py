@@ -0,0 +1,142 @@
+#on-disk vector indexes for the PDF chatbot, keyed by document content hash and memory-mapped on load
+import logging
+import mmap
+import os
+import shutil
+import uuid
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, List, Optional
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", "vector_store")
+EMBED_BATCH_SIZE = 64
+
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.bin"  # Chunk texts, UTF-8, back to back
+OFFSETS_FILE = "offsets.npy"  # Start of chunk i at offsets[i], end at offsets[i + 1]
+
+# Map the vectors of flat indexes instead of reading them into memory (older faiss: read them)
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+class DocumentIndex:
+    """
+    A read-only view of one stored document: its faiss index and chunk texts.
+
+    All three files are memory-mapped, so opening an index costs no more
+    than a few syscalls and the pages are shared by every worker process
+    on the machine through the page cache.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.index = faiss.read_index(str(path / INDEX_FILE), _MMAP_FLAGS)
+        self._offsets = np.load(path / OFFSETS_FILE, mmap_mode="r")
+        self._file = open(path / CHUNKS_FILE, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._chunks = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the index files on disk."""
+        return sum((self.path / name).stat().st_size for name in (INDEX_FILE, CHUNKS_FILE, OFFSETS_FILE))
+
+    def chunk(self, position: int) -> str:
+        return self._chunks[int(self._offsets[position]):int(self._offsets[position + 1])].decode("utf-8")
+
+    def search(self, vector: List[float], k: int = 4) -> List[str]:
+        if not len(self):
+            return []
+        _, positions = self.index.search(np.asarray([vector], dtype="float32"), min(k, len(self)))
+        return [self.chunk(position) for position in positions[0] if position >= 0]
+
+    def close(self) -> None:
+        if isinstance(self._chunks, mmap.mmap):
+            self._chunks.close()
+        self._file.close()
+
+
+class VectorRetriever:
+    """Embeds the question and returns the closest chunks, like a langchain FAISS retriever."""
+
+    def __init__(self, index: DocumentIndex, embeddings: Embeddings, k: int = 4):
+        self.index = index
+        self.embeddings = embeddings
+        self.k = k
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        vector = self.embeddings.embed_query(query)
+        return [Document(page_content=text) for text in self.index.search(vector, self.k)]
+
+    invoke = get_relevant_documents
+
+
+class VectorStore:
+    """
+    One directory per document under `root`, named by the SHA-256 of the PDF.
+
+    The same PDF uploaded again, by anyone and on any worker sharing the
+    directory, opens the existing index instead of being split and embedded
+    again. Indexes are written to a temporary directory and renamed into
+    place, so a reader never sees a half-written one.
+    """
+
+    def __init__(self, root: str = VECTOR_STORE_DIR):
+        self.root = Path(root)
+
+    def path(self, content_hash: str) -> Path:
+        return self.root / content_hash
+
+    def exists(self, content_hash: str) -> bool:
+        return (self.path(content_hash) / INDEX_FILE).exists()
+
+    def open(self, content_hash: str) -> Optional[DocumentIndex]:
+        if not self.exists(content_hash):
+            return None
+        return DocumentIndex(self.path(content_hash))
+
+    def build(self, content_hash: str, chunks: Iterable[str], embeddings: Embeddings) -> DocumentIndex:
+        """Embed `chunks` batch by batch into a new index for `content_hash` and open it."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f".{content_hash}.{uuid.uuid4().hex}.tmp"
+        tmp_path.mkdir()
+        try:
+            index = None
+            offsets = [0]
+            chunks = iter(chunks)
+            with open(tmp_path / CHUNKS_FILE, "wb") as out:
+                while batch := list(islice(chunks, EMBED_BATCH_SIZE)):
+                    vectors = np.asarray(embeddings.embed_documents(batch), dtype="float32")
+                    if index is None:
+                        index = faiss.IndexFlatL2(vectors.shape[1])
+                    index.add(vectors)
+                    for text in batch:
+                        data = text.encode("utf-8")
+                        out.write(data)
+                        offsets.append(offsets[-1] + len(data))
+            if index is None:
+                index = faiss.IndexFlatL2(len(embeddings.embed_query("")))
+            faiss.write_index(index, str(tmp_path / INDEX_FILE))
+            np.save(tmp_path / OFFSETS_FILE, np.asarray(offsets, dtype="int64"))
+            try:
+                os.rename(tmp_path, self.path(content_hash))
+            except OSError:
+                # Built concurrently by another request or worker; keep theirs
+                shutil.rmtree(tmp_path, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        logger.info("Indexed document %s: %d chunks", content_hash, len(offsets) - 1)
+        return DocumentIndex(self.path(content_hash))
+
+
+vector_store = VectorStore()
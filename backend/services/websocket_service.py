@@ -1,38 +1,213 @@
 # services/websocket_service.py
 
+import asyncio
+import logging
+import os
 from fastapi import WebSocket
 from starlette.websockets import WebSocketDisconnect
-from typing import Dict
-from services.message_service import create_message, prepare_message_event
-from services.chat_service import fetch_chat_history
-from models.chat import Message
-from sqlalchemy.orm import Session
+from typing import Dict, Optional, Set
+from services.message_batcher import message_batcher
+from services.pubsub import pubsub
 
-clients: Dict[int, WebSocket] = {}
+logger = logging.getLogger(__name__)
 
-async def connect_socket(websocket: WebSocket, user_id: int):
+OUTBOUND_QUEUE_SIZE = int(os.getenv("WS_OUTBOUND_QUEUE_SIZE", "100"))
+SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+SLOW_CONSUMER_CLOSE_CODE = 1013  # "Try again later"
+
+CHAT_CHANNEL = "chat_events"
+
+
+class SocketConnection:
+    """
+    One open websocket and its bounded outbound queue.
+
+    Messages are queued without waiting and a per-socket sender task writes
+    them out, so a slow client only ever delays itself. A client whose queue
+    fills up is evicted on the spot: its socket is closed and it is dropped
+    from `clients`. One whose send has been stuck for longer than
+    `send_timeout` is evicted by the watchdog (see `evict_stalled_connections`).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        queue_size: int = OUTBOUND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT_SECONDS
+    ):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+        self._send_started: Optional[float] = None
+        self._sender = asyncio.create_task(self._send_loop())
+
+    def offer(self, message: dict) -> bool:
+        """Queue a message for this socket; returns False if it was dropped."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Evicting slow websocket for user %s: outbound queue full", self.user_id)
+            self.evict()
+            return False
+
+    def stalled(self, now: float) -> bool:
+        return self._send_started is not None and now - self._send_started > self.send_timeout
+
+    async def drain(self) -> None:
+        """Wait until everything queued so far has been sent (or dropped)."""
+        if not self.closed:
+            await self.queue.join()
+
+    def close(self) -> None:
+        """Forget the connection and stop its sender; the socket is already gone."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        _discard_connection(self)
+        # Unblock anyone waiting in drain()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+
+    def evict(self) -> None:
+        """Drop a consumer that cannot keep up and close its socket."""
+        if self.closed:
+            return
+        self.close()
+        _spawn(self._close_socket(SLOW_CONSUMER_CLOSE_CODE))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _send_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await self.queue.get()
+            # Timed by the watchdog rather than wait_for, which costs a task per send
+            self._send_started = loop.time()
+            try:
+                await self.websocket.send_json(message)
+            except Exception:
+                # Client went away mid-send; the receive loop will report the disconnect
+                self.close()
+                return
+            finally:
+                self._send_started = None
+                self.queue.task_done()
+
+
+# Sockets connected to this process only; other workers hold their own.
+# A user may have several (tabs, devices).
+clients: Dict[int, Set[SocketConnection]] = {}
+
+# Keep references to fire-and-forget tasks so they are not garbage collected mid-run
+_background_tasks: Set[asyncio.Task] = set()
+_watchdog: Optional[asyncio.Task] = None
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+def _discard_connection(connection: SocketConnection) -> None:
+    connections = clients.get(connection.user_id)
+    if connections is None:
+        return
+    connections.discard(connection)
+    if not connections:
+        clients.pop(connection.user_id, None)
+
+def evict_stalled_connections() -> int:
+    """Evict every socket whose current send has outlived its timeout; returns how many."""
+    now = asyncio.get_running_loop().time()
+    stalled = [
+        connection
+        for connections in list(clients.values())
+        for connection in list(connections)
+        if connection.stalled(now)
+    ]
+    for connection in stalled:
+        logger.warning("Evicting slow websocket for user %s: send timed out", connection.user_id)
+        connection.evict()
+    return len(stalled)
+
+async def _watch_stalled_connections() -> None:
+    while True:
+        await asyncio.sleep(SEND_TIMEOUT_SECONDS / 5)
+        evict_stalled_connections()
+
+def _ensure_watchdog() -> None:
+    global _watchdog
+    if _watchdog is None or _watchdog.done():
+        _watchdog = asyncio.create_task(_watch_stalled_connections())
+
+async def stop_watchdog() -> None:
+    """Cancel the stalled-connection watchdog and wait for it to finish."""
+    global _watchdog
+    watchdog, _watchdog = _watchdog, None
+    if watchdog is None or watchdog.done():
+        return
+    watchdog.cancel()
+    try:
+        await watchdog
+    except asyncio.CancelledError:
+        pass
+
+async def connect_socket(websocket: WebSocket, user_id: int) -> SocketConnection:
     await websocket.accept()
-    clients[user_id] = websocket
+    _ensure_watchdog()
+    connection = SocketConnection(websocket, user_id)
+    clients.setdefault(user_id, set()).add(connection)
+    return connection
 
-async def disconnect_socket(user_id: int):
-    clients.pop(user_id, None)
+async def disconnect_socket(user_id: int, websocket: Optional[WebSocket] = None):
+    """Drop one of the user's sockets, or all of them when `websocket` is not given."""
+    for connection in list(clients.get(user_id, ())):
+        if websocket is None or connection.websocket is websocket:
+            connection.close()
 
 async def send_socket_message(user_id: int, message: dict):
-    if user_id in clients:
-        await clients[user_id].send_json(message)
+    """Queue the message on every socket the user has open in this process."""
+    for connection in list(clients.get(user_id, ())):
+        connection.offer(message)
+
+async def deliver_local_message(event: dict):
+    for uid in event["user_ids"]:
+        await send_socket_message(uid, event["message"])
+
+pubsub.subscribe(CHAT_CHANNEL, deliver_local_message)
 
 async def broadcast_message(user_ids: list, message: dict):
-    for uid in user_ids:
-        await send_socket_message(uid, message)
+    """Publish to every worker; each one delivers to the recipients connected to it."""
+    event = {"user_ids": list(user_ids), "message": message}
+    try:
+        await pubsub.publish(CHAT_CHANNEL, event)
+    except ValueError:
+        # Too large for the backend; the message is stored, so remote recipients get it from history
+        logger.warning("Chat event too large to publish; delivering to local sockets only")
+        await deliver_local_message(event)
 
-async def handle_chat_message(db: Session, user_id: int, message_data: dict):
+async def handle_chat_message(user_id: int, message_data: dict):
     from_id = user_id
     to_id = int(message_data.get("receiver_id"))
     content = message_data.get("content")
     file_url = message_data.get("file_url", None)
     message_type = message_data.get("message_type", "text")
     
-    message = create_message(db, from_id, to_id, content, file_url, message_type)
-    event = prepare_message_event(message)
+    # Stored by the write-behind batcher; the event carries the assigned id back to the sender
+    event = await message_batcher.submit(from_id, to_id, content, file_url, message_type)
+    if message_data.get("client_id") is not None:
+        event["client_id"] = message_data["client_id"]
 
     await broadcast_message([from_id, to_id], event)
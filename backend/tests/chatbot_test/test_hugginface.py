@@ -12,6 +12,7 @@ sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 from main import app
 from models.user import User
+from models.chatbot_session import ChatbotSession
 from schemas.huggingface import PromptResponse, BotResponse
 
 # Create test client
@@ -35,9 +36,10 @@ def override_dependencies(monkeypatch):
         return fake_user
     
     # Override the dependencies used in the huggingface.py routes
-    from api.v1.endpoints.chatbot.huggingface import get_db, get_current_user
+    from api.v1.endpoints.chatbot.huggingface import get_db, get_current_user, response_cache
     app.dependency_overrides[get_db] = _get_db_override
     app.dependency_overrides[get_current_user] = _get_current_user_override
+    response_cache.clear()
     
     yield mock_session
     
@@ -62,7 +64,7 @@ def mock_gemini_model():
 # Mocking fitz for PDF extraction
 @pytest.fixture
 def mock_fitz():
-    with patch("api.v1.endpoints.chatbot.huggingface.fitz") as mock_fitz:
+    with patch("services.pdf_extraction.fitz") as mock_fitz:
         mock_doc = MagicMock()
         mock_page = MagicMock()
         mock_page.get_text.return_value = "This is mock text extracted from a PDF"
@@ -110,7 +112,8 @@ async def test_upload_pdf(override_dependencies, mock_gemini_model, mock_fitz, m
 @pytest.mark.asyncio
 async def test_hugapi_no_pdf(override_dependencies, mock_gemini_model):
     mock_session = override_dependencies
-    mock_session.query.return_value.filter.return_value.first.return_value = fake_user
+    # The user, then no stored chatbot session
+    mock_session.query.return_value.filter.return_value.first.side_effect = [fake_user, None]
     
     # Reset user sessions
     from api.v1.endpoints.chatbot.huggingface import user_sessions
@@ -132,14 +135,17 @@ async def test_hugapi_no_pdf(override_dependencies, mock_gemini_model):
 @pytest.mark.asyncio
 async def test_hugapi_with_pdf(override_dependencies, mock_gemini_model, mock_retriever):
     mock_session = override_dependencies
-    mock_session.query.return_value.filter.return_value.first.return_value = fake_user
+    # The user, then their stored chatbot session
+    mock_session.query.return_value.filter.return_value.first.side_effect = [
+        fake_user, ChatbotSession(user_id=1, document_hash="mock-hash")
+    ]
     
     # Create a user session with a mock retriever
     from api.v1.endpoints.chatbot.huggingface import user_sessions
-    user_sessions[1] = {
+    user_sessions.put(1, {
         "chat": mock_gemini_model.start_chat(),
         "retriever": mock_retriever
-    }
+    }, "mock-hash")
     
     # Test the endpoint with a context-aware request
     response = client.post(
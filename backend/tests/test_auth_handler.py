@@ -5,9 +5,11 @@ from fastapi import HTTPException
 import pytest
 import jwt
 from services.AuthHandler import AuthHandler
+from services.principal_cache import principal_cache
 
 class TestAuthHandler(IsolatedAsyncioTestCase):
     def setUp(self):
+        principal_cache.clear()
         self.mock_db = Mock()
         self.username = "testuser"
         self.email = "test@example.com"
@@ -68,17 +70,17 @@ class TestAuthHandler(IsolatedAsyncioTestCase):
         assert exc_info.value.status_code == 400
         assert exc_info.value.detail == "OTP expired"
 
-    @patch('services.AuthHandler.hash_password')
+    @patch('services.AuthHandler.password_hasher')
     @patch('services.AuthHandler.generate_otp')
     @patch('services.AuthHandler.store_otp')
     async def test_create_user_success(
         self,
         mock_store_otp,
         mock_generate_otp,
-        mock_hash_password
+        mock_password_hasher
     ):
         self.mock_db.query().filter().first.return_value = None
-        mock_hash_password.return_value = "hashed_password"
+        mock_password_hasher.hash = AsyncMock(return_value="hashed_password")
         mock_generate_otp.return_value = self.otp
         
         with patch.object(AuthHandler, '_send_otp_email') as mock_send_email:
@@ -91,6 +93,7 @@ class TestAuthHandler(IsolatedAsyncioTestCase):
         
         self.mock_db.add.assert_called_once()
         self.mock_db.commit.assert_called_once()
+        mock_password_hasher.hash.assert_awaited_once_with(self.password)
         mock_store_otp.assert_called_once()
         mock_send_email.assert_called_once()
         self.assertEqual(
@@ -98,19 +101,20 @@ class TestAuthHandler(IsolatedAsyncioTestCase):
             "User created successfully. Please verify your email."
         )
 
-    @patch('services.AuthHandler.verify_password')
+    @patch('services.AuthHandler.password_hasher')
     @patch('services.AuthHandler.create_access_token')
     async def test_authenticate_user_success(
         self,
         mock_create_token,
-        mock_verify_password
+        mock_password_hasher
     ):
         mock_user = Mock(
             username=self.username,
+            hashed_password="stored_hash",
             is_verified=True
         )
         self.mock_db.query().filter().first.return_value = mock_user
-        mock_verify_password.return_value = True
+        mock_password_hasher.verify_and_update = AsyncMock(return_value=(True, None))
         mock_create_token.return_value = "access_token"
         
         result = await AuthHandler.authenticate_user(
@@ -121,11 +125,30 @@ class TestAuthHandler(IsolatedAsyncioTestCase):
         
         self.assertEqual(result["access_token"], "access_token")
         self.assertEqual(result["token_type"], "bearer")
+        self.assertEqual(mock_user.hashed_password, "stored_hash")
+        self.mock_db.commit.assert_not_called()
 
-    @patch('services.AuthHandler.verify_password')
-    async def test_authenticate_user_invalid_credentials(self, mock_verify_password):
-        mock_verify_password.return_value = False
-        self.mock_db.query().filter().first.return_value = None
+    @patch('services.AuthHandler.password_hasher')
+    @patch('services.AuthHandler.create_access_token')
+    async def test_authenticate_user_upgrades_outdated_hash(
+        self,
+        mock_create_token,
+        mock_password_hasher
+    ):
+        mock_user = Mock(username=self.username, hashed_password="old_cost_hash", is_verified=True)
+        self.mock_db.query().filter().first.return_value = mock_user
+        mock_password_hasher.verify_and_update = AsyncMock(return_value=(True, "new_cost_hash"))
+        mock_create_token.return_value = "access_token"
+
+        await AuthHandler.authenticate_user(self.mock_db, self.username, self.password)
+
+        self.assertEqual(mock_user.hashed_password, "new_cost_hash")
+        self.mock_db.commit.assert_called_once()
+
+    @patch('services.AuthHandler.password_hasher')
+    async def test_authenticate_user_invalid_credentials(self, mock_password_hasher):
+        mock_password_hasher.verify_and_update = AsyncMock(return_value=(False, None))
+        self.mock_db.query().filter().first.return_value = Mock(hashed_password="stored_hash")
         
         with pytest.raises(HTTPException) as exc_info:
             await AuthHandler.authenticate_user(
@@ -137,6 +160,14 @@ class TestAuthHandler(IsolatedAsyncioTestCase):
         assert exc_info.value.status_code == 401
         assert exc_info.value.detail == "Invalid credentials"
 
+    async def test_authenticate_unknown_user(self):
+        self.mock_db.query().filter().first.return_value = None
+
+        with pytest.raises(HTTPException) as exc_info:
+            await AuthHandler.authenticate_user(self.mock_db, self.username, self.password)
+
+        assert exc_info.value.status_code == 401
+
     @patch('jwt.decode')
     def test_get_current_user_success(self, mock_jwt_decode):
         mock_user = Mock(username=self.username)
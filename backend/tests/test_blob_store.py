@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import io
+import sys
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import AsyncMock
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.blob import Blob
+from models.post import Post, PostMedia, PostDocument, Event
+from models.user import User
+from services.blob_store import BlobStore, hash_source, post_file_urls, release_urls
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File-backed: the store runs its queries on worker threads
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def store(session_factory):
+    return BlobStore(session_factory)
+
+
+def upload_file(data: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename="poster.png", size=len(data))
+
+def stored(url: str):
+    return AsyncMock(return_value={"url": url, "public_id": "p/1", "resource_type": "image"})
+
+def ref_count(session_factory, url: str) -> int:
+    db = session_factory()
+    try:
+        return db.query(Blob.ref_count).filter(Blob.url == url).scalar()
+    finally:
+        db.close()
+
+
+@pytest.mark.asyncio
+async def test_hash_source_streams_and_rewinds():
+    data = b"a" * (3 * 1024 * 1024 + 5)
+    source = upload_file(data)
+
+    assert await hash_source(source) == (hashlib.sha256(data).hexdigest(), len(data))
+    assert await source.read() == data
+
+@pytest.mark.asyncio
+async def test_same_content_is_uploaded_once(store, session_factory):
+    upload = stored("https://cdn/one.png")
+
+    first = await store.store(upload_file(b"poster"), "cloudinary", upload)
+    second = await store.store(upload_file(b"poster"), "cloudinary", stored("https://cdn/two.png"))
+
+    assert first == second == {"url": "https://cdn/one.png", "public_id": "p/1", "resource_type": "image"}
+    upload.assert_awaited_once()
+    assert ref_count(session_factory, "https://cdn/one.png") == 2
+    assert store.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_backends_and_contents_are_kept_apart(store):
+    await store.store(upload_file(b"poster"), "cloudinary", stored("https://cdn/one.png"))
+
+    other_backend = await store.store(upload_file(b"poster"), "supabase", stored("https://supabase/one.png"))
+    other_content = await store.store(upload_file(b"flyer"), "cloudinary", stored("https://cdn/two.png"))
+
+    assert other_backend["url"] == "https://supabase/one.png"
+    assert other_content["url"] == "https://cdn/two.png"
+
+@pytest.mark.asyncio
+async def test_folders_keep_their_own_copies(store, session_factory):
+    await store.store(upload_file(b"thesis"), "supabase", stored("https://supabase/upload_documents/t.pdf"),
+                      folder="upload_documents/")
+
+    paper = await store.store(upload_file(b"thesis"), "supabase", stored("https://supabase/research_papers/t.pdf"),
+                              folder="research_papers/")
+
+    assert paper["url"] == "https://supabase/research_papers/t.pdf"
+    assert ref_count(session_factory, "https://supabase/upload_documents/t.pdf") == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_of_the_same_file_share_one_row(store, session_factory):
+    async def slow_upload(url):
+        await asyncio.sleep(0.05)
+        return {"url": url, "public_id": None, "resource_type": None}
+
+    results = await asyncio.gather(
+        store.store(upload_file(b"poster"), "supabase", lambda: slow_upload("https://supabase/a.png")),
+        store.store(upload_file(b"poster"), "supabase", lambda: slow_upload("https://supabase/b.png")),
+    )
+
+    assert results[0] == results[1]
+    db = session_factory()
+    blob = db.query(Blob).one()
+    assert (blob.url, blob.ref_count) == (results[0]["url"], 2)
+    db.close()
+
+@pytest.mark.asyncio
+async def test_deleting_a_post_releases_its_files(store, session_factory):
+    url = (await store.store(upload_file(b"poster"), "cloudinary", stored("https://cdn/one.png")))["url"]
+    await store.store(upload_file(b"poster"), "cloudinary", stored("https://cdn/one.png"))
+
+    db = session_factory()
+    db.add(User(id=1, username="alice", email="a@uni.edu"))
+    post = Post(id=1, user_id=1, content="Fest", post_type="event")
+    post.media = [PostMedia(media_url=url, media_type="image")]
+    post.documents = [PostDocument(document_url="https://supabase/notes.pdf", document_type=".pdf")]
+    post.event = Event(user_id=1, title="Fest", event_datetime=datetime(2025, 1, 1), image_url=url)
+    db.add(post)
+    db.commit()
+
+    assert post_file_urls(post) == [url, "https://supabase/notes.pdf", url]
+    release_urls(db, post_file_urls(post))
+    db.delete(post)
+    db.commit()
+    db.close()
+
+    assert ref_count(session_factory, url) == 0
+
+@pytest.mark.asyncio
+async def test_released_files_are_still_reused(store, session_factory):
+    await store.store(upload_file(b"poster"), "cloudinary", stored("https://cdn/one.png"))
+    db = session_factory()
+    release_urls(db, ["https://cdn/one.png", "https://cdn/one.png", None])  # Never below zero
+    db.commit()
+    db.close()
+    assert ref_count(session_factory, "https://cdn/one.png") == 0
+
+    upload = stored("https://cdn/new.png")
+    assert (await store.store(upload_file(b"poster"), "cloudinary", upload))["url"] == "https://cdn/one.png"
+    upload.assert_not_awaited()
+    assert ref_count(session_factory, "https://cdn/one.png") == 1
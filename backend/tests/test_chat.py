@@ -59,7 +59,7 @@ async def test_websocket_endpoint_connect_and_disconnect():
         from api.v1.endpoints.chat import websocket_endpoint
         # Should raise after disconnect
         with pytest.raises(Exception):
-            await websocket_endpoint(ws, 1, MagicMock())
+            await websocket_endpoint(ws, 1)
         mock_connect.assert_awaited_once()
         mock_handle.assert_awaited()
         mock_disconnect.assert_awaited()
@@ -1,12 +1,24 @@
+import sys
+from pathlib import Path
 from unittest import TestCase, IsolatedAsyncioTestCase
 from unittest.mock import Mock, patch
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.connection, models.notifications, models.post, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.user import User
+from models.chat import Message
 from services.chat_service import (
     fetch_conversations,
     fetch_chat_history,
+    ensure_message_indexes,
     get_unread_count,
     mark_as_read
 )
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 class TestChatService(IsolatedAsyncioTestCase):
     def setUp(self):
@@ -15,67 +27,6 @@ class TestChatService(IsolatedAsyncioTestCase):
         self.friend_id = 2
         self.timestamp = datetime.now()
 
-    async def test_fetch_conversations(self):
-        mock_message = Mock(
-            sender_id=self.user_id,
-            receiver_id=self.friend_id,
-            content="Test message",
-            file_url=None,
-            message_type="text",
-            timestamp=self.timestamp
-        )
-        mock_friend = Mock(
-            id=self.friend_id,
-            username="friend",
-            profile_picture="avatar.jpg"
-        )
-
-        self.mock_db.query().filter().order_by().all.return_value = [mock_message]
-        self.mock_db.query().filter().first.return_value = mock_friend
-
-        with patch('services.chat_service.get_unread_count', return_value=1):
-            result = await fetch_conversations(self.mock_db, self.user_id)
-
-        self.assertEqual(len(result), 1)
-        conversation = result[0]
-        self.assertEqual(conversation["user_id"], self.friend_id)
-        self.assertEqual(conversation["username"], "friend")
-        self.assertEqual(conversation["avatar"], "avatar.jpg")
-        self.assertEqual(conversation["last_message"], "Test message")
-        self.assertEqual(conversation["unread_count"], 1)
-
-    async def test_fetch_chat_history(self):
-        mock_messages = [
-            Mock(
-                sender_id=self.user_id,
-                receiver_id=self.friend_id,
-                content="Message 1"
-            ),
-            Mock(
-                sender_id=self.friend_id,
-                receiver_id=self.user_id,
-                content="Message 2"
-            )
-        ]
-
-        self.mock_db.query().filter().order_by().all.return_value = mock_messages
-
-        with patch('services.chat_service.mark_as_read') as mock_mark_read:
-            result = await fetch_chat_history(
-                self.mock_db,
-                self.user_id,
-                self.friend_id
-            )
-
-        self.assertEqual(len(result), 2)
-        self.assertEqual(result[0].content, "Message 1")
-        self.assertEqual(result[1].content, "Message 2")
-        mock_mark_read.assert_called_once_with(
-            self.mock_db,
-            self.friend_id,
-            self.user_id
-        )
-
     def test_get_unread_count(self):
         self.mock_db.query().filter().count.return_value = 5
 
@@ -94,5 +45,158 @@ class TestChatService(IsolatedAsyncioTestCase):
 
         mark_as_read(self.mock_db, self.friend_id, self.user_id)
 
-        mock_query.update.assert_called_once_with({"is_read": True})
-        self.mock_db.commit.assert_called_once()
\ No newline at end of file
+        mock_query.update.assert_called_once_with({"is_read": True}, synchronize_session="fetch")
+        self.mock_db.commit.assert_called_once()
+
+
+class ChatDatabaseTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+        Base.metadata.create_all(self.engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+        self.db = sessionmaker(bind=self.engine)()
+        self.base_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.minute = 0
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def _send(self, sender_id, receiver_id, content, is_read=False):
+        self.minute += 1
+        message = Message(sender_id=sender_id, receiver_id=receiver_id, content=content, is_read=is_read,
+                          timestamp=self.base_time + timedelta(minutes=self.minute))
+        self.db.add(message)
+        return message
+
+    def _count_statements(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(self.engine, "before_cursor_execute", listener)
+        self.addCleanup(event.remove, self.engine, "before_cursor_execute", listener)
+        return statements
+
+
+class TestFetchConversations(ChatDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db.add_all([
+            User(id=1, username="me", email="me@example.com"),
+            User(id=2, username="alice", email="alice@example.com", profile_picture="alice.jpg"),
+            User(id=3, username="bob", email="bob@example.com"),
+            User(id=4, username="carol", email="carol@example.com"),
+            User(id=5, username="dave", email="dave@example.com"),
+        ])
+        self._send(2, 1, "hi from alice", is_read=True)
+        self._send(1, 2, "hi alice")
+        self._send(2, 1, "unread 1")
+        self._send(2, 1, "unread 2")
+        self._send(1, 3, "hi bob")
+        self._send(4, 1, "hi from carol")
+        self._send(4, 5, "not my conversation")
+        self.db.commit()
+
+    async def test_one_row_per_partner_newest_first(self):
+        result = await fetch_conversations(self.db, 1)
+
+        self.assertEqual([c["username"] for c in result], ["carol", "bob", "alice"])
+        carol, bob, alice = result
+        self.assertEqual(alice["user_id"], 2)
+        self.assertEqual(alice["avatar"], "alice.jpg")
+        self.assertEqual(alice["last_message"], "unread 2")
+        self.assertEqual(alice["message_type"], "text")
+        self.assertFalse(alice["is_sender"])
+        self.assertEqual(alice["unread_count"], 2)
+        self.assertTrue(bob["is_sender"])
+        # Messages I sent never count as unread for me
+        self.assertEqual(bob["unread_count"], 0)
+        self.assertEqual(carol["unread_count"], 1)
+
+    async def test_runs_a_single_query(self):
+        statements = self._count_statements()
+
+        await fetch_conversations(self.db, 1)
+
+        self.assertEqual(len(statements), 1)
+
+    async def test_pagination(self):
+        first_page = await fetch_conversations(self.db, 1, limit=2)
+        second_page = await fetch_conversations(self.db, 1, limit=2, offset=2)
+
+        self.assertEqual([c["username"] for c in first_page], ["carol", "bob"])
+        self.assertEqual([c["username"] for c in second_page], ["alice"])
+
+    async def test_no_conversations(self):
+        self.assertEqual(await fetch_conversations(self.db, 3 + 100), [])
+
+
+class TestFetchChatHistory(ChatDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db.add_all([
+            User(id=1, username="me", email="me@example.com"),
+            User(id=2, username="friend", email="friend@example.com"),
+            User(id=3, username="other", email="other@example.com"),
+        ])
+        # Ten messages alternating direction; the friend's are unread
+        self.messages = [
+            self._send(1, 2, f"m{n}") if n % 2 == 0 else self._send(2, 1, f"m{n}")
+            for n in range(10)
+        ]
+        self._send(3, 1, "someone else")
+        self.db.commit()
+        self.ids = [m.id for m in self.messages]
+
+    def _unread_ids(self):
+        return [m.id for m in self.db.query(Message).filter(Message.sender_id == 2, Message.is_read.is_(False))]
+
+    async def test_latest_page_oldest_first(self):
+        result = await fetch_chat_history(self.db, 1, 2, limit=4)
+
+        self.assertEqual([m.content for m in result], ["m6", "m7", "m8", "m9"])
+
+    async def test_before_pages_back(self):
+        result = await fetch_chat_history(self.db, 1, 2, before=self.ids[6], limit=4)
+
+        self.assertEqual([m.content for m in result], ["m2", "m3", "m4", "m5"])
+
+    async def test_after_returns_only_new_messages(self):
+        result = await fetch_chat_history(self.db, 1, 2, after=self.ids[7], limit=50)
+
+        self.assertEqual([m.content for m in result], ["m8", "m9"])
+
+    async def test_after_pages_forward_from_the_oldest_missed(self):
+        result = await fetch_chat_history(self.db, 1, 2, after=self.ids[1], limit=3)
+
+        self.assertEqual([m.content for m in result], ["m2", "m3", "m4"])
+
+    async def test_only_the_delivered_page_is_marked_read(self):
+        await fetch_chat_history(self.db, 1, 2, limit=4)
+
+        self.db.expire_all()
+        self.assertEqual(self._unread_ids(), [self.ids[1], self.ids[3], self.ids[5]])
+
+    async def test_no_update_when_nothing_is_unread(self):
+        await fetch_chat_history(self.db, 1, 2, limit=4)
+        statements = self._count_statements()
+
+        await fetch_chat_history(self.db, 1, 2, limit=4)
+
+        self.assertFalse(any(s.startswith("UPDATE") for s in statements))
+
+
+class TestEnsureMessageIndexes(TestCase):
+    def test_adds_missing_indexes_to_an_existing_table(self):
+        engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+        with engine.begin() as conn:
+            conn.execute(text("DROP INDEX ix_messages_sender_id_timestamp"))
+            conn.execute(text("DROP INDEX ix_messages_receiver_id_timestamp"))
+
+        ensure_message_indexes(engine)
+        ensure_message_indexes(engine)  # Idempotent
+
+        names = {index["name"] for index in inspect(engine).get_indexes("messages")}
+        self.assertTrue({"ix_messages_sender_id_timestamp", "ix_messages_receiver_id_timestamp",
+                         "ix_messages_sender_id_receiver_id_id"} <= names)
+        engine.dispose()
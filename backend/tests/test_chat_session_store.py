@@ -0,0 +1,186 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pytest
+from langchain_core.embeddings import Embeddings
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.chat_session_store import ChatSessionStore, chat_history
+from services.vector_store import VectorRetriever, VectorStore
+
+
+class FakeChat:
+    """The parts of a Gemini ChatSession the store reads: `history` of role/parts contents."""
+
+    def __init__(self, history=()):
+        self.history = [
+            SimpleNamespace(role=message["role"], parts=[SimpleNamespace(text=text) for text in message["parts"]])
+            for message in history
+        ]
+
+    def say(self, question, answer):
+        self.history += FakeChat([{"role": "user", "parts": [question]}, {"role": "model", "parts": [answer]}]).history
+
+
+class LengthEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("spill_dir", str(tmp_path / "spill"))
+        return ChatSessionStore(**kwargs)
+    return make
+
+@pytest.fixture
+def retriever(tmp_path):
+    index = VectorStore(root=str(tmp_path / "vectors")).build("doc", ["x" * 1000] * 20, LengthEmbeddings())
+    return VectorRetriever(index, LengthEmbeddings())
+
+
+def session(chat=None, retriever=None):
+    return {"chat": chat or FakeChat(), "retriever": retriever}
+
+
+def test_least_recently_used_session_is_evicted(make_store):
+    store = make_store(max_sessions=2)
+    store.put(1, session(), "a")
+    store.put(2, session(), "b")
+    store.get(1)
+    store.put(3, session(), "c")
+
+    assert 1 in store and 3 in store and 2 not in store
+    assert store.get(2) is None
+    assert store.stats()["evictions"] == 1
+
+def test_session_about_another_document_is_dropped(make_store):
+    store = make_store()
+    store.put(1, session(), "a")
+
+    assert store.get(1, "a") is not None
+    assert store.get(1, "b") is None
+    assert 1 not in store
+
+def test_idle_sessions_expire(make_store):
+    store = make_store(ttl=0.05)
+    store.put(1, session(), "a")
+    time.sleep(0.1)
+
+    assert store.get(1) is None
+    assert len(store) == 0
+    assert store.stats()["expirations"] == 1
+
+def test_index_size_counts_against_the_budget(make_store, retriever):
+    index_bytes = retriever.index.nbytes
+    store = make_store(memory_budget=int(index_bytes * 2.5))
+    for user_id in range(1, 5):
+        store.put(user_id, session(retriever=retriever), "doc")
+
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["index_bytes"] == 2 * index_bytes <= stats["memory_budget_bytes"]
+    assert [user_id in store for user_id in range(1, 5)] == [False, False, True, True]
+
+def test_newest_session_is_kept_even_over_budget(make_store, retriever):
+    store = make_store(memory_budget=1)
+    store.put(1, session(retriever=retriever), "doc")
+    store.put(2, session(retriever=retriever), "doc")
+
+    assert len(store) == 1 and 2 in store
+
+def test_history_growth_is_accounted(make_store):
+    store = make_store()
+    chat = FakeChat()
+    chat.say("hi", "hello")
+    store.put(1, session(chat), "a")
+    chat.say("What is MRI?", "Magnetic resonance imaging.")
+    store.account_turn(1, "What is MRI?", "Magnetic resonance imaging.")
+    store.account_turn(2, "Not stored", "ignored")
+
+    assert store.stats()["history_bytes"] == len("hihello") + len("What is MRI?") + len("Magnetic resonance imaging.")
+    store.discard(1)
+    assert store.stats()["bytes"] == 0
+
+def test_history_growth_evicts_older_sessions(make_store):
+    store = make_store(memory_budget=100)
+    store.put(1, session(), "a")
+    store.put(2, session(), "b")
+    store.account_turn(2, "q" * 60, "a" * 60)
+
+    assert 1 not in store and 2 in store
+    assert store.stats()["history_bytes"] == 120
+
+def test_reads_do_not_reserialize_history(make_store, monkeypatch):
+    store = make_store()
+    chat = FakeChat()
+    chat.say("question", "answer")
+    store.put(1, session(chat), "doc")
+    monkeypatch.setattr("services.chat_session_store.chat_history", MagicMock(side_effect=AssertionError))
+
+    for _ in range(3):
+        assert store.get(1, "doc") is not None
+    assert store.stats()["history_bytes"] == len("questionanswer")
+
+def test_history_is_spilled_outside_the_lock(make_store):
+    store = make_store(max_sessions=1)
+    chat = FakeChat()
+    chat.say("question", "answer")
+    store.put(1, session(chat), "doc")
+    held = []
+    write_text = Path.write_text
+
+    def spy(path, *args, **kwargs):
+        held.append(store._lock.locked())
+        return write_text(path, *args, **kwargs)
+
+    with patch.object(Path, "write_text", spy):
+        store.put(2, session(), "doc")
+
+    assert held == [False]
+    assert store.stats()["spilled"] == 1
+
+def test_evicted_history_is_spilled_and_restored(make_store):
+    store = make_store(max_sessions=1)
+    chat = FakeChat()
+    chat.say("question", "answer")
+    store.put(1, session(chat), "doc")
+    store.put(2, session(), "doc")  # Evicts user 1
+
+    assert store.stats()["spilled"] == 1
+    assert store.take_history(1, "other-doc") == []  # A different document: start over
+    store.put(1, session(chat), "doc")
+    store.put(2, session(), "doc")
+
+    history = store.take_history(1, "doc")
+    assert history == [{"role": "user", "parts": ["question"]}, {"role": "model", "parts": ["answer"]}]
+    assert store.take_history(1, "doc") == []  # Taken once
+
+def test_discard_history(make_store):
+    store = make_store(max_sessions=1)
+    chat = FakeChat()
+    chat.say("question", "answer")
+    store.put(1, session(chat), "doc")
+    store.put(2, session(), "doc")
+
+    store.discard_history(1)
+    store.discard_history(1)
+    assert store.take_history(1, "doc") == []
+
+def test_evicted_retriever_stays_usable_by_a_running_request(make_store, retriever):
+    store = make_store(max_sessions=1)
+    store.put(1, session(retriever=retriever), "doc")
+    in_flight = store[1]["retriever"]
+    store.put(2, session(), "doc")
+
+    assert in_flight.get_relevant_documents("x" * 1000)[0].page_content == "x" * 1000
+
+def test_chat_history_of_objects_without_history():
+    assert chat_history(None) == []
+    assert chat_history(SimpleNamespace()) == []
@@ -0,0 +1,111 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+from langchain_core.embeddings import Embeddings
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.embedding_service import EmbeddingService
+
+
+class SlowModel(Embeddings):
+    """Vectors of [len(text), batch number]; each call takes `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(texts))
+        return [[float(len(text)), float(len(self.batch_sizes))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def model():
+    return SlowModel(delay=0.05)
+
+@pytest.fixture
+def service(model):
+    loads = []
+
+    def factory():
+        loads.append(1)
+        return model
+
+    service = EmbeddingService(model_factory=factory, max_batch_size=64, max_wait=0.02)
+    service.loads = loads
+    yield service
+    service.shutdown()
+
+
+def test_results_keep_their_order(service):
+    assert service.embed_documents(["a", "bb", "ccc"]) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert service.embed_query("dddd")[0] == 4.0
+    assert service.embed_documents([]) == []
+
+def test_model_is_loaded_once(service):
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: service.embed_query(str(i)), range(16)))
+    service.warm_up()
+
+    assert service.loads == [1]
+    assert service.stats()["model_loaded"]
+
+def test_concurrent_requests_share_batches(service, model):
+    # Eight uploads of four chunks each, arriving together
+    requests = [[f"upload {u} chunk {c}" for c in range(4)] for u in range(8)]
+    barrier = threading.Barrier(8)
+
+    def embed(texts):
+        barrier.wait()
+        return service.embed_documents(texts)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(embed, requests))
+
+    assert [[v[0] for v in vectors] for vectors in results] == [[float(len(t)) for t in texts] for texts in requests]
+    assert sum(model.batch_sizes) == 32
+    assert len(model.batch_sizes) < 8
+    stats = service.stats()
+    assert stats["requests"] == 8 and stats["texts"] == 32
+    assert stats["avg_batch_size"] > 4
+    assert stats["latency_ms_p50"] is not None and stats["latency_ms_p95"] >= stats["latency_ms_p50"]
+
+def test_batches_are_capped(model):
+    service = EmbeddingService(model_factory=lambda: model, max_batch_size=10, max_wait=0.2)
+    futures = [service.submit([f"{i}-{j}" for j in range(4)]) for i in range(6)]
+    for future in futures:
+        future.result()
+    service.shutdown()
+
+    # Requests are never split; a batch stops growing once it holds 10 texts or more
+    assert all(size <= 12 for size in model.batch_sizes)
+    assert sum(model.batch_sizes) == 24
+
+def test_model_errors_reach_every_caller_in_the_batch():
+    class Broken(Embeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("out of memory")
+
+        def embed_query(self, text):
+            raise RuntimeError("out of memory")
+
+    service = EmbeddingService(model_factory=Broken, max_wait=0.05)
+    futures = [service.submit(["a"]), service.submit(["b"])]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="out of memory"):
+            future.result()
+    service.shutdown()
+
+def test_shutdown_finishes_queued_work(model):
+    service = EmbeddingService(model_factory=lambda: model, max_wait=0.0)
+    futures = [service.submit([str(i)]) for i in range(5)]
+    service.shutdown()
+
+    assert all(future.done() for future in futures)
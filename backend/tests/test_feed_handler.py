@@ -0,0 +1,201 @@
+import sys
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.user import User
+from models.post import Post, PostMedia, PostDocument, Event, Like, Comment
+from services.FeedHandler import hydrate_posts, with_feed_relations
+from services.PostHandler import apply_post_cursor, encode_post_cursor
+from services.reaction import add_comment, delete_comment, ensure_comment_count_column, reconcile_comment_counts
+from utils.post_utils import prepare_post_response
+
+# `universities` uses a Postgres ARRAY column, which SQLite cannot create
+SQLITE_TABLES = [table for table in Base.metadata.sorted_tables if table.name != "universities"]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine, tables=SQLITE_TABLES)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+@pytest.fixture
+def query_counter(engine):
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield statements
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+def _seed_posts(db, count):
+    author = User(username="author", email="author@example.com", university_name="Test Uni")
+    viewer = User(username="viewer", email="viewer@example.com")
+    db.add_all([author, viewer])
+    db.flush()
+
+    post_types = ["text", "media", "document", "event"]
+    base_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        post_type = post_types[i % len(post_types)]
+        post = Post(user_id=author.id, content=f"post {i}", post_type=post_type,
+                    created_at=base_time + timedelta(minutes=i), like_count=i)
+        db.add(post)
+        db.flush()
+        if post_type == "media":
+            db.add(PostMedia(post_id=post.id, media_url=f"media_{i}.jpg", media_type=".jpg"))
+        elif post_type == "document":
+            db.add(PostDocument(post_id=post.id, document_url=f"doc_{i}.pdf", document_type=".pdf"))
+        elif post_type == "event":
+            db.add(Event(post_id=post.id, user_id=author.id, title=f"event {i}", description="desc",
+                         event_datetime=base_time, location="Hall"))
+        for _ in range(i % 3):
+            add_comment(db, Comment(user_id=viewer.id, post_id=post.id, content="nice"))
+        if i % 2:
+            db.add(Like(user_id=viewer.id, post_id=post.id))
+    db.commit()
+    return viewer
+
+def _load_page(db, limit):
+    return with_feed_relations(db.query(Post)).order_by(Post.created_at.desc()).limit(limit).all()
+
+
+def test_hydrate_posts_matches_prepare_post_response(db):
+    viewer = _seed_posts(db, 8)
+    posts = _load_page(db, 8)
+
+    expected = [prepare_post_response(post, viewer, db) for post in posts]
+
+    assert hydrate_posts(posts, viewer, db) == expected
+
+def test_hydrate_posts_empty_page_runs_no_queries(db, query_counter):
+    viewer = _seed_posts(db, 0)
+    query_counter.clear()
+
+    assert hydrate_posts([], viewer, db) == []
+    assert query_counter == []
+
+@pytest.mark.parametrize("small, large", [(2, 8), (4, 40)])
+def test_feed_query_count_is_constant_in_page_size(engine, query_counter, small, large):
+    def count_queries(limit):
+        session = sessionmaker(bind=engine)()
+        viewer = session.query(User).filter(User.username == "viewer").first()
+        query_counter.clear()
+        hydrate_posts(_load_page(session, limit), viewer, session)
+        executed = len(query_counter)
+        session.close()
+        return executed
+
+    seed_session = sessionmaker(bind=engine)()
+    _seed_posts(seed_session, large)
+    seed_session.close()
+
+    assert count_queries(small) == count_queries(large)
+
+
+def test_cursor_pages_walk_the_feed_without_gaps(db):
+    _seed_posts(db, 7)
+    expected_ids = [post.id for post in db.query(Post).order_by(Post.created_at.desc()).all()]
+
+    seen_ids, cursor = [], None
+    while True:
+        page = apply_post_cursor(db.query(Post), cursor, "older").limit(3).all()
+        if not page:
+            break
+        seen_ids += [post.id for post in page]
+        cursor = encode_post_cursor(page[-1])
+
+    assert seen_ids == expected_ids
+
+def test_cursor_newer_returns_posts_above_the_cursor(db):
+    viewer = _seed_posts(db, 5)
+    top = apply_post_cursor(db.query(Post), None, "older").first()
+    cursor = encode_post_cursor(top)
+
+    newer = Post(user_id=viewer.id, content="fresh", post_type="text",
+                 created_at=top.created_at + timedelta(seconds=1))
+    db.add(newer)
+    db.commit()
+
+    page = apply_post_cursor(db.query(Post), cursor, "newer").limit(10).all()
+    assert [post.id for post in page] == [newer.id]
+    assert apply_post_cursor(db.query(Post), encode_post_cursor(newer), "newer").all() == []
+
+
+def test_comment_count_follows_comment_create_and_delete(db):
+    viewer = _seed_posts(db, 1)
+    post = db.query(Post).first()
+
+    root = add_comment(db, Comment(user_id=viewer.id, post_id=post.id, content="root"))
+    add_comment(db, Comment(user_id=viewer.id, post_id=post.id, parent_id=root.id, content="reply"))
+    db.refresh(post)
+    assert post.comment_count == 2
+
+    delete_comment(db, root)
+    db.refresh(post)
+    assert post.comment_count == 0
+    assert db.query(Comment).count() == 0
+
+def test_deleting_a_comment_removes_its_whole_thread_from_the_count(db):
+    viewer = _seed_posts(db, 1)
+    post = db.query(Post).first()
+    root = add_comment(db, Comment(user_id=viewer.id, post_id=post.id, content="root"))
+    reply = add_comment(db, Comment(user_id=viewer.id, post_id=post.id, parent_id=root.id, content="reply"))
+    add_comment(db, Comment(user_id=viewer.id, post_id=post.id, parent_id=reply.id, content="reply to reply"))
+    add_comment(db, Comment(user_id=viewer.id, post_id=post.id, content="other"))
+
+    delete_comment(db, root)
+    db.refresh(post)
+
+    assert post.comment_count == db.query(Comment).count() == 1
+
+def test_ensure_comment_count_column_upgrades_old_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE posts (id INTEGER PRIMARY KEY, content TEXT)"))
+        conn.execute(text("INSERT INTO posts (id, content) VALUES (1, 'before the counter')"))
+
+    ensure_comment_count_column(engine)
+    ensure_comment_count_column(engine)  # Idempotent
+
+    upgraded = {column["name"]: column for column in inspect(engine).get_columns("posts")}["comment_count"]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT comment_count FROM posts")).scalar() == 0
+    engine.dispose()
+
+    # The same column create_all builds for a new database
+    engine = create_engine(f"sqlite:///{tmp_path / 'new.db'}")
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    created = {column["name"]: column for column in inspect(engine).get_columns("posts")}["comment_count"]
+    assert (upgraded["nullable"], upgraded["default"]) == (created["nullable"], created["default"]) == (False, "0")
+    engine.dispose()
+
+def test_reconcile_comment_counts_fixes_drift(db):
+    viewer = _seed_posts(db, 6)
+    posts = db.query(Post).order_by(Post.id).all()
+    db.add(Comment(user_id=viewer.id, post_id=posts[0].id, content="written behind the counter's back"))
+    posts[1].comment_count = 99
+    posts[2].comment_count = -1
+    db.commit()
+
+    assert reconcile_comment_counts(db) == 3
+    for post in db.query(Post).all():
+        assert post.comment_count == db.query(Comment).filter(Comment.post_id == post.id).count()
+    assert reconcile_comment_counts(db) == 0
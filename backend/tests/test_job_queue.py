@@ -0,0 +1,161 @@
+import sys
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from unittest import IsolatedAsyncioTestCase
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+from models.job import OutboxJob, JobStatus
+from services.job_queue import JobQueue, job
+
+calls = []
+failures_left = {}
+job_queue_under_test = None
+
+@job("test_record")
+def record_job(db, value):
+    calls.append(value)
+
+@job("test_spawn")
+def spawn_job(db, key):
+    # Enqueues a child, then fails on its first attempts: the child must exist (and run) once
+    job_queue_under_test.enqueue(db, "test_record", value=f"child of {key}")
+    if failures_left.get(key, 0) > 0:
+        failures_left[key] -= 1
+        raise RuntimeError(f"boom {key}")
+
+@job("test_flaky")
+def flaky_job(db, key):
+    if failures_left.get(key, 0) > 0:
+        failures_left[key] -= 1
+        raise RuntimeError(f"boom {key}")
+    calls.append(key)
+
+
+class TestJobQueue(IsolatedAsyncioTestCase):
+    def setUp(self):
+        calls.clear()
+        failures_left.clear()
+        # File-backed so every worker thread gets its own connection
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self.tmpdir.name}/jobs.db")
+        Base.metadata.create_all(self.engine, tables=[OutboxJob.__table__])
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.db = self.session_factory()
+        self.queue = JobQueue(workers=2, max_attempts=3, retry_base_delay=0.001,
+                              session_factory=self.session_factory)
+        global job_queue_under_test
+        job_queue_under_test = self.queue
+
+    async def asyncTearDown(self):
+        await self.queue.stop()
+        self.db.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _status(self, job_id):
+        self.db.expire_all()
+        return self.db.get(OutboxJob, job_id)
+
+    async def test_enqueued_job_runs_and_is_marked_done(self):
+        await self.queue.start()
+        row = self.queue.enqueue(self.db, "test_record", value=7)
+        await self.queue.join()
+
+        self.assertEqual(calls, [7])
+        stored = self._status(row.id)
+        self.assertEqual(stored.status, JobStatus.DONE)
+        self.assertEqual(stored.attempts, 1)
+        stats = self.queue.stats()
+        self.assertEqual(stats["processed"], 1)
+        self.assertEqual(stats["depth"], 0)
+        self.assertIsNotNone(stats["wait_ms"]["avg"])
+
+    async def test_failed_job_is_retried_until_it_succeeds(self):
+        failures_left["a"] = 2
+        await self.queue.start()
+        row = self.queue.enqueue(self.db, "test_flaky", key="a")
+        await self.queue.join()
+
+        self.assertEqual(calls, ["a"])
+        stored = self._status(row.id)
+        self.assertEqual(stored.status, JobStatus.DONE)
+        self.assertEqual(stored.attempts, 3)
+        self.assertEqual(self.queue.stats()["retried"], 2)
+
+    async def test_job_fails_permanently_after_max_attempts(self):
+        failures_left["b"] = 10
+        await self.queue.start()
+        row = self.queue.enqueue(self.db, "test_flaky", key="b")
+        await self.queue.join()
+
+        stored = self._status(row.id)
+        self.assertEqual(stored.status, JobStatus.FAILED)
+        self.assertEqual(stored.attempts, 3)
+        self.assertIn("boom b", stored.last_error)
+        self.assertEqual(self.queue.stats()["failed"], 1)
+
+    async def test_pending_jobs_survive_a_restart(self):
+        # Enqueued while no workers are running, e.g. right before a crash
+        first = self.queue.enqueue(self.db, "test_record", value=1)
+        second = self.queue.enqueue(self.db, "test_record", value=2)
+        self.assertEqual(calls, [])
+
+        await self.queue.start()
+        await self.queue.join()
+
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(self._status(first.id).status, JobStatus.DONE)
+        self.assertEqual(self._status(second.id).status, JobStatus.DONE)
+
+    async def test_only_stale_running_jobs_are_recovered(self):
+        now = datetime.now(timezone.utc)
+        stale = OutboxJob(name="test_record", payload='{"value": "stale"}', status=JobStatus.RUNNING,
+                          attempts=1, locked_at=now - timedelta(hours=1))
+        live = OutboxJob(name="test_record", payload='{"value": "live"}', status=JobStatus.RUNNING,
+                         attempts=1, locked_at=now)
+        self.db.add_all([stale, live])
+        self.db.commit()
+
+        await self.queue.start()
+        await self.queue.join()
+
+        self.assertEqual(calls, ["stale"])
+        self.assertEqual(self._status(live.id).status, JobStatus.RUNNING)
+
+    async def test_unknown_job_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.queue.enqueue(self.db, "does_not_exist")
+        self.assertEqual(self.db.query(OutboxJob).count(), 0)
+
+    async def test_a_failed_attempt_leaves_no_writes_behind(self):
+        failures_left["c"] = 1
+        await self.queue.start()
+        parent = self.queue.enqueue(self.db, "test_spawn", key="c")
+        await self.queue.join()
+
+        self.assertEqual(calls, ["child of c"])
+        self.assertEqual(self._status(parent.id).status, JobStatus.DONE)
+        self.assertEqual(self.db.query(OutboxJob).filter(OutboxJob.name == "test_record").count(), 1)
+        self.assertEqual(self.queue.stats()["processed"], 2)
+
+    async def test_old_finished_jobs_are_purged(self):
+        now = datetime.now(timezone.utc)
+        self.queue.retention = timedelta(days=7)
+        old_done = OutboxJob(name="test_record", status=JobStatus.DONE, finished_at=now - timedelta(days=8))
+        old_failed = OutboxJob(name="test_record", status=JobStatus.FAILED, finished_at=now - timedelta(days=8))
+        recent = OutboxJob(name="test_record", status=JobStatus.DONE, finished_at=now - timedelta(days=1))
+        pending = OutboxJob(name="test_record", payload='{"value": 1}', created_at=now - timedelta(days=30))
+        self.db.add_all([old_done, old_failed, recent, pending])
+        self.db.commit()
+
+        await self.queue.start()
+        await self.queue.join()
+
+        self.db.expire_all()
+        remaining = {row.id for row in self.db.query(OutboxJob)}
+        self.assertEqual(remaining, {recent.id, pending.id})
+        self.assertEqual(self.queue.stats()["purged"], 2)
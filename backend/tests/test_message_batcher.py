@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.connection, models.notifications, models.post, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.user import User
+from models.chat import Message, MessageType
+from services.message_batcher import MessageBatcher
+
+
+class TestMessageBatcher(IsolatedAsyncioTestCase):
+    def setUp(self):
+        # File-backed so the writer thread gets its own connection
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self.tmpdir.name}/chat.db")
+        # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+        Base.metadata.create_all(self.engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.db = self.session_factory()
+        self.db.add_all([User(id=1, username="alice", email="a@example.com"),
+                         User(id=2, username="bob", email="b@example.com")])
+        self.db.commit()
+        self.commits = []
+        event.listen(self.engine, "commit", lambda conn: self.commits.append(1))
+        self.batcher = MessageBatcher(max_batch=50, max_delay=0.01, session_factory=self.session_factory)
+
+    async def asyncTearDown(self):
+        await self.batcher.stop()
+        self.db.close()
+        self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    async def test_submit_returns_event_with_assigned_id(self):
+        result = await self.batcher.submit(1, 2, "hello")
+
+        stored = self.db.get(Message, result["id"])
+        self.assertEqual(stored.content, "hello")
+        self.assertEqual(result["sender_id"], 1)
+        self.assertEqual(result["receiver_id"], 2)
+        self.assertEqual(result["message_type"], "text")
+        self.assertFalse(result["is_read"])
+
+    async def test_concurrent_messages_share_one_commit_and_keep_order(self):
+        results = await asyncio.gather(*(self.batcher.submit(1 + n % 2, 2 - n % 2, f"m{n}") for n in range(20)))
+
+        self.assertEqual(len(self.commits), 1)
+        self.assertEqual(self.batcher.batches, 1)
+        self.assertEqual([r["content"] for r in results], [f"m{n}" for n in range(20)])
+        ids = [r["id"] for r in results]
+        self.assertEqual(ids, sorted(ids))
+        history = [m.content for m in self.db.query(Message).order_by(Message.timestamp, Message.id)]
+        self.assertEqual(history, [f"m{n}" for n in range(20)])
+
+    async def test_full_batch_is_written_without_waiting_for_the_delay(self):
+        self.batcher.max_delay = 10
+        results = await asyncio.wait_for(
+            asyncio.gather(*(self.batcher.submit(1, 2, f"m{n}") for n in range(50))), timeout=5
+        )
+
+        self.assertEqual(len(results), 50)
+
+    async def test_invalid_message_type_is_rejected_before_queueing(self):
+        with self.assertRaises(ValueError):
+            await self.batcher.submit(1, 2, "hello", message_type="video")
+
+        self.assertEqual(self.db.query(Message).count(), 0)
+
+    async def test_failing_row_does_not_fail_the_rest_of_the_batch(self):
+        # SQLite needs foreign keys switched on per connection
+        event.listen(self.engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+        self.engine.dispose()
+
+        results = await asyncio.gather(
+            self.batcher.submit(1, 2, "ok"),
+            self.batcher.submit(1, 999, "unknown receiver"),
+            self.batcher.submit(2, 1, "also ok"),
+            return_exceptions=True
+        )
+
+        self.assertEqual(results[0]["content"], "ok")
+        self.assertIsInstance(results[1], Exception)
+        self.assertEqual(results[2]["content"], "also ok")
+        self.assertEqual(self.db.query(Message).count(), 2)
+
+    async def test_stop_flushes_queued_messages(self):
+        self.batcher.max_delay = 10
+        pending = asyncio.create_task(self.batcher.submit(1, 2, "last words"))
+        await asyncio.sleep(0)
+
+        await self.batcher.stop()
+
+        self.assertEqual((await pending)["content"], "last words")
+        self.assertEqual(self.db.query(Message).one().message_type, MessageType.text)
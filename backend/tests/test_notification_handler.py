@@ -3,6 +3,8 @@ from unittest.mock import Mock, patch
 from services.NotificationHandler import (
     create_notification,
     send_post_notifications,
+    notify_connections,
+    bulk_create_notifications,
     mark_notification_as_read,
     get_user_notifications,
     get_unread_notification_count,
@@ -93,4 +95,45 @@ class TestNotificationHandler(TestCase):
         )
 
         self.assertEqual(result, expected_count)
-        self.mock_db.commit.assert_called_once()
\ No newline at end of file
+        self.mock_db.commit.assert_called_once()
+
+    def test_bulk_create_notifications_single_insert(self):
+        result = bulk_create_notifications(self.mock_db, [3, 4, 5], self.actor_id, "new_post", self.post_id)
+
+        self.assertEqual(result, 3)
+        self.mock_db.execute.assert_called_once()
+        rows = self.mock_db.execute.call_args[0][1]
+        self.assertEqual([row["user_id"] for row in rows], [3, 4, 5])
+        self.assertTrue(all(row["actor_id"] == self.actor_id and not row["is_read"] for row in rows))
+        self.mock_db.commit.assert_not_called()  # Committed by the caller, e.g. with its job
+        self.mock_db.add.assert_not_called()
+
+    def test_bulk_create_notifications_no_recipients(self):
+        result = bulk_create_notifications(self.mock_db, [], self.actor_id, "new_post", self.post_id)
+
+        self.assertEqual(result, 0)
+        self.mock_db.execute.assert_not_called()
+        self.mock_db.commit.assert_not_called()
+
+    @patch('services.NotificationHandler.get_connections')
+    def test_send_post_notifications(self, mock_get_connections):
+        mock_get_connections.return_value = [
+            {"user_id": 1, "friend_id": self.actor_id},
+            {"user_id": self.actor_id, "friend_id": 7}
+        ]
+
+        result = send_post_notifications(self.mock_db, Mock(id=self.actor_id), Mock(id=self.post_id))
+
+        self.assertEqual(result, 2)
+        rows = self.mock_db.execute.call_args[0][1]
+        self.assertEqual(sorted(row["user_id"] for row in rows), [1, 7])
+        self.mock_db.commit.assert_called_once()
+
+    @patch('services.NotificationHandler.get_connections')
+    def test_notify_connections_without_connections(self, mock_get_connections):
+        mock_get_connections.return_value = []
+
+        result = notify_connections(self.mock_db, self.actor_id, self.post_id)
+
+        self.assertEqual(result, 0)
+        self.mock_db.execute.assert_not_called()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+import pytest
+from fastapi import HTTPException
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import security
+from core.password_hasher import PasswordHasher
+
+WORKER_ROUNDS = "4"  # The cheapest bcrypt cost, read by the worker processes at import
+
+
+class TestPasswordHasher(IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls._previous_rounds = os.environ.get("BCRYPT_ROUNDS")
+        os.environ["BCRYPT_ROUNDS"] = WORKER_ROUNDS
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._previous_rounds is None:
+            os.environ.pop("BCRYPT_ROUNDS", None)
+        else:
+            os.environ["BCRYPT_ROUNDS"] = cls._previous_rounds
+
+    def setUp(self):
+        self.hasher = PasswordHasher(workers=2)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    async def test_hash_and_verify_in_worker_processes(self):
+        hashed = await self.hasher.hash("s3cret")
+
+        self.assertTrue(hashed.startswith(f"$2b$0{WORKER_ROUNDS}$"))
+        self.assertTrue(await self.hasher.verify("s3cret", hashed))
+        self.assertFalse(await self.hasher.verify("wrong", hashed))
+        self.assertEqual(self.hasher.stats()["completed"], 3)
+
+    async def test_verify_and_update_rehashes_an_outdated_cost(self):
+        outdated = security.pwd_context.hash("s3cret", rounds=5)
+
+        valid, new_hash = await self.hasher.verify_and_update("s3cret", outdated)
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith(f"$2b$0{WORKER_ROUNDS}$"))
+
+        self.assertEqual(await self.hasher.verify_and_update("s3cret", new_hash), (True, None))
+        self.assertEqual(await self.hasher.verify_and_update("wrong", new_hash), (False, None))
+
+    async def test_rejects_with_503_when_the_queue_is_full(self):
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        try:
+            first = asyncio.ensure_future(hasher.hash("a"))
+            await asyncio.sleep(0)  # Let the first hash take the only slot
+            with pytest.raises(HTTPException) as exc_info:
+                await hasher.hash("b")
+            self.assertEqual(exc_info.value.status_code, 503)
+            self.assertEqual(exc_info.value.headers, {"Retry-After": "1"})
+
+            await first
+            self.assertEqual(hasher.stats()["rejected"], 1)
+            self.assertEqual(hasher.stats()["pending"], 0)
+        finally:
+            hasher.shutdown()
@@ -0,0 +1,97 @@
+import io
+import os
+import sys
+from pathlib import Path
+import fitz
+import pytest
+from fastapi import UploadFile
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.pdf_extraction import ExtractionProgress, PdfExtractionError, PdfExtractor, spool_to_tempfile
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        for line in range(5):
+            page.insert_text((72, 72 + 14 * line), f"Page {number} line {line} about neurons and MRI scans.")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def whole_text(path):
+    with fitz.open(path) as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    extractor = PdfExtractor(workers=2, pages_per_task=3)
+    yield extractor
+    extractor.shutdown()
+
+@pytest.fixture
+def splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=0)
+
+
+def test_small_document_is_read_inline(tmp_path):
+    path = make_pdf(tmp_path / "short.pdf", 2)
+    extractor = PdfExtractor(workers=2, pages_per_task=16)
+
+    pages = list(extractor.iter_pages(path))
+
+    assert [page.split()[1] for page in pages] == ["0", "1"]
+    assert extractor._executor is None
+
+def test_pages_come_back_in_order(extractor, tmp_path):
+    path = make_pdf(tmp_path / "long.pdf", 20)
+    progress = ExtractionProgress()
+
+    pages = list(extractor.iter_pages(path, progress))
+
+    assert [page.split()[1] for page in pages] == [str(n) for n in range(20)]
+    assert progress.pages_total == progress.pages_done == 20
+
+def test_chunks_cover_the_whole_text_in_order(extractor, splitter, tmp_path):
+    path = make_pdf(tmp_path / "long.pdf", 11)
+    progress = ExtractionProgress()
+
+    chunks = list(extractor.iter_chunks(path, splitter, progress))
+
+    assert max(len(chunk) for chunk in chunks) <= 200
+    assert " ".join(chunks).split() == whole_text(path).split()
+    assert progress.chunks == len(chunks)
+
+def test_empty_pages_are_skipped(splitter, tmp_path):
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page().insert_text((72, 72), "Only text in the document")
+    doc.new_page()
+    doc.save(str(tmp_path / "sparse.pdf"))
+    doc.close()
+
+    chunks = list(PdfExtractor(workers=1).iter_chunks(str(tmp_path / "sparse.pdf"), splitter))
+
+    assert chunks == ["Only text in the document"]
+
+def test_unreadable_file_raises(extractor, tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(PdfExtractionError):
+        list(extractor.iter_pages(str(path)))
+
+@pytest.mark.asyncio
+async def test_spool_to_tempfile(tmp_path):
+    data = make_pdf(tmp_path / "upload.pdf", 1)
+    content = Path(data).read_bytes()
+
+    path = await spool_to_tempfile(UploadFile(file=io.BytesIO(content)))
+
+    try:
+        assert path.endswith(".pdf")
+        assert Path(path).read_bytes() == content
+    finally:
+        os.remove(path)
@@ -193,9 +193,9 @@ def override_dependencies(monkeypatch):
 
     monkeypatch.setattr(post, "moderate_text", mock_moderate_text)
 
-    # Mock send_post_notifications
-    mock_send_notifications = MagicMock()
-    monkeypatch.setattr(post, "send_post_notifications", mock_send_notifications)
+    # Mock the job queue hand-off for post side effects
+    mock_enqueue_side_effects = MagicMock()
+    monkeypatch.setattr(post, "enqueue_post_side_effects", mock_enqueue_side_effects)
 
     # Mock helper functions
     mock_get_user_like_status = MagicMock()
@@ -363,6 +363,59 @@ def test_comment_post_with_parent_id(override_dependencies):
     mock_notify_if_not_self.assert_not_called()
     mock_create_notification.assert_not_called()
 
+# Test for deleting own comment
+def test_delete_comment(override_dependencies):
+    mock_session, mock_notify_if_not_self, mock_create_notification = override_dependencies
+
+    mock_comment_query = MagicMock()
+    mock_comment_query.filter.return_value.first.return_value = fake_comment
+    mock_session.query.side_effect = lambda model: (
+        mock_comment_query if model == Comment else
+        MagicMock()
+    )
+
+    response = client.delete("/interactions/2/comment/1")
+
+    assert response.status_code == 200
+    assert response.json()["message"] == "Comment deleted successfully"
+    mock_session.delete.assert_called_once_with(fake_comment)
+    mock_session.commit.assert_called()
+
+# Test for deleting a comment through another post's URL
+def test_delete_comment_wrong_post(override_dependencies):
+    mock_session, mock_notify_if_not_self, mock_create_notification = override_dependencies
+
+    mock_comment_query = MagicMock()
+    mock_comment_query.filter.return_value.first.return_value = fake_comment
+    mock_session.query.side_effect = lambda model: (
+        mock_comment_query if model == Comment else
+        MagicMock()
+    )
+
+    response = client.delete("/interactions/3/comment/1")
+
+    assert response.status_code == 404
+    mock_session.delete.assert_not_called()
+
+# Test for deleting someone else's comment
+def test_delete_comment_not_owner(override_dependencies):
+    mock_session, mock_notify_if_not_self, mock_create_notification = override_dependencies
+
+    other_comment = Comment(id=2, user_id=fake_other_user.id, post_id=2, content="Not yours", parent_id=None)
+    mock_comment_query = MagicMock()
+    mock_comment_query.filter.return_value.first.return_value = other_comment
+    mock_session.query.side_effect = lambda model: (
+        mock_comment_query if model == Comment else
+        MagicMock()
+    )
+
+    response = client.delete("/interactions/2/comment/2")
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Not authorized to delete this comment."
+    mock_session.delete.assert_not_called()
+    mock_session.commit.assert_not_called()
+
 # Test for sharing a post
 def test_share_post(override_dependencies):
     mock_session, mock_notify_if_not_self, mock_create_notification = override_dependencies
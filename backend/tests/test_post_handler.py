@@ -5,9 +5,12 @@ from services.PostHandler import (
     create_post_entry,
     extract_hashtags,
     get_user_like_status,
+    encode_post_cursor,
+    decode_post_cursor,
     STATUS_404_ERROR
 )
 from fastapi import HTTPException
+from datetime import datetime
 
 class TestPostHandler(TestCase):
     def setUp(self):
@@ -38,6 +41,18 @@ class TestPostHandler(TestCase):
         self.mock_db.refresh.assert_called_once_with(mock_post)
         self.assertEqual(result, mock_post)
 
+    def test_post_cursor_round_trip(self):
+        created_at = datetime(2025, 4, 30, 13, 42, 4, 123456)
+        cursor = encode_post_cursor(Mock(id=42, created_at=created_at))
+
+        self.assertEqual(decode_post_cursor(cursor), (created_at, 42))
+
+    def test_decode_post_cursor_invalid(self):
+        for cursor in ["not-a-cursor", "W10=", "WyJub3QgYSBkYXRlIiwgMV0="]:
+            with self.assertRaises(HTTPException) as context:
+                decode_post_cursor(cursor)
+            self.assertEqual(context.exception.status_code, 400)
+
     # def test_get_post_by_id_not_found(self):
     #     self.mock_db.query().filter().first = Mock(return_value=None)
         
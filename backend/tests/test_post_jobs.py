@@ -0,0 +1,66 @@
+from unittest import TestCase
+from unittest.mock import Mock, patch
+from services.post_jobs import (
+    send_post_notifications_job,
+    tag_post_hashtags_job,
+    moderate_post_job,
+    enqueue_post_side_effects,
+    MODERATE_POST,
+    TAG_POST_HASHTAGS,
+    SEND_POST_NOTIFICATIONS
+)
+
+class TestPostJobs(TestCase):
+    def setUp(self):
+        self.mock_db = Mock()
+        self.mock_post = Mock(id=1, user_id=2, content="Hello #world", media=[], documents=[], event=None)
+        self.mock_db.query.return_value.filter.return_value.first.return_value = self.mock_post
+
+    @patch('services.post_jobs.job_queue')
+    def test_enqueue_post_side_effects_starts_with_moderation(self, mock_queue):
+        enqueue_post_side_effects(self.mock_db, 1)
+
+        mock_queue.enqueue.assert_called_once_with(self.mock_db, MODERATE_POST, post_id=1)
+
+    @patch('services.post_jobs.job_queue')
+    @patch('services.post_jobs.moderate_text', return_value=False)
+    def test_moderate_post_job_clean_post_queues_follow_ups(self, mock_moderate, mock_queue):
+        moderate_post_job(self.mock_db, post_id=1)
+
+        self.mock_db.delete.assert_not_called()
+        jobs = mock_queue.enqueue_many.call_args[0][1]
+        self.assertEqual(jobs, [
+            (TAG_POST_HASHTAGS, {"post_id": 1}),
+            (SEND_POST_NOTIFICATIONS, {"author_id": 2, "post_id": 1}),
+        ])
+
+    @patch('services.post_jobs.job_queue')
+    @patch('services.post_jobs.moderate_text', return_value=True)
+    def test_moderate_post_job_holds_back_flagged_post(self, mock_moderate, mock_queue):
+        moderate_post_job(self.mock_db, post_id=1)
+
+        self.mock_db.delete.assert_not_called()
+        jobs = mock_queue.enqueue_many.call_args[0][1]
+        self.assertEqual(jobs, [(TAG_POST_HASHTAGS, {"post_id": 1})])
+
+    @patch('services.post_jobs.job_queue')
+    @patch('services.post_jobs.moderate_text')
+    def test_moderate_post_job_post_already_deleted(self, mock_moderate, mock_queue):
+        self.mock_db.query.return_value.filter.return_value.first.return_value = None
+
+        moderate_post_job(self.mock_db, post_id=1)
+
+        mock_moderate.assert_not_called()
+        mock_queue.enqueue_many.assert_not_called()
+
+    @patch('services.post_jobs.tag_post_hashtags')
+    def test_tag_post_hashtags_job(self, mock_tag):
+        tag_post_hashtags_job(self.mock_db, post_id=1)
+
+        mock_tag.assert_called_once_with(self.mock_db, self.mock_post)
+
+    @patch('services.post_jobs.notify_connections')
+    def test_send_post_notifications_job(self, mock_notify):
+        send_post_notifications_job(self.mock_db, author_id=2, post_id=1)
+
+        mock_notify.assert_called_once_with(self.mock_db, 2, 1, "new_post")
@@ -1,11 +1,13 @@
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from fastapi import HTTPException, UploadFile
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from database.session import Base
 from models.post import Post, Comment
 from models.user import User
 from models.university import University
@@ -14,7 +16,8 @@ from utils.post_utils import (
     validate_post_ownership,
     prepare_post_response,
     handle_media_upload,
-    create_base_post
+    create_base_post,
+    tag_post_hashtags
 )
 
 @pytest.fixture
@@ -74,7 +77,7 @@ def test_prepare_post_response(mock_additional_data, mock_like_status, mock_db,
     # Setup
     mock_like_status.return_value = True
     mock_additional_data.return_value = {"additional": "data"}
-    mock_db.query.return_value.filter.return_value.count.return_value = 3
+    mock_post.comment_count = 3
 
     # Execute
     result = prepare_post_response(mock_post, mock_user, mock_db)
@@ -91,7 +94,7 @@ def test_prepare_post_response(mock_additional_data, mock_like_status, mock_db,
     assert result["additional"] == "data"
 
 @pytest.mark.asyncio
-@patch('utils.post_utils.upload_to_cloudinary')
+@patch('utils.post_utils.upload_to_cloudinary', new_callable=AsyncMock)
 async def test_handle_media_upload(mock_upload):
     # Setup
     mock_file = Mock(spec=UploadFile)
@@ -107,7 +110,7 @@ async def test_handle_media_upload(mock_upload):
     # Assert
     assert result["secure_url"] == "https://example.com/image.jpg"
     assert result["resource_type"] == "image"
-    mock_upload.assert_called_once_with(mock_file.file, folder_name="test_folder")
+    mock_upload.assert_awaited_once_with(mock_file, folder_name="test_folder")
 
 @patch('utils.post_utils.Post')
 @patch('utils.post_utils.extract_hashtags')
@@ -137,43 +140,62 @@ def test_create_base_post_without_hashtags(mock_extract_hashtags, mock_post_clas
     mock_db.commit.assert_called_once()
     mock_db.refresh.assert_called_once_with(mock_post)
 
-@patch('utils.post_utils.Post')
-@patch('utils.post_utils.extract_hashtags')
-def test_create_base_post_with_hashtags(mock_extract_hashtags, mock_post_class, mock_db):
-    # Setup
-    mock_extract_hashtags.return_value = ["TestUniversity"]
-    
-    # Mock universities query
-    mock_universities = [("TestUniversity",)]
-    mock_db.query.return_value.all.return_value = mock_universities
-    
-    # Mock existing hashtag
-    existing_hashtag = Mock(spec=Hashtag)
-    existing_hashtag.name = "testuniversity"
-    existing_hashtag.usage_count = 1
-    mock_db.query.return_value.filter_by.return_value.first.return_value = existing_hashtag
-
-    # Mock post
-    mock_post = Mock()
-    mock_post.content = "Post with #TestUniversity hashtag"
-    mock_post.hashtags = []
-    mock_post_class.return_value = mock_post
-    
-    # Execute
-    result = create_base_post(
-        mock_db,
-        user_id=1,
-        content="Post with #TestUniversity hashtag",
-        post_type="text"
-    )
+@pytest.fixture
+def sqlite_db():
+    # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+    import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401
+    import models.research_collaboration, models.collaboration_request  # noqa: F401
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _make_post(db, content):
+    user = db.query(User).first() or User(username="author", email="author@example.com")
+    post = Post(user=user, content=content, post_type="text")
+    db.add(post)
+    db.commit()
+    return post
 
-    # Assert
-    mock_post_class.assert_called_once_with(
-        user_id=1,
-        content="Post with #TestUniversity hashtag",
-        post_type="text"
-    )
-    assert existing_hashtag in mock_post.hashtags
-    mock_db.add.assert_called_with(mock_post)
-    mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once_with(mock_post)
\ No newline at end of file
+@patch('utils.post_utils.get_university_names', return_value=frozenset({"testuniversity"}))
+def test_tag_post_hashtags(mock_names, sqlite_db):
+    existing = Hashtag(name="testuniversity", usage_count=1)
+    sqlite_db.add(existing)
+    sqlite_db.commit()
+    post = _make_post(sqlite_db, "Post with #TestUniversity #random hashtags")
+
+    tag_post_hashtags(sqlite_db, post)
+
+    sqlite_db.expire_all()
+    assert [tag.name for tag in post.hashtags] == ["testuniversity"]
+    assert existing.usage_count == 2
+    assert sqlite_db.query(Hashtag).count() == 1
+
+@patch('utils.post_utils.get_university_names', return_value=frozenset({"buet", "du"}))
+def test_tag_post_hashtags_batches_new_and_repeated_tags(mock_names, sqlite_db):
+    post = _make_post(sqlite_db, "#BUET vs #du, again #buet")
+    sqlite_db.refresh(post)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(sqlite_db.get_bind(), "before_cursor_execute", listener)
+
+    tag_post_hashtags(sqlite_db, post)
+
+    event.remove(sqlite_db.get_bind(), "before_cursor_execute", listener)
+    # One upsert for the tags and one insert for the links, however many tags there are
+    assert len(statements) == 2
+    counts = dict(sqlite_db.query(Hashtag.name, Hashtag.usage_count).all())
+    assert counts == {"buet": 2, "du": 1}
+    sqlite_db.expire_all()
+    assert sorted(tag.name for tag in post.hashtags) == ["buet", "du"]
+
+@patch('utils.post_utils.get_university_names', return_value=frozenset({"buet"}))
+def test_tag_post_hashtags_without_university_tags(mock_names, mock_db):
+    mock_post = Mock(content="Nothing #here")
+
+    tag_post_hashtags(mock_db, mock_post)
+
+    mock_db.execute.assert_not_called()
+    mock_db.commit.assert_not_called()
@@ -0,0 +1,141 @@
+import sys
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.post, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.user import User
+from services.AuthHandler import AuthHandler
+from services.principal_cache import PrincipalCache, principal_cache
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # A file, not :memory:, so each session has its own connection and sees only committed rows
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        User(id=1, username="alice", email="alice@uni.edu", university_name="BUET"),
+        User(id=2, username="bob", email="bob@uni.edu"),
+    ])
+    db.commit()
+    db.close()
+    principal_cache.clear()
+    yield factory
+    principal_cache.clear()
+    engine.dispose()
+
+def _count_queries(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def _current_user(db, username):
+    with patch("jwt.decode", return_value={"sub": username}):
+        return AuthHandler.get_current_user(db, "token")
+
+
+def test_second_request_skips_the_user_query(session_factory):
+    first = session_factory()
+    assert _current_user(first, "alice").id == 1
+    first.close()
+
+    db = session_factory()
+    statements = _count_queries(db)
+    user = _current_user(db, "alice")
+
+    assert (user.id, user.username, user.university_name) == (1, "alice", "BUET")
+    assert statements == []
+    assert user in db  # Attached to this request's session
+    db.close()
+
+def test_cached_user_changes_are_persisted_and_invalidate(session_factory):
+    db = session_factory()
+    _current_user(db, "alice")
+    db.close()
+
+    db = session_factory()
+    user = _current_user(db, "alice")
+    user.university_name = "DU"
+    db.commit()
+    db.close()
+
+    db = session_factory()
+    assert principal_cache.get(db, "alice") is None
+    assert _current_user(db, "alice").university_name == "DU"
+    db.close()
+
+def test_deleted_user_is_no_longer_authenticated(session_factory):
+    db = session_factory()
+    _current_user(db, "bob")
+    db.delete(db.get(User, 2))
+    db.commit()
+    db.close()
+
+    db = session_factory()
+    with pytest.raises(HTTPException) as exc_info:
+        _current_user(db, "bob")
+    assert exc_info.value.status_code == 404
+    db.close()
+
+def test_rename_invalidates_the_old_subject(session_factory):
+    db = session_factory()
+    _current_user(db, "bob")
+    db.get(User, 2).username = "robert"
+    db.commit()
+
+    assert principal_cache.get(db, "bob") is None
+    db.close()
+
+def test_row_recached_before_commit_is_invalidated_on_commit(session_factory):
+    writer = session_factory()
+    writer.get(User, 1).university_name = "DU"
+    writer.flush()
+
+    # Another request authenticates between the flush and the commit, caching the committed row
+    reader = session_factory()
+    assert _current_user(reader, "alice").university_name == "BUET"
+    reader.close()
+
+    writer.commit()
+    writer.close()
+
+    db = session_factory()
+    assert principal_cache.get(db, "alice") is None
+    assert _current_user(db, "alice").university_name == "DU"
+    db.close()
+
+def test_entries_expire(session_factory):
+    cache = PrincipalCache(ttl=0)
+    db = session_factory()
+    cache.put("alice", db.get(User, 1))
+
+    assert cache.get(db, "alice") is None
+    assert cache.stats()["size"] == 0
+    db.close()
+
+def test_least_recently_used_entry_is_evicted(session_factory):
+    cache = PrincipalCache(maxsize=2)
+    db = session_factory()
+    alice, bob = db.get(User, 1), db.get(User, 2)
+    cache.put("alice", alice)
+    cache.put("bob", bob)
+    cache.get(db, "alice")
+    cache.put("carol", bob)
+
+    assert cache.get(db, "bob") is None
+    assert cache.get(db, "alice") is not None
+    assert cache.stats() == {
+        "size": 2, "maxsize": 2, "ttl_seconds": 60.0, "hits": 2, "misses": 1,
+        "hit_rate": 0.6667, "evictions": 1, "invalidations": 0
+    }
+    db.close()
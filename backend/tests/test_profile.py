@@ -3,7 +3,7 @@ from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import os
 import shutil
 import io
@@ -192,21 +192,23 @@ def test_complete_profile_step1_new_university(override_dependencies):
     mock_session.query = get_query
     
     # Make the request
-    response = client.post(
-        "/profile/step1",
-        data={
-            "university_name": "New University",
-            "department": "Physics",
-            "fields_of_interest": ["Physics", "Mathematics"]
-        }
-    )
+    with patch("routes.profile.invalidate_university_names") as mock_invalidate:
+        response = client.post(
+            "/profile/step1",
+            data={
+                "university_name": "New University",
+                "department": "Physics",
+                "fields_of_interest": ["Physics", "Mathematics"]
+            }
+        )
     
     # Assertions
     assert response.status_code == 200
     
-    # Verify University was created
+    # Verify University was created and the cached name set dropped
     mock_session.add.assert_called()
     mock_session.commit.assert_called()
+    mock_invalidate.assert_called_once()
     
     # Verify user was updated
     assert test_user.university_name == "New University"
@@ -227,7 +229,7 @@ def test_upload_profile_picture_success(override_dependencies, mock_upload_dir,
     mock_cloudinary_result = {
         "secure_url": "https://res.cloudinary.com/test/image/upload/test.jpg"
     }
-    with patch("routes.profile.upload_to_cloudinary", return_value=mock_cloudinary_result):
+    with patch("routes.profile.upload_to_cloudinary", new_callable=AsyncMock, return_value=mock_cloudinary_result):
         # Make the request
         response = client.post(
             "/profile/upload_picture",
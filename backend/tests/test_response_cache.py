@@ -0,0 +1,156 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+import pytest
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.chat_session_store import chat_history
+from services.llm_client import StubModel, create_llm_client, record_turn
+from services.response_cache import ResponseCache, normalize_prompt, response_key
+
+
+def test_normalized_prompts_share_a_key():
+    assert normalize_prompt("  What is  MRI? ") == normalize_prompt("what is mri") == "what is mri"
+    assert response_key("What is MRI?", "ctx") == response_key("what is mri", "ctx")
+    assert response_key("What is MRI?", "ctx") != response_key("What is MRI?", "other ctx")
+    assert response_key("What is MRI?") != response_key("What is MRI?", "")
+
+def test_answers_are_cached():
+    cache = ResponseCache()
+    compute = MagicMock(return_value="answer")
+
+    assert cache.get_or_compute("k", compute) == ("answer", True)
+    assert cache.get_or_compute("k", compute) == ("answer", False)
+    compute.assert_called_once()
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_answers_expire():
+    cache = ResponseCache(ttl=0.05)
+    cache.get_or_compute("k", lambda: "old")
+    time.sleep(0.1)
+
+    assert cache.get_or_compute("k", lambda: "new") == ("new", True)
+
+def test_least_recently_used_answer_is_evicted():
+    cache = ResponseCache(maxsize=2)
+    for key in ("a", "b", "a", "c"):
+        cache.get_or_compute(key, lambda: key)
+
+    assert cache.get_or_compute("b", lambda: "again") == ("again", True)
+    assert cache.stats()["evictions"] >= 1
+
+def test_identical_in_flight_requests_are_coalesced():
+    cache = ResponseCache()
+    model = StubModel(delay=0.2)
+    barrier = threading.Barrier(8)
+
+    def ask(_):
+        barrier.wait()
+        return cache.get_or_compute("k", lambda: model.generate_content("What is MRI?").text)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(ask, range(8)))
+
+    assert model.calls == 1
+    assert {answer for answer, _ in results} == {"Stub answer: What is MRI?"}
+    assert sum(computed for _, computed in results) == 1
+    assert cache.stats()["coalesced"] == 7
+
+def test_failures_reach_waiters_and_are_not_cached():
+    cache = ResponseCache()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("quota exceeded")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(cache.get_or_compute, "k", failing)
+        started.wait()
+        follower = pool.submit(cache.get_or_compute, "k", lambda: "unused")
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="quota exceeded"):
+                future.result()
+
+    assert cache.get_or_compute("k", lambda: "retried") == ("retried", True)
+
+
+def test_stub_chat_and_recorded_turns():
+    model = create_llm_client("stub")
+    chat = model.start_chat(history=[{"role": "user", "parts": ["hi"]}, {"role": "model", "parts": ["hello"]}])
+
+    assert chat.send_message("context\nWhat is MRI?").text == "Stub answer: What is MRI?"
+    record_turn(chat, "What is CT?", "cached answer")
+
+    assert model.calls == 1
+    assert [message["parts"] for message in chat_history(chat)] == [
+        ["hi"], ["hello"], ["context\nWhat is MRI?"], ["Stub answer: What is MRI?"], ["What is CT?"], ["cached answer"]
+    ]
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_llm_client("gpt")
+
+
+@pytest.fixture
+def chatbot():
+    from api.v1.endpoints.chatbot import huggingface
+    model = StubModel()
+    with patch.object(huggingface, "gemini_model", model), \
+            patch.object(huggingface, "response_cache", ResponseCache()):
+        huggingface.user_sessions.clear()
+        yield huggingface, model
+        huggingface.user_sessions.clear()
+
+def ask(huggingface, user_id, question, db=None):
+    db = db or MagicMock()
+    # Stands in for both the User row and the ChatbotSession row
+    db.query.return_value.filter.return_value.first.return_value = SimpleNamespace(id=user_id, document_hash="doc")
+    return huggingface.api_response(req=question, current_user=SimpleNamespace(id=user_id), db=db)["response"]
+
+def test_repeated_questions_without_a_pdf_reach_the_model_once(chatbot):
+    huggingface, model = chatbot
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.side_effect = [SimpleNamespace(id=1), None] * 2
+
+    assert ask(huggingface, 1, "What is machine learning?", db) == "Stub answer: What is machine learning?"
+    assert ask(huggingface, 1, "what is machine learning", db) == "Stub answer: What is machine learning?"
+    assert model.calls == 1
+
+def test_questions_about_the_same_passages_share_answers(chatbot):
+    huggingface, model = chatbot
+    retriever = MagicMock()
+    retriever.get_relevant_documents.return_value = [SimpleNamespace(page_content="MRI uses magnets.")]
+    for user_id in (1, 2):
+        huggingface.user_sessions.put(user_id, {"chat": model.start_chat(), "retriever": retriever}, "doc")
+
+    first = ask(huggingface, 1, "How does MRI work?")
+    second = ask(huggingface, 2, "How does MRI work?")
+
+    assert first == second == "Stub answer: Now answer this question: How does MRI work?"
+    assert model.calls == 1
+    # The cached answer is still part of the second user's conversation
+    assert chat_history(huggingface.user_sessions[2]["chat"])[-1]["parts"] == [second]
+
+def test_follow_ups_are_not_shared_between_conversations(chatbot):
+    huggingface, model = chatbot
+    retriever = MagicMock()
+    retriever.get_relevant_documents.return_value = [SimpleNamespace(page_content="MRI uses magnets.")]
+    ongoing = model.start_chat(history=[{"role": "user", "parts": ["Answer in French."]}, {"role": "model", "parts": ["D'accord."]}])
+    ongoing.send_message = MagicMock(return_value=SimpleNamespace(text="L'IRM utilise des aimants."))
+    huggingface.user_sessions.put(1, {"chat": ongoing, "retriever": retriever}, "doc")
+    huggingface.user_sessions.put(2, {"chat": model.start_chat(), "retriever": retriever}, "doc")
+
+    first = ask(huggingface, 1, "How does MRI work?")
+    second = ask(huggingface, 2, "How does MRI work?")
+    again = ask(huggingface, 1, "How does MRI work?")
+
+    assert first == again == "L'IRM utilise des aimants."
+    assert second == "Stub answer: Now answer this question: How does MRI work?"
+    assert ongoing.send_message.call_count == 2
+    assert huggingface.response_cache.stats()["misses"] == 1
@@ -3,11 +3,23 @@ from unittest.mock import Mock, patch
 from datetime import datetime
 from fastapi import HTTPException
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query, Session, sessionmaker
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.collaboration_request, models.hashtag  # noqa: F401 (mapper registry)
+from models.post import Post
+from models.user import User
+from models.research_paper import ResearchPaper
+from models.research_collaboration import ResearchCollaboration
+from services.research_service import search_papers, search_research_collaborations
 from services.SearchHandler import (
     SearchHandler,
     _format_post_response,
     _format_user_response,
+    _match_score,
     _search_posts_by_keyword,
+    _search_universities,
     _search_users_by_keyword
 )
 
@@ -51,15 +63,17 @@ class TestSearchHandler(TestCase):
         self.assertEqual(result["email"], "test@example.com")
         self.assertEqual(result["profile_picture"], "avatar.jpg")
 
-    def test_search_posts_success(self):
+    @patch('services.SearchHandler.get_search_backend')
+    def test_search_posts_success(self, mock_get_backend):
         mock_post = Mock()
         mock_post.created_at = datetime.now()
-        self.mock_db.query().filter().all.return_value = [mock_post]
+        mock_get_backend.return_value.search_posts.return_value = [mock_post]
         
         with patch('services.SearchHandler._format_post_response') as mock_format:
             mock_format.return_value = {"id": 1, "content": "test"}
-            result = SearchHandler.search_posts(self.mock_db, self.keyword)
+            result = SearchHandler.search_posts(self.mock_db, self.keyword, limit=5, offset=10)
         
+        mock_get_backend.return_value.search_posts.assert_called_once_with(self.mock_db, self.keyword, 5, 10)
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]["id"], 1)
         self.assertEqual(result[0]["content"], "test")
@@ -73,9 +87,10 @@ class TestSearchHandler(TestCase):
         assert exc_info.value.status_code == 500
         assert exc_info.value.detail == "Internal server error"
 
-    def test_search_users_success(self):
+    @patch('services.SearchHandler.get_search_backend')
+    def test_search_users_success(self, mock_get_backend):
         mock_user = Mock()
-        self.mock_db.query().filter().all.return_value = [mock_user]
+        mock_get_backend.return_value.search_users.return_value = [mock_user]
         
         with patch('services.SearchHandler._format_user_response') as mock_format:
             mock_format.return_value = {"id": 1, "username": "test"}
@@ -95,24 +110,96 @@ class TestSearchHandler(TestCase):
         assert exc_info.value.detail == "Internal server error"
 
     def test_search_all_success(self):
+        other_sources = {
+            "papers": lambda db, keyword, limit, offset: [{"id": 2, "title": "test"}],
+            "collaborations": lambda db, keyword, limit, offset: [],
+            "universities": lambda db, keyword, limit, offset: [],
+        }
         with patch('services.SearchHandler.SearchHandler.search_posts') as mock_search_posts:
             with patch('services.SearchHandler.SearchHandler.search_users') as mock_search_users:
-                mock_search_posts.return_value = [{"id": 1, "content": "test"}]
-                mock_search_users.return_value = [{"id": 1, "username": "test"}]
-                
-                result = SearchHandler.search_all(self.mock_db, self.keyword)
+                with patch.dict('services.SearchHandler.SEARCH_SOURCES', other_sources):
+                    mock_search_posts.return_value = [{"id": 1, "content": "a test post"}]
+                    mock_search_users.return_value = [{"id": 1, "username": "test"}]
+
+                    result = SearchHandler.search_all(self.mock_db, self.keyword, session_factory=Mock)
         
         self.assertIn("posts", result)
         self.assertIn("users", result)
         self.assertEqual(len(result["posts"]), 1)
         self.assertEqual(len(result["users"]), 1)
-        self.assertEqual(result["posts"][0]["content"], "test")
+        self.assertEqual(result["posts"][0]["content"], "a test post")
         self.assertEqual(result["users"][0]["username"], "test")
+        self.assertEqual(result["collaborations"], [])
+        self.assertEqual(set(result["timings"]), {"posts", "users", "papers", "collaborations", "universities"})
+        # Exact matches first, in source order, then the word match in the post
+        self.assertEqual(
+            [(r["type"], r["item"]["id"]) for r in result["results"]],
+            [("users", 1), ("papers", 2), ("posts", 1)]
+        )
+        mock_search_posts.assert_called_once()
+        self.assertEqual(mock_search_posts.call_args.args[1:], (self.keyword, 20, 0))
 
     def test_search_all_error(self):
         with patch('services.SearchHandler.SearchHandler.search_posts', side_effect=Exception("Error")):
             with pytest.raises(HTTPException) as exc_info:
-                SearchHandler.search_all(self.mock_db, self.keyword)
+                SearchHandler.search_all(self.mock_db, self.keyword, session_factory=Mock)
             
             assert exc_info.value.status_code == 500
-            assert exc_info.value.detail == "Internal server error"
\ No newline at end of file
+            assert exc_info.value.detail == "Internal server error"
+
+    def test_match_score(self):
+        self.assertEqual(_match_score("Data", "data"), 1.0)
+        self.assertEqual(_match_score("data", "Data science"), 0.8)
+        self.assertEqual(_match_score("data", "big data"), 0.6)
+        self.assertEqual(_match_score("data", "metadata"), 0.4)
+        self.assertEqual(_match_score("data", None), 0.1)
+
+
+def test_search_all_queries_every_source_on_its_own_session(tmp_path):
+    # File-backed, since the sources run on pool threads with separate connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    session_factory = sessionmaker(bind=engine)
+    db = session_factory()
+    db.add_all([
+        User(id=1, username="robotics_fan", email="fan@uni.edu"),
+        Post(id=1, user_id=1, content="Robotics club meets today", post_type="text", created_at=datetime(2025, 1, 1)),
+        ResearchPaper(id=1, title="Robotics", author="A. Author", research_field="CS", uploader_id=1),
+        ResearchCollaboration(id=1, title="Swarm robotics", research_field="CS", details="", creator_id=1),
+    ])
+    db.commit()
+
+    sessions = []
+    def tracking_factory():
+        session = session_factory()
+        sessions.append(session)
+        return session
+
+    with patch.dict("services.SearchHandler.SEARCH_SOURCES", {"universities": lambda *args: []}):
+        result = SearchHandler.search_all(db, "robotics", limit=5, session_factory=tracking_factory)
+
+    assert [p["id"] for p in result["posts"]] == [1]
+    assert [u["id"] for u in result["users"]] == [1]
+    assert [p["title"] for p in result["papers"]] == ["Robotics"]
+    assert [c["title"] for c in result["collaborations"]] == ["Swarm robotics"]
+    assert [(r["type"], r["score"]) for r in result["results"]][0] == ("papers", 1.0)
+    assert len(sessions) == 5 and db not in sessions
+    db.close()
+    engine.dispose()
+
+@pytest.mark.parametrize("search", [_search_universities, search_papers, search_research_collaborations])
+def test_keyword_searches_escape_like_wildcards(search):
+    captured = []
+
+    def fake_all(query):
+        compiled = query.statement.compile(dialect=postgresql.dialect())
+        captured.append((str(compiled), compiled.params))
+        return []
+
+    with patch.object(Query, "all", fake_all):
+        assert search(Session(), "100%_", limit=10, offset=0) == []
+
+    sql, params = captured[0]
+    assert "ESCAPE" in sql
+    assert "%100\\%\\_%" in params.values()
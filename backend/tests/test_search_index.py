@@ -0,0 +1,178 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.user import User
+from models.post import Post, Event
+from services.search_index import InvertedIndex, SearchIndex
+from services.search_backends import MemorySearchBackend, get_search_backend
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite:///:memory:")
+    # `universities` uses a Postgres ARRAY column, which SQLite cannot create
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    base_time = datetime(2025, 1, 1)
+    db.add_all([
+        User(id=1, username="alice", email="alice@uni.edu"),
+        User(id=2, username="datafan", email="fan@example.com"),
+        User(id=3, username="bob", email="bob_data@example.com"),
+    ])
+    db.add_all([
+        Post(id=1, user_id=1, content="Intro to data science", post_type="text", created_at=base_time),
+        Post(id=2, user_id=1, content="Cooking tips", post_type="text", created_at=base_time + timedelta(hours=1)),
+        Post(id=3, user_id=2, content="Morning run", post_type="text", created_at=base_time + timedelta(hours=2)),
+        Post(id=4, user_id=3, content="Data science meetup", post_type="event", created_at=base_time + timedelta(hours=3)),
+        Post(id=5, user_id=3, content="Science and big data at scale", post_type="text",
+             created_at=base_time + timedelta(hours=4)),
+    ])
+    db.flush()
+    db.add(Event(post_id=4, user_id=3, title="Meetup", event_datetime=base_time, location="Hall"))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+@pytest.fixture
+def index(session_factory, tmp_path):
+    index = SearchIndex(snapshot_path=str(tmp_path / "index.json.gz"))
+    index.load(session_factory)
+    return index
+
+
+def test_inverted_index_prefix_search_and_remove():
+    index = InvertedIndex()
+    index.add(2, "Data science")
+    index.add(1, "big data")  # Out of order ids stay sorted
+    index.add(3, "databases")
+
+    assert index.search(["data"]) == {1, 2, 3}
+    assert index.search(["data", "sci"]) == {2}
+    assert index.search(["missing"]) == set()
+
+    index.add(2, "cooking")  # Re-adding replaces the old tokens
+    index.remove(3)
+    assert index.search(["data"]) == {1}
+    assert index.search(["science"]) == set()
+    assert len(index) == 2
+
+def test_search_posts_matches_content_and_authors(index):
+    posts = index.search_posts("data", limit=10, offset=0)
+
+    # Content matches (not the event post) and every post by "datafan", newest first
+    assert [p.id for p in posts] == [5, 3, 1]
+    assert posts[0].content == "Science and big data at scale"
+    assert posts[0].created_at == datetime(2025, 1, 1, 4)
+
+def test_search_posts_every_word_must_match(index):
+    assert [p.id for p in index.search_posts("data sci", limit=10, offset=0)] == [5, 1]
+    assert index.search_posts("!!!", limit=10, offset=0) == []
+
+def test_search_posts_paginates(index):
+    assert [p.id for p in index.search_posts("data", limit=2, offset=0)] == [5, 3]
+    assert [p.id for p in index.search_posts("data", limit=2, offset=2)] == [1]
+
+def test_search_users_by_username_or_email(index):
+    assert [u.username for u in index.search_users("data", limit=10, offset=0)] == ["datafan"]
+    # Tokens match by prefix only: "bob_data" is one token
+    assert [u.username for u in index.search_users("example", limit=10, offset=0)] == ["datafan", "bob"]
+
+def test_incremental_updates(index):
+    index.index_post(Post(id=6, user_id=1, content="Robotics club", post_type="text",
+                          created_at=datetime(2025, 2, 1), like_count=0))
+    assert [p.id for p in index.search_posts("robot", limit=10, offset=0)] == [6]
+
+    index.index_post(Post(id=6, user_id=1, content="Chess club", post_type="text",
+                          created_at=datetime(2025, 2, 1), like_count=0))
+    assert index.search_posts("robot", limit=10, offset=0) == []
+
+    index.remove_post(5)
+    assert [p.id for p in index.search_posts("data", limit=10, offset=0)] == [3, 1]
+
+    index.index_user(User(id=4, username="roboticist", email="r@uni.edu"))
+    assert [u.id for u in index.search_users("robo", limit=10, offset=0)] == [4]
+
+def test_incremental_updates_treat_events_like_the_rebuild(index):
+    # An event is a post with an Event row, whatever its post_type says
+    index.index_post(Post(id=6, user_id=1, content="Robotics club", post_type="event", like_count=0))
+    index.index_post(Post(id=7, user_id=1, content="Robotics fair", post_type="text", like_count=0,
+                          event=Event(title="Fair", location="Hall")))
+    assert [p.id for p in index.search_posts("robotics", limit=10, offset=0)] == [6]
+
+def test_updates_are_ignored_until_loaded():
+    index = SearchIndex(snapshot_path="unused")
+    index.index_post(Post(id=1, user_id=1, content="data", post_type="text"))
+    assert not index.ready
+    assert index.search_posts("data", limit=10, offset=0) == []
+
+def test_snapshot_round_trip_catches_up(index, session_factory):
+    index.index_post(Post(id=6, user_id=1, content="Robotics club", post_type="text",
+                          created_at=datetime(2025, 2, 1), like_count=0))
+    index.save_snapshot()
+
+    db = session_factory()
+    db.query(Post).filter(Post.id == 5).delete()
+    db.add(Post(id=7, user_id=2, content="Data engineering", post_type="text", created_at=datetime(2025, 3, 1)))
+    db.commit()
+    db.close()
+
+    restored = SearchIndex(snapshot_path=index.snapshot_path)
+    restored.load(session_factory)
+
+    # Post 6 only exists in the snapshot and is dropped; 7 was added and 5 deleted while it was not loaded
+    assert [p.id for p in restored.search_posts("data", limit=10, offset=0)] == [7, 3, 1]
+    assert restored.search_posts("robotics", limit=10, offset=0) == []
+
+def test_concurrent_snapshots_do_not_clobber_each_other(index, tmp_path):
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: index.save_snapshot(), range(16)))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["index.json.gz"]
+    restored = SearchIndex(snapshot_path=index.snapshot_path)
+    assert restored._load_snapshot()
+
+def test_unreadable_snapshot_rebuilds(session_factory, tmp_path):
+    path = tmp_path / "index.json.gz"
+    path.write_bytes(b"not gzip")
+    index = SearchIndex(snapshot_path=str(path))
+    index.load(session_factory)
+
+    assert [p.id for p in index.search_posts("data", limit=10, offset=0)] == [5, 3, 1]
+
+
+def test_memory_backend_does_not_query_the_database(index, session_factory):
+    db = session_factory()
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    with patch("services.search_backends.search_index", index):
+        backend = MemorySearchBackend()
+        assert [p.id for p in backend.search_posts(db, "data", limit=10, offset=0)] == [5, 3, 1]
+        assert [u.id for u in backend.search_users(db, "example", limit=10, offset=0)] == [2, 3]
+
+    assert statements == []
+    db.close()
+
+def test_memory_backend_builds_the_index_on_first_use(session_factory):
+    db = session_factory()
+    with patch("services.search_backends.search_index", SearchIndex(snapshot_path="unused")):
+        assert [p.id for p in MemorySearchBackend().search_posts(db, "data", limit=10, offset=0)] == [5, 3, 1]
+    db.close()
+
+def test_search_backend_setting_overrides_the_dialect():
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    with patch("services.search_backends.SEARCH_BACKEND", "memory"):
+        assert isinstance(get_search_backend(db), MemorySearchBackend)
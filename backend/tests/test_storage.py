@@ -0,0 +1,135 @@
+import io
+import sys
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+from fastapi import FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import models.chat, models.connection, models.notifications, models.research_paper, models.user  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from core import storage
+from core.static_files import IMMUTABLE_CACHE_CONTROL, UploadedFileResponse, UploadsStaticFiles
+from core.storage import CloudinaryStorage, LocalStorage, SupabaseStorage
+from models.blob import Blob
+from services.blob_store import BlobStore
+
+
+def upload_file(data: bytes, filename: str = "poster.png", content_type: str = "image/png") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=len(data),
+                      headers=Headers({"content-type": content_type}))
+
+@pytest.fixture
+def local(tmp_path):
+    return LocalStorage(root=str(tmp_path), base_url="http://api.test/uploads/")
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "media").mkdir()
+    (tmp_path / "media" / "a.txt").write_bytes(b"0123456789")
+    app = FastAPI()
+    app.mount("/uploads/media", UploadsStaticFiles(directory=str(tmp_path / "media")), name="media")
+    return TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_local_storage_writes_into_the_mapped_directory(local, tmp_path):
+    source = upload_file(b"x" * 3_000_000)
+
+    stored = await local.save(source, "noobsquad/event_media_uploads", "poster.PNG", "image/png")
+
+    name = stored["url"].rsplit("/", 1)[1]
+    assert stored["url"] == f"http://api.test/uploads/event_images/{name}"
+    assert stored["resource_type"] == "image"
+    assert name.endswith(".png")
+    assert (tmp_path / "event_images" / name).read_bytes() == b"x" * 3_000_000
+    assert [p.name for p in (tmp_path / "event_images").iterdir()] == [name]  # No temporary file left
+    assert await source.read(1) == b"x"  # Rewound
+
+@pytest.mark.asyncio
+async def test_local_storage_never_reuses_a_name(local):
+    first = await local.save(upload_file(b"a"), "upload_documents/", "1_x.pdf", "application/pdf")
+    second = await local.save(upload_file(b"b"), "upload_documents/", "1_x.pdf", "application/pdf")
+
+    assert first["url"] != second["url"]
+    assert "/uploads/document/" in first["url"]
+    assert first["resource_type"] == "raw"
+
+def test_backend_is_selected_by_config():
+    with patch.object(storage, "STORAGE_BACKEND", "local"):
+        assert isinstance(storage.media_storage(), LocalStorage)
+        assert storage.document_storage() is storage.media_storage()
+    with patch.object(storage, "STORAGE_BACKEND", "remote"):
+        assert isinstance(storage.media_storage(), CloudinaryStorage)
+        assert isinstance(storage.document_storage(), SupabaseStorage)
+
+@pytest.mark.asyncio
+async def test_uploads_need_no_network_with_local_storage(local, tmp_path):
+    from utils import cloudinary, supabase
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Blob.__table__.create(engine)
+    blob_store = BlobStore(sessionmaker(bind=engine))
+    with patch.object(storage, "STORAGE_BACKEND", "local"), patch.object(storage, "_local", local), \
+            patch.object(cloudinary, "blob_store", blob_store), patch.object(supabase, "blob_store", blob_store), \
+            patch("core.upload_pipeline.UploadPipeline._send", side_effect=AssertionError("network used")):
+        media = await cloudinary.upload_to_cloudinary(upload_file(b"poster"), "noobsquad/profile_pictures")
+        document = await supabase.upload_file_to_supabase(upload_file(b"%PDF"), "1_a.pdf", section="chat")
+        again = await cloudinary.upload_to_cloudinary(upload_file(b"poster"), "noobsquad/profile_pictures")
+    engine.dispose()
+
+    assert "/uploads/profile_pictures/" in media["secure_url"]
+    assert media["resource_type"] == "image"
+    assert "/uploads/chat/" in document
+    assert again == media  # Deduplicated within the local backend too
+
+
+def test_static_files_are_cached_as_immutable_with_etags(client):
+    response = client.get("/uploads/media/a.txt")
+
+    assert response.content == b"0123456789"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    revalidated = client.get("/uploads/media/a.txt", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+def test_static_files_serve_ranges(client):
+    response = client.get("/uploads/media/a.txt", headers={"Range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
+
+async def _call(response, headers=()):
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "headers": list(headers),
+        "extensions": {"http.response.zerocopysend": {}}
+    }
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            # What the server would sendfile() from the descriptor
+            message["file"].seek(message["offset"])
+            message = {**message, "data": message["file"].read(message["count"])}
+        messages.append(message)
+
+    await response(scope, None, send)
+    return messages
+
+@pytest.mark.asyncio
+async def test_zero_copy_send_when_the_server_supports_it(tmp_path):
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"0123456789")
+
+    full = await _call(UploadedFileResponse(path, stat_result=path.stat()))
+    assert full[0]["status"] == 200
+    assert (full[1]["type"], full[1]["offset"], full[1]["count"], full[1]["data"]) == \
+        ("http.response.zerocopysend", 0, 10, b"0123456789")
+
+    ranged = await _call(UploadedFileResponse(path, stat_result=path.stat()), [(b"range", b"bytes=3-4")])
+    assert ranged[0]["status"] == 206
+    assert (ranged[1]["offset"], ranged[1]["count"], ranged[1]["data"]) == (3, 2, b"34")
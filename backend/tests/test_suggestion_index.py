@@ -0,0 +1,145 @@
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request  # noqa: F401
+from models.user import User
+from models.post import Post
+from models.hashtag import Hashtag
+from models.university import University
+from services.suggestion_index import PrefixIndex, SuggestionIndex, MAX_SUGGESTIONS
+from utils.post_utils import tag_post_hashtags
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # File-backed, since the index is also rebuilt from a background thread
+    engine = create_engine(f"sqlite:///{tmp_path / 'suggest.db'}")
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    with engine.begin() as conn:
+        # `departments` is a Postgres ARRAY; the index only reads the other columns
+        conn.execute(text("CREATE TABLE universities (id INTEGER PRIMARY KEY, name VARCHAR, departments VARCHAR, total_members INTEGER)"))
+        conn.execute(text("INSERT INTO universities (id, name, total_members) VALUES (1, 'BUET', 500), (2, 'BRAC University', 900)"))
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add_all([
+        User(id=1, username="brandon", email="b@uni.edu"),
+        User(id=2, username="bob", email="bob@uni.edu"),
+        User(id=3, username="alice", email="a@uni.edu"),
+        Hashtag(id=1, name="buet", usage_count=3),
+        Hashtag(id=2, name="brac", usage_count=40),
+    ])
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+@pytest.fixture
+def index(session_factory):
+    index = SuggestionIndex(session_factory=session_factory)
+    index.ensure_loaded()
+    return index
+
+
+def test_prefix_index_ranks_by_weight_then_length():
+    prefixes = PrefixIndex()
+    prefixes.set(1, "Data", 1, {"id": 1})
+    prefixes.set(2, "database", 5, {"id": 2})
+    prefixes.set(3, "dat", 1, {"id": 3})
+    prefixes.set(4, "other", 9, {"id": 4})
+
+    assert [p["id"] for p in prefixes.top("dat", 10)] == [2, 3, 1]
+    assert [p["id"] for p in prefixes.top("data", 1)] == [2]
+    assert prefixes.top("x", 10) == []
+
+    prefixes.set(2, "base", 5, {"id": 2})  # Renamed
+    prefixes.remove(3)
+    assert [p["id"] for p in prefixes.top("dat", 10)] == [1]
+    assert len(prefixes) == 3
+
+def test_prefix_index_caches_wide_prefixes_and_keeps_them_current():
+    prefixes = PrefixIndex()
+    prefixes.load([(i, f"user{i}", 0, {"id": i}) for i in range(PrefixIndex.SCAN_LIMIT * 2)])
+
+    assert [p["id"] for p in prefixes.top("u", 3)] == [0, 1, 2]
+    assert "u" in prefixes._cache
+
+    prefixes.set(999, "u", 0, {"id": 999})  # Shortest key, so it ranks first
+    prefixes.set(5, "user5", 10, {"id": 5})  # Heavier
+    assert [p["id"] for p in prefixes.top("u", 3)] == [5, 999, 0]
+    assert len(prefixes.top("u", 50)) == MAX_SUGGESTIONS
+
+    prefixes.set(5, "user5", 0, {"id": 5})  # Lowered: the list has to be recomputed
+    assert "u" not in prefixes._cache
+    assert [p["id"] for p in prefixes.top("u", 3)] == [999, 0, 1]
+
+    prefixes.remove(999)
+    assert [p["id"] for p in prefixes.top("u", 3)] == [0, 1, 2]
+
+def test_suggest_from_the_database(index):
+    result = index.suggest("B")
+
+    assert [u["username"] for u in result["users"]] == ["bob", "brandon"]
+    assert [h["name"] for h in result["hashtags"]] == ["brac", "buet"]
+    assert [u["name"] for u in result["universities"]] == ["BRAC University", "BUET"]
+
+def test_suggest_strips_hashtag_and_mention_prefixes(index):
+    assert [h["name"] for h in index.suggest("#bu")["hashtags"]] == ["buet"]
+    assert [u["username"] for u in index.suggest("@al")["users"]] == ["alice"]
+    assert index.suggest("  #") == {"users": [], "hashtags": [], "universities": []}
+
+def test_incremental_updates(index):
+    index.add_user(User(id=4, username="bo"))
+    index.set_hashtag("buet", 100)
+    index.set_university(University(id=3, name="BUP", total_members=1))
+
+    result = index.suggest("b")
+    assert [u["username"] for u in result["users"]][:1] == ["bo"]
+    assert result["hashtags"][0] == {"name": "buet", "usage_count": 100}
+    assert [u["name"] for u in result["universities"]] == ["BRAC University", "BUET", "BUP"]
+
+def test_updates_are_ignored_until_loaded(session_factory):
+    index = SuggestionIndex(session_factory=session_factory)
+    index.add_user(User(id=4, username="bo"))
+    assert not index.ready
+
+def test_stale_index_is_rebuilt_in_the_background(index, session_factory):
+    db = session_factory()
+    db.add(User(id=5, username="bella", email="bella@uni.edu"))
+    db.commit()
+    db.close()
+
+    index.refresh_seconds = 0
+    index.ensure_loaded()
+    for _ in range(100):
+        if not index._refreshing:
+            break
+        time.sleep(0.01)
+    assert "bella" in [u["username"] for u in index.suggest("be")["users"]]
+
+def test_suggest_does_not_query_the_database(index):
+    with patch.object(index, "_session_factory", side_effect=AssertionError("database used")):
+        index.ensure_loaded()
+        assert index.suggest("b")["users"]
+
+def test_hashtag_tagging_updates_suggestions(session_factory):
+    index = SuggestionIndex(session_factory=session_factory)
+    index.ensure_loaded()
+    db = session_factory()
+    post = Post(id=1, user_id=1, content="#BUET #BUET", post_type="text")
+    db.add(post)
+    db.commit()
+    with patch("utils.post_utils.get_university_names", return_value=frozenset({"buet"})), \
+            patch("utils.post_utils.suggestion_index", index):
+        tag_post_hashtags(db, post)
+    db.commit()
+    db.close()
+
+    assert index.suggest("bu")["hashtags"] == [{"name": "buet", "usage_count": 5}]
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import Mock, patch
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.university_cache import get_university_names, invalidate_university_names
+
+
+class TestUniversityCache(TestCase):
+    def setUp(self):
+        invalidate_university_names()
+        self.mock_db = Mock()
+        self.mock_db.query.return_value.all.return_value = [(" BUET ",), ("Dhaka University",), (None,)]
+
+    def tearDown(self):
+        invalidate_university_names()
+
+    def test_names_are_normalized(self):
+        self.assertEqual(get_university_names(self.mock_db), frozenset({"buet", "dhaka university"}))
+
+    def test_names_are_loaded_once(self):
+        get_university_names(self.mock_db)
+        get_university_names(self.mock_db)
+
+        self.mock_db.query.assert_called_once()
+
+    def test_invalidate_reloads_names(self):
+        get_university_names(self.mock_db)
+        self.mock_db.query.return_value.all.return_value = [("BUET",), ("NSU",)]
+
+        invalidate_university_names()
+
+        self.assertEqual(get_university_names(self.mock_db), frozenset({"buet", "nsu"}))
+        self.assertEqual(self.mock_db.query.call_count, 2)
+
+    def test_names_are_reloaded_after_the_ttl(self):
+        with patch("services.university_cache.UNIVERSITY_CACHE_TTL", 0):
+            get_university_names(self.mock_db)
+            self.mock_db.query.return_value.all.return_value = [("BUET",), ("NSU",)]
+
+            # As seen by a worker that didn't handle the change
+            self.assertEqual(get_university_names(self.mock_db), frozenset({"buet", "nsu"}))
@@ -0,0 +1,259 @@
+import asyncio
+import io
+import json
+import sys
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+import pytest
+from fastapi import UploadFile
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from cloudinary.utils import api_sign_request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from core.storage import SupabaseStorage
+from core.upload_pipeline import UploadPipeline, iter_chunks, remaining_size
+import models.chat, models.connection, models.notifications, models.research_paper, models.user  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag  # noqa: F401
+from models.blob import Blob
+from services.blob_store import BlobStore
+
+
+class FakeStorageHandler(BaseHTTPRequestHandler):
+    """Accepts Supabase object uploads and Cloudinary uploads, recording what arrived."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse is observable
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers["Content-Length"]))
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            body = self._read_body()
+            time.sleep(server.delay)
+            server.requests.append({
+                "path": self.path, "headers": dict(self.headers), "body": body, "port": self.client_address[1]
+            })
+            if server.status != 200:
+                reply = b'{"error": "nope"}'
+            elif self.path.startswith("/v1_1/"):
+                reply = json.dumps({
+                    "secure_url": "https://res.cloudinary.com/demo/image/upload/x.png",
+                    "public_id": "folder/x",
+                    "resource_type": "image"
+                }).encode()
+            else:
+                reply = json.dumps({"Key": self.path}).encode()
+            self.send_response(server.status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(reply)))
+            self.end_headers()
+            self.wfile.write(reply)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def storage_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStorageHandler)
+    server.lock = threading.Lock()
+    server.requests, server.active, server.max_active, server.delay, server.status = [], 0, 0, 0, 200
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class RecordingFile(io.BytesIO):
+    """A blocking file object that remembers the size of every read."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def upload_file(data: bytes, filename: str = "poster.png") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=len(data))
+
+
+async def _supabase(pipeline, server, source, path="chat/a.png"):
+    return await pipeline.upload_to_supabase(
+        source, path, "image/png", url=server.url, key="service-key", bucket="noobsquad"
+    )
+
+
+@pytest.mark.asyncio
+async def test_iter_chunks_reads_upload_files_and_plain_files():
+    data = bytes(range(256)) * 10
+    assert b"".join([c async for c in iter_chunks(upload_file(data), 1000)]) == data
+
+    plain = RecordingFile(data)
+    chunks = [c async for c in iter_chunks(plain, 1000)]
+    assert [len(c) for c in chunks] == [1000, 1000, 560]
+    assert set(plain.reads) == {1000}
+
+def test_remaining_size():
+    source = io.BytesIO(b"abcdef")
+    source.read(2)
+    assert remaining_size(source) == 4
+    assert source.tell() == 2
+    assert remaining_size(upload_file(b"xyz")) == 3
+    assert remaining_size(object()) is None
+
+@pytest.mark.asyncio
+async def test_supabase_upload_streams_in_chunks(storage_server):
+    pipeline = UploadPipeline(chunk_size=4096)
+    data = b"%PDF" + bytes(50_000)
+    source = RecordingFile(data)
+
+    url = await _supabase(pipeline, storage_server, source, "research_papers/p.pdf")
+    await pipeline.aclose()
+
+    request = storage_server.requests[0]
+    assert url == f"{storage_server.url}/storage/v1/object/public/noobsquad/research_papers/p.pdf"
+    assert request["path"] == "/storage/v1/object/noobsquad/research_papers/p.pdf"
+    assert request["body"] == data
+    assert request["headers"]["Authorization"] == "Bearer service-key"
+    assert request["headers"]["Content-Length"] == str(len(data))
+    # Never more than one chunk read at a time, and the file is rewound afterwards
+    assert max(source.reads) == 4096
+    assert source.tell() == 0
+    assert pipeline.stats()["bytes_sent"] == len(data)
+
+@pytest.mark.asyncio
+async def test_unseekable_sources_are_sent_chunked(storage_server):
+    class Pipe:
+        def __init__(self, data):
+            self._data = io.BytesIO(data)
+
+        def read(self, size):
+            return self._data.read(size)
+
+    pipeline = UploadPipeline(chunk_size=10)
+    await _supabase(pipeline, storage_server, Pipe(b"x" * 35))
+    await pipeline.aclose()
+
+    assert storage_server.requests[0]["headers"]["Transfer-Encoding"] == "chunked"
+    assert storage_server.requests[0]["body"] == b"x" * 35
+
+@pytest.mark.asyncio
+async def test_cloudinary_upload_is_signed_multipart(storage_server):
+    pipeline = UploadPipeline(chunk_size=1000)
+    data = bytes(range(256)) * 20
+
+    result = await pipeline.upload_to_cloudinary(
+        upload_file(data), "noobsquad/media_uploads", cloud_name="demo", api_key="key",
+        api_secret="secret", filename="poster.png", api_base=storage_server.url
+    )
+    await pipeline.aclose()
+
+    assert result["secure_url"] == "https://res.cloudinary.com/demo/image/upload/x.png"
+    request = storage_server.requests[0]
+    assert request["path"] == "/v1_1/demo/auto/upload"
+    assert int(request["headers"]["Content-Length"]) == len(request["body"])
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {request['headers']['Content-Type']}\r\n\r\n".encode() + request["body"]
+    )
+    parts = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+    assert parts["file"].get_filename() == "poster.png"
+    assert parts["file"].get_payload(decode=True) == data
+    fields = {name: part.get_payload(decode=True).decode() for name, part in parts.items() if name != "file"}
+    assert fields["folder"] == "noobsquad/media_uploads"
+    assert fields["api_key"] == "key"
+    assert fields["signature"] == api_sign_request(
+        {"folder": fields["folder"], "timestamp": fields["timestamp"]}, "secret"
+    )
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_and_connections_reused(storage_server):
+    storage_server.delay = 0.05
+    pipeline = UploadPipeline(concurrency=2)
+
+    await asyncio.gather(*[_supabase(pipeline, storage_server, upload_file(b"x"), f"chat/{i}.png") for i in range(6)])
+    await pipeline.aclose()
+
+    assert len(storage_server.requests) == 6
+    assert storage_server.max_active == 2
+    # Six uploads over the two pooled connections
+    assert len({r["port"] for r in storage_server.requests}) == 2
+    assert pipeline.stats()["completed"] == 6
+
+@pytest.mark.asyncio
+async def test_uploads_do_not_block_the_event_loop(storage_server):
+    storage_server.delay = 0.2
+    pipeline = UploadPipeline()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await _supabase(pipeline, storage_server, upload_file(b"x" * 1000))
+    task.cancel()
+    await pipeline.aclose()
+
+    assert ticks >= 10
+
+@pytest.mark.asyncio
+async def test_storage_errors_raise(storage_server):
+    storage_server.status = 400
+    pipeline = UploadPipeline()
+    with pytest.raises(Exception):
+        await _supabase(pipeline, storage_server, upload_file(b"x"))
+    await pipeline.aclose()
+    assert pipeline.stats()["failed"] == 1
+    assert pipeline.stats()["active"] == 0
+
+@pytest.mark.asyncio
+async def test_upload_file_to_supabase_goes_through_the_pipeline(storage_server, tmp_path):
+    from utils import supabase
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Blob.__table__.create(engine)
+    pipeline = UploadPipeline()
+    storage = SupabaseStorage(url=storage_server.url, key="service-key", pipeline=pipeline)
+    with patch.object(supabase, "document_storage", return_value=storage), \
+            patch.object(supabase, "blob_store", BlobStore(sessionmaker(bind=engine))):
+        url = await supabase.upload_file_to_supabase(upload_file(b"%PDF-1.7"), "1_a.pdf", section="research_papers")
+        # Same bytes under another name: served from the blobs table, not uploaded again
+        again = await supabase.upload_file_to_supabase(upload_file(b"%PDF-1.7"), "2_b.pdf", section="research_papers")
+        # Another section gets its own copy
+        post_document = await supabase.upload_file_to_supabase(upload_file(b"%PDF-1.7"), "3_c.pdf", section="upload_documents")
+    await pipeline.aclose()
+    engine.dispose()
+
+    assert url.endswith("/object/public/noobsquad/research_papers/1_a.pdf")
+    assert again == url
+    assert post_document.endswith("/object/public/noobsquad/upload_documents/3_c.pdf")
+    assert len(storage_server.requests) == 2
+    assert storage_server.requests[0]["headers"]["Content-Type"] == "application/pdf"
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from langchain_core.embeddings import Embeddings
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database.session import Base
+import models.chat, models.connection, models.notifications, models.research_paper  # noqa: F401 (mapper registry)
+import models.research_collaboration, models.collaboration_request, models.hashtag, models.post  # noqa: F401
+from models.chatbot_session import ChatbotSession
+from models.user import User
+from services.pdf_extraction import PdfExtractionError
+from services.vector_store import VectorRetriever, VectorStore
+
+VOCABULARY = ["neuron", "mri", "alzheimer", "ensemble", "loss", "cooking", "pasta", "football"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Counts of a few known words: enough for nearest-neighbour search to be meaningful."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        words = re.findall(r"\w+", text.lower())
+        return [float(words.count(word)) for word in VOCABULARY]
+
+
+CHUNKS = [
+    "MRI scans of the brain help detect Alzheimer early. MRI MRI.",
+    "An ensemble of networks trained with a generalization loss. Ensemble ensemble loss.",
+    "Cooking pasta takes ten minutes. Pasta cooking.",
+    "Football is played with eleven players. Football.",
+]
+
+@pytest.fixture
+def store(tmp_path):
+    return VectorStore(root=str(tmp_path / "vectors"))
+
+
+def test_build_and_search(store):
+    embeddings = KeywordEmbeddings()
+    index = store.build("abc", iter(CHUNKS), embeddings)
+
+    assert len(index) == 4
+    assert index.search(embeddings.embed_query("pasta recipes"), k=1) == [CHUNKS[2]]
+    assert index.search(embeddings.embed_query("ensemble loss"), k=2)[0] == CHUNKS[1]
+    assert index.search(embeddings.embed_query("mri"), k=10)[0] == CHUNKS[0]  # k larger than the index
+    assert index.nbytes > 0
+    index.close()
+
+def test_reopened_index_is_memory_mapped(store):
+    embeddings = KeywordEmbeddings()
+    store.build("abc", CHUNKS, embeddings).close()
+
+    assert store.exists("abc") and not store.exists("other")
+    assert store.open("other") is None
+    index = store.open("abc")
+    maps = Path("/proc/self/maps")
+    if maps.exists():
+        mapped = maps.read_text()
+        assert str(store.path("abc") / "index.faiss") in mapped
+        assert str(store.path("abc") / "chunks.bin") in mapped
+    assert index.search(embeddings.embed_query("football"), k=1) == [CHUNKS[3]]
+    index.close()
+
+def test_unicode_chunks_and_batches(store):
+    embeddings = KeywordEmbeddings()
+    chunks = [f"ক্লাস {i} neuron" for i in range(150)]
+
+    index = store.build("abc", chunks, embeddings)
+
+    assert embeddings.calls == 3  # Embedded 64 chunks at a time
+    assert index.chunk(149) == "ক্লাস 149 neuron"
+    index.close()
+
+def test_empty_document(store):
+    index = store.build("empty", [], KeywordEmbeddings())
+    assert len(index) == 0
+    assert index.search([0.0] * len(VOCABULARY)) == []
+    index.close()
+
+def test_concurrent_builds_leave_one_index(store):
+    with ThreadPoolExecutor(4) as pool:
+        indexes = list(pool.map(lambda _: store.build("abc", CHUNKS, KeywordEmbeddings()), range(4)))
+
+    assert [p.name for p in store.root.iterdir()] == ["abc"]
+    assert all(len(index) == 4 for index in indexes)
+    for index in indexes:
+        index.close()
+
+def test_retriever_returns_documents(store):
+    embeddings = KeywordEmbeddings()
+    retriever = VectorRetriever(store.build("abc", CHUNKS, embeddings), embeddings, k=1)
+    assert [d.page_content for d in retriever.get_relevant_documents("alzheimer mri")] == [CHUNKS[0]]
+
+
+@pytest.fixture
+def chatbot(store, tmp_path):
+    from api.v1.endpoints.chatbot import huggingface
+    engine = create_engine(f"sqlite:///{tmp_path / 'chatbot.db'}")
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "universities"])
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(User(id=1, username="alice", email="a@uni.edu"))
+    db.commit()
+    db.close()
+    embeddings = KeywordEmbeddings()
+    with patch.object(huggingface, "vector_store", store), \
+            patch.object(huggingface, "get_embeddings", return_value=embeddings), \
+            patch.object(huggingface, "gemini_model", MagicMock()), \
+            patch.object(huggingface, "pdf_extractor") as extractor:
+        extractor.iter_chunks.side_effect = lambda *args: iter(CHUNKS)
+        huggingface.user_sessions.clear()
+        yield huggingface, factory, extractor.iter_chunks, embeddings
+        huggingface.user_sessions.clear()
+    engine.dispose()
+
+@pytest.mark.asyncio
+async def test_reuploading_a_pdf_reuses_its_index(chatbot):
+    huggingface, factory, extract, embeddings = chatbot
+    user = User(id=1)
+    db = factory()
+
+    await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"%PDF thesis")), current_user=user, db=db)
+    await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"%PDF thesis")), current_user=user, db=db)
+
+    extract.assert_called_once()
+    assert embeddings.calls == 1
+    assert db.query(ChatbotSession).one().user_id == 1
+    db.close()
+
+@pytest.mark.asyncio
+async def test_session_is_restored_on_another_worker(chatbot):
+    huggingface, factory, _, _ = chatbot
+    db = factory()
+    await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"%PDF thesis")), current_user=User(id=1), db=db)
+    huggingface.user_sessions.clear()  # As seen by a worker that didn't handle the upload
+
+    session = huggingface.restore_chatbot_session(db, 1)
+
+    assert session is huggingface.user_sessions[1]
+    docs = session["retriever"].get_relevant_documents("pasta")
+    assert docs[0].page_content == CHUNKS[2]
+    assert huggingface.restore_chatbot_session(db, 2) is None
+    db.close()
+
+@pytest.mark.asyncio
+async def test_session_follows_an_upload_on_another_worker(chatbot):
+    huggingface, factory, extract, embeddings = chatbot
+    db = factory()
+    await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"%PDF thesis")), current_user=User(id=1), db=db)
+    stale = huggingface.user_sessions[1]
+
+    # Another worker indexes a second PDF for the same user and records it
+    extract.side_effect = lambda *args: iter(["Football is played with eleven players. Football."])
+    content_hash = hashlib.sha256(b"%PDF football").hexdigest()
+    huggingface.create_retriever(extract(), content_hash)
+    huggingface.save_chatbot_session(db, 1, content_hash)
+
+    session = huggingface.get_chatbot_session(db, 1)
+
+    assert session is not stale
+    assert session["retriever"].get_relevant_documents("pasta")[0].page_content.startswith("Football")
+    db.close()
+
+def failing_chunks(error):
+    yield CHUNKS[0]
+    raise error
+
+@pytest.mark.asyncio
+async def test_unreadable_pdf_is_rejected(chatbot):
+    huggingface, factory, extract, _ = chatbot
+    extract.side_effect = lambda *args: failing_chunks(PdfExtractionError("no objects found"))
+    db = factory()
+
+    with pytest.raises(HTTPException) as error:
+        await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"not a pdf")), current_user=User(id=1), db=db)
+
+    assert error.value.status_code == 422
+    assert huggingface.upload_progress == {}
+    db.close()
+
+@pytest.mark.asyncio
+async def test_indexing_failures_are_not_blamed_on_the_pdf(chatbot, caplog):
+    huggingface, factory, extract, _ = chatbot
+    extract.side_effect = lambda *args: failing_chunks(OSError("No space left on device"))
+    db = factory()
+
+    with pytest.raises(OSError):
+        await huggingface.upload_pdf(UploadFile(file=io.BytesIO(b"%PDF thesis")), current_user=User(id=1), db=db)
+
+    assert "Indexing PDF" in caplog.text
+    assert huggingface.upload_progress == {}
+    assert db.query(ChatbotSession).count() == 0
+    db.close()
@@ -1,3 +1,4 @@
+import asyncio
 from unittest import IsolatedAsyncioTestCase
 from unittest.mock import Mock, patch, AsyncMock
 from fastapi import WebSocket
@@ -7,8 +8,21 @@ from services.websocket_service import (
     send_socket_message,
     broadcast_message,
     handle_chat_message,
-    clients
+    clients,
+    CHAT_CHANNEL,
+    SocketConnection,
+    evict_stalled_connections,
+    stop_watchdog,
+    SLOW_CONSUMER_CLOSE_CODE
 )
+import services.websocket_service as websocket_service
+
+def _wait_for(event):
+    # send_json side effect that blocks until the event is set, like a client that stopped reading
+    async def send_json(message):
+        await event.wait()
+    return send_json
+
 
 class TestWebSocketService(IsolatedAsyncioTestCase):
     def setUp(self):
@@ -18,21 +32,66 @@ class TestWebSocketService(IsolatedAsyncioTestCase):
         # Clear clients dictionary before each test
         clients.clear()
 
+    async def asyncTearDown(self):
+        for connections in list(clients.values()):
+            for connection in list(connections):
+                connection.close()
+        await stop_watchdog()
+
+    async def _connect(self, user_id, websocket, **kwargs):
+        connection = SocketConnection(websocket, user_id, **kwargs)
+        clients.setdefault(user_id, set()).add(connection)
+        return connection
+
     async def test_connect_socket(self):
-        await connect_socket(self.mock_websocket, self.user_id)
+        connection = await connect_socket(self.mock_websocket, self.user_id)
         
         self.mock_websocket.accept.assert_called_once()
         self.assertIn(self.user_id, clients)
-        self.assertEqual(clients[self.user_id], self.mock_websocket)
+        self.assertEqual(clients[self.user_id], {connection})
+        self.assertIs(connection.websocket, self.mock_websocket)
+
+    async def test_stop_watchdog_cancels_and_awaits_it(self):
+        await connect_socket(self.mock_websocket, self.user_id)
+        watchdog = websocket_service._watchdog
+        self.assertFalse(watchdog.done())
+
+        await stop_watchdog()
+
+        self.assertTrue(watchdog.cancelled())
+        self.assertIsNone(websocket_service._watchdog)
+        await stop_watchdog()  # Nothing left to stop
+
+    async def test_second_device_does_not_evict_the_first(self):
+        other_websocket = AsyncMock(spec=WebSocket)
+        first = await connect_socket(self.mock_websocket, self.user_id)
+        second = await connect_socket(other_websocket, self.user_id)
+
+        await send_socket_message(self.user_id, self.message)
+        await first.drain()
+        await second.drain()
+
+        self.assertEqual(len(clients[self.user_id]), 2)
+        self.mock_websocket.send_json.assert_called_once_with(self.message)
+        other_websocket.send_json.assert_called_once_with(self.message)
 
     async def test_disconnect_socket(self):
         # First connect a socket
-        clients[self.user_id] = self.mock_websocket
+        await self._connect(self.user_id, self.mock_websocket)
         
         await disconnect_socket(self.user_id)
         
         self.assertNotIn(self.user_id, clients)
 
+    async def test_disconnect_one_device_keeps_the_other(self):
+        other_websocket = AsyncMock(spec=WebSocket)
+        await self._connect(self.user_id, self.mock_websocket)
+        remaining = await self._connect(self.user_id, other_websocket)
+
+        await disconnect_socket(self.user_id, self.mock_websocket)
+
+        self.assertEqual(clients[self.user_id], {remaining})
+
     async def test_disconnect_socket_not_connected(self):
         # Should not raise any error when disconnecting non-existent client
         await disconnect_socket(999)
@@ -40,9 +99,10 @@ class TestWebSocketService(IsolatedAsyncioTestCase):
         self.assertNotIn(999, clients)
 
     async def test_send_socket_message_to_connected_client(self):
-        clients[self.user_id] = self.mock_websocket
+        connection = await self._connect(self.user_id, self.mock_websocket)
         
         await send_socket_message(self.user_id, self.message)
+        await connection.drain()
         
         self.mock_websocket.send_json.assert_called_once_with(self.message)
 
@@ -61,42 +121,113 @@ class TestWebSocketService(IsolatedAsyncioTestCase):
         }
         
         # Setup mock clients
-        for user_id, websocket in mock_websockets.items():
-            clients[user_id] = websocket
+        connections = [await self._connect(user_id, websocket) for user_id, websocket in mock_websockets.items()]
         
         await broadcast_message(user_ids, self.message)
+        for connection in connections:
+            await connection.drain()
         
         # Verify each client received the message
         for websocket in mock_websockets.values():
             websocket.send_json.assert_called_once_with(self.message)
 
-    @patch('services.websocket_service.create_message')
-    @patch('services.websocket_service.prepare_message_event')
+    async def test_slow_client_does_not_delay_others(self):
+        stalled = asyncio.Event()
+        slow_websocket = AsyncMock(spec=WebSocket)
+        slow_websocket.send_json.side_effect = _wait_for(stalled)
+        await self._connect(2, slow_websocket)
+        fast = await self._connect(self.user_id, self.mock_websocket)
+
+        await broadcast_message([2, self.user_id], self.message)
+        await asyncio.wait_for(fast.drain(), timeout=1)
+
+        self.mock_websocket.send_json.assert_called_once_with(self.message)
+        stalled.set()
+
+    async def test_full_outbound_queue_evicts_slow_consumer(self):
+        stalled = asyncio.Event()
+        self.mock_websocket.send_json.side_effect = _wait_for(stalled)
+        connection = await self._connect(self.user_id, self.mock_websocket, queue_size=2)
+        connection.offer({"n": 0})
+        await asyncio.sleep(0)
+
+        # One message in flight, two queued, the fourth overflows
+        results = [connection.offer({"n": n}) for n in range(1, 4)]
+        await asyncio.sleep(0)
+
+        self.assertEqual(results, [True, True, False])
+        self.assertTrue(connection.closed)
+        self.assertNotIn(self.user_id, clients)
+        self.mock_websocket.close.assert_called_once_with(code=SLOW_CONSUMER_CLOSE_CODE)
+        stalled.set()
+
+    async def test_send_timeout_evicts_slow_consumer(self):
+        self.mock_websocket.send_json.side_effect = _wait_for(asyncio.Event())
+        connection = await self._connect(self.user_id, self.mock_websocket, send_timeout=0.01)
+        healthy = await self._connect(2, AsyncMock(spec=WebSocket), send_timeout=0.01)
+
+        connection.offer(self.message)
+        await asyncio.sleep(0.05)
+        evicted = evict_stalled_connections()
+        await asyncio.wait_for(connection.drain(), timeout=1)
+        await asyncio.sleep(0)
+
+        self.assertEqual(evicted, 1)
+        self.assertFalse(healthy.closed)
+
+        self.assertTrue(connection.closed)
+        self.assertNotIn(self.user_id, clients)
+        self.mock_websocket.close.assert_called_once_with(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    async def test_failed_send_drops_the_connection(self):
+        self.mock_websocket.send_json.side_effect = RuntimeError("connection closed")
+        connection = await self._connect(self.user_id, self.mock_websocket)
+
+        connection.offer(self.message)
+        await connection.drain()
+
+        self.assertTrue(connection.closed)
+        self.assertNotIn(self.user_id, clients)
+
+    @patch('services.websocket_service.pubsub')
+    async def test_broadcast_message_publishes_to_all_workers(self, mock_pubsub):
+        mock_pubsub.publish = AsyncMock()
+        await self._connect(self.user_id, self.mock_websocket)
+
+        await broadcast_message([self.user_id, 2], self.message)
+
+        mock_pubsub.publish.assert_awaited_once_with(
+            CHAT_CHANNEL, {"user_ids": [self.user_id, 2], "message": self.message}
+        )
+        # Delivery happens when the event comes back from the backend
+        self.mock_websocket.send_json.assert_not_called()
+
+    @patch('services.websocket_service.pubsub')
+    async def test_broadcast_message_too_large_falls_back_to_local_delivery(self, mock_pubsub):
+        mock_pubsub.publish = AsyncMock(side_effect=ValueError("too large"))
+        connection = await self._connect(self.user_id, self.mock_websocket)
+
+        await broadcast_message([self.user_id, 2], self.message)
+        await connection.drain()
+
+        self.mock_websocket.send_json.assert_called_once_with(self.message)
+
+    @patch('services.websocket_service.message_batcher')
     @patch('services.websocket_service.broadcast_message')
-    async def test_handle_chat_message(
-        self,
-        mock_broadcast,
-        mock_prepare_event,
-        mock_create_message
-    ):
-        mock_db = Mock()
+    async def test_handle_chat_message(self, mock_broadcast, mock_batcher):
         message_data = {
             "receiver_id": "2",
             "content": "Hello",
             "file_url": None,
             "message_type": "text"
         }
-        mock_message = Mock()
-        mock_event = {"type": "message", "content": "Hello"}
+        mock_event = {"type": "message", "id": 10, "content": "Hello"}
+        mock_batcher.submit = AsyncMock(return_value=mock_event)
         
-        mock_create_message.return_value = mock_message
-        mock_prepare_event.return_value = mock_event
+        await handle_chat_message(self.user_id, message_data)
         
-        await handle_chat_message(mock_db, self.user_id, message_data)
-        
-        # Verify message creation
-        mock_create_message.assert_called_once_with(
-            mock_db,
+        # Verify the message was handed to the batcher
+        mock_batcher.submit.assert_awaited_once_with(
             self.user_id,
             2,  # receiver_id as int
             "Hello",
@@ -104,8 +235,14 @@ class TestWebSocketService(IsolatedAsyncioTestCase):
             "text"
         )
         
-        # Verify event preparation
-        mock_prepare_event.assert_called_once_with(mock_message)
-        
         # Verify broadcast
-        mock_broadcast.assert_called_once_with([self.user_id, 2], mock_event)
\ No newline at end of file
+        mock_broadcast.assert_called_once_with([self.user_id, 2], mock_event)
+
+    @patch('services.websocket_service.message_batcher')
+    @patch('services.websocket_service.broadcast_message')
+    async def test_handle_chat_message_echoes_client_id(self, mock_broadcast, mock_batcher):
+        mock_batcher.submit = AsyncMock(return_value={"type": "message", "id": 10})
+
+        await handle_chat_message(self.user_id, {"receiver_id": 2, "content": "Hi", "client_id": "tmp-1"})
+
+        mock_broadcast.assert_called_once_with([self.user_id, 2], {"type": "message", "id": 10, "client_id": "tmp-1"})
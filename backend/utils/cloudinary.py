@@ -1,8 +1,9 @@
 import cloudinary
-import cloudinary.uploader
 from fastapi import HTTPException
 import os
 from dotenv import load_dotenv
+from core.storage import media_storage, guess_content_type
+from services.blob_store import blob_store
 load_dotenv()
 
 cloudinary_key = os.getenv("CLOUDINARY_API_KEY")
@@ -15,18 +16,22 @@ cloudinary.config(
   secure=True
 )
 
-def upload_to_cloudinary(file, folder_name):
+async def upload_to_cloudinary(file, folder_name):
+    # Media storage is Cloudinary unless STORAGE_BACKEND=local; either way the file is streamed in chunks
     try:
-        result = cloudinary.uploader.upload(
-            file,
-            folder=folder_name,
-            resource_type="auto"  # auto = detect image, video, document automatically
-        )
+        storage = media_storage()
+        filename = os.path.basename(str(getattr(file, "filename", None) or getattr(file, "name", None) or "file"))
+        content_type = getattr(file, "content_type", None) or guess_content_type(filename)
+
+        async def upload():
+            return await storage.save(file, folder_name, filename, content_type)
+
+        # Skipped entirely when the same bytes were uploaded before
+        stored = await blob_store.store(file, storage.name, upload, folder=folder_name)
         return {
-            "secure_url": result["secure_url"],   # This is the URL you use in frontend or save in DB
-            "public_id": result["public_id"],     # Important if you later want to delete/update the file
-            "resource_type": result["resource_type"]  # Whether it was image, video, raw etc
+            "secure_url": stored["url"],   # This is the URL you use in frontend or save in DB
+            "public_id": stored["public_id"],     # Important if you later want to delete/update the file
+            "resource_type": stored["resource_type"]  # Whether it was image, video, raw etc
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
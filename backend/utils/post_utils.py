@@ -1,4 +1,7 @@
+from collections import Counter
 from typing import Optional, Dict, Any
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, UploadFile
 from models.user import User
@@ -7,8 +10,10 @@ from utils.cloudinary import upload_to_cloudinary
 from services.PostHandler import get_user_like_status
 from services.PostTypeHandler import get_post_additional_data
 from services.PostHandler import extract_hashtags
-from models.university import University
-from models.hashtag import Hashtag
+from services.FeedHandler import build_post_response
+from services.university_cache import get_university_names, normalize_university_name
+from services.suggestion_index import suggestion_index
+from models.hashtag import Hashtag, post_hashtags
 
 def validate_post_ownership(post_id: int, user_id: int, db: Session) -> Post:
     """Validate post ownership and return the post if valid."""
@@ -20,24 +25,7 @@ def validate_post_ownership(post_id: int, user_id: int, db: Session) -> Post:
 def prepare_post_response(post: Post, current_user: User, db: Session) -> Dict[str, Any]:
     """Prepare standardized post response with user and interaction data."""
     user_liked = get_user_like_status(post.id, current_user.id, db)
-    comment_count = db.query(Comment).filter(Comment.post_id == post.id).count()
-    
-    response = {
-        "id": post.id,
-        "user_id": post.user_id,  # Changed from post.user.id to post.user_id
-        "post_type": post.post_type,
-        "content": post.content,
-        "created_at": post.created_at,
-        "user": {
-            "id": post.user.id,
-            "username": post.user.username,
-            "profile_picture": post.user.profile_picture,
-            "university_name": post.user.university_name
-        },
-        "total_likes": post.like_count,
-        "user_liked": user_liked,
-        "comment_count": comment_count
-    }
+    response = build_post_response(post, user_liked)
     
     # Add type-specific data
     response.update(get_post_additional_data(post, db))
@@ -48,8 +36,8 @@ async def handle_media_upload(
     folder_name: str
 ) -> Dict[str, str]:
     """Handle media file upload to cloudinary and return upload details."""
-    upload_result = upload_to_cloudinary(
-        media_file.file,
+    upload_result = await upload_to_cloudinary(
+        media_file,
         folder_name=folder_name
     )
     return {
@@ -69,21 +57,38 @@ def create_base_post(
         content=content,
         post_type=post_type
     )
-    hashtags = extract_hashtags(post.content)
-    universities = db.query(University.name).all()
-    university_names = {name.lower() for (name,) in universities}
-
-    for tag in hashtags:
-        if tag.lower() in university_names:
-            existing_hashtag = db.query(Hashtag).filter_by(name=tag.lower()).first()
-            if existing_hashtag:
-                existing_hashtag.usage_count += 1
-            else:
-                existing_hashtag = Hashtag(name=tag.lower(), usage_count=1)
-                db.add(existing_hashtag)
-
-            post.hashtags.append(existing_hashtag)
     db.add(post)
     db.commit()
     db.refresh(post)
-    return post
\ No newline at end of file
+    return post
+
+def _hashtag_insert(db: Session):
+    # Postgres in production, SQLite in tests; both support ON CONFLICT upserts
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite_insert(Hashtag)
+    return pg_insert(Hashtag)
+
+def tag_post_hashtags(db: Session, post: Post) -> None:
+    """Link the post to hashtags that name a university and bump their usage counts. The caller commits."""
+    university_names = get_university_names(db)
+    counts = Counter(
+        tag.lower() for tag in extract_hashtags(post.content or "")
+        if normalize_university_name(tag) in university_names
+    )
+    if not counts:
+        return
+
+    # One upsert for every tag, then one insert for the links
+    stmt = _hashtag_insert(db).values([{"name": name, "usage_count": n} for name, n in counts.items()])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Hashtag.name],
+        set_={"usage_count": Hashtag.usage_count + stmt.excluded.usage_count}
+    ).returning(Hashtag.id, Hashtag.name, Hashtag.usage_count)
+    hashtags = db.execute(stmt).all()
+
+    db.execute(
+        post_hashtags.insert(),
+        [{"post_id": post.id, "hashtag_id": hashtag.id} for hashtag in hashtags]
+    )
+    for hashtag in hashtags:
+        suggestion_index.set_hashtag(hashtag.name, hashtag.usage_count)
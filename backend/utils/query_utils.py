@@ -0,0 +1,3 @@
+def escape_like(keyword: str) -> str:
+    """Escape LIKE wildcards in user input; match the result with `ilike(pattern, escape="\\\\")`."""
+    return keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
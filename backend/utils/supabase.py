@@ -1,17 +1,10 @@
-from supabase import create_client
-from io import BytesIO
 from fastapi import HTTPException
 import os
 from dotenv import load_dotenv
+from core.storage import document_storage
+from services.blob_store import blob_store
 load_dotenv()
 
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-
-# Supabase setup
-
-supabase = create_client(supabase_url, supabase_key)
-
 # Mapping of section types to folders
 SECTION_FOLDER_MAP = {
     "upload_documents": "upload_documents/",
@@ -19,8 +12,6 @@ SECTION_FOLDER_MAP = {
     "chat": "chat/"
 }
 
-BUCKET_NAME = "noobsquad"  # your supabase bucket name
-
 # Upload Function
 async def upload_file_to_supabase(file_obj, filename: str, section: str):
     try:
@@ -28,9 +19,6 @@ async def upload_file_to_supabase(file_obj, filename: str, section: str):
             raise HTTPException(status_code=400, detail="Invalid document section.")
 
         folder = SECTION_FOLDER_MAP[section]
-        destination_path = f"{folder}{filename}"
-
-        file_content = await file_obj.read()
 
         # Auto-detect MIME type based on extension
         ext = filename.split(".")[-1].lower()
@@ -49,23 +37,15 @@ async def upload_file_to_supabase(file_obj, filename: str, section: str):
         }
         content_type = ext_to_content_type.get(ext, "application/octet-stream")
 
-        # Upload the file with file options instead of headers
-        upload_response = supabase.storage.from_(BUCKET_NAME).upload(
-            destination_path,
-            file_content,
-            file_options={
-                "contentType": content_type,
-                "cacheControl": "max-age=3600"
-            }
-        )
+        # Document storage is Supabase unless STORAGE_BACKEND=local; either way the file is streamed in chunks
+        storage = document_storage()
+
+        async def upload():
+            return await storage.save(file_obj, folder, filename, content_type)
+
+        # Skipped entirely when the same bytes were uploaded before
+        file_url = (await blob_store.store(file_obj, storage.name, upload, folder=folder))["url"]
 
-        # Get the public URL
-        file_url = supabase.storage.from_(BUCKET_NAME).get_public_url(destination_path)
-        
-        # Reset file pointer for potential reuse
-        if hasattr(file_obj, "seek"):
-            file_obj.seek(0)
-            
         return file_url
 
     except Exception as e:
@@ -7,7 +7,7 @@ import { useLocation } from "react-router-dom";
 const Feed = () => {
   const [posts, setPosts] = useState([]);
   const [loading, setLoading] = useState(false);
-  const [offset, setOffset] = useState(0);
+  const [cursor, setCursor] = useState(null);
   const [hasMore, setHasMore] = useState(true);
   const observer = useRef(null); // ✅ Observer reference
   const [highlightId, setHighlightId] = useState(null);
@@ -23,7 +23,10 @@ const Feed = () => {
     try {
       const token = localStorage.getItem("token");
       console.log("🔍 Fetching posts with token:", token);
-      const res = await api.get(`/posts/?limit=10&offset=${offset}`, {
+      const params = { limit: 10 };
+      if (cursor) params.cursor = cursor;
+      const res = await api.get("/posts/", {
+        params,
         headers: { Authorization: `Bearer ${token}` },
       });
 
@@ -38,8 +41,8 @@ const Feed = () => {
           return uniquePosts;
         });
 
-        // ✅ Adjust offset based on returned posts
-        setOffset((prev) => prev + res.data.posts.length);
+        // ✅ Continue from the oldest post on this page
+        setCursor(res.data.next_cursor);
       }
     } catch (err) {
       console.error("❌ Error fetching posts:", err.response?.data || err.message);
@@ -51,7 +54,7 @@ const Feed = () => {
   // ✅ Fetch posts on mount
   useEffect(() => {
     fetchPosts();
-  }, [offset, hasMore]); // ✅ Depend on offset and hasMore
+  }, [cursor, hasMore]); // ✅ Depend on cursor and hasMore
 
   useEffect(() => {
     const queryParams = new URLSearchParams(location.search);
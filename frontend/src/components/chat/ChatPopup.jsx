@@ -2,6 +2,8 @@ import { useEffect, useRef, useState, useCallback } from "react";
 import PropTypes from "prop-types";
 import axios from "axios";
 
+const HISTORY_PAGE_SIZE = 50;
+
 const ChatPopup = ({ user, socket, onClose, refreshConversations }) => {
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState("");
@@ -13,8 +15,15 @@ const ChatPopup = ({ user, socket, onClose, refreshConversations }) => {
   const token = localStorage.getItem("token");
   const [shouldAutoScroll, setShouldAutoScroll] = useState(true);
   const lastScrollTop = useRef(0);
+  const messagesRef = useRef([]);
+  const hasOlder = useRef(false);
+  const loadingOlder = useRef(false);
+
+  useEffect(() => {
+    messagesRef.current = messages;
+  }, [messages]);
 
-  // Fetch chat history once when opening chat
+  // Fetch the latest page of chat history once when opening chat
   useEffect(() => {
     if (!user?.id) return;
 
@@ -22,8 +31,10 @@ const ChatPopup = ({ user, socket, onClose, refreshConversations }) => {
       try {
         const res = await axios.get(`${import.meta.env.VITE_API_URL}/chat/chat/history/${user.id}`, {
           headers: { Authorization: `Bearer ${token}` },
+          params: { limit: HISTORY_PAGE_SIZE },
         });
         setMessages(res.data);
+        hasOlder.current = res.data.length === HISTORY_PAGE_SIZE;
         if (typeof refreshConversations === "function") {
           refreshConversations();
         }
@@ -35,6 +46,31 @@ const ChatPopup = ({ user, socket, onClose, refreshConversations }) => {
     fetchMessages();
   }, [user?.id, token, refreshConversations]);
 
+  // Load the page before the oldest message shown, keeping the view where it was
+  const loadOlderMessages = useCallback(async () => {
+    const oldest = messagesRef.current.find(msg => typeof msg.id === "number");
+    if (!oldest || !hasOlder.current || loadingOlder.current) return;
+
+    loadingOlder.current = true;
+    const container = messagesContainerRef.current;
+    const previousHeight = container ? container.scrollHeight : 0;
+    try {
+      const res = await axios.get(`${import.meta.env.VITE_API_URL}/chat/chat/history/${user.id}`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { before: oldest.id, limit: HISTORY_PAGE_SIZE },
+      });
+      hasOlder.current = res.data.length === HISTORY_PAGE_SIZE;
+      setMessages(prev => [...res.data, ...prev]);
+      requestAnimationFrame(() => {
+        if (container) container.scrollTop = container.scrollHeight - previousHeight;
+      });
+    } catch (err) {
+      console.error("Failed to load older messages", err);
+    } finally {
+      loadingOlder.current = false;
+    }
+  }, [user?.id, token]);
+
   // Handle scroll events
   const handleScroll = useCallback(() => {
     const container = messagesContainerRef.current;
@@ -54,7 +90,11 @@ const ChatPopup = ({ user, socket, onClose, refreshConversations }) => {
     }
 
     lastScrollTop.current = container.scrollTop;
-  }, []);
+
+    if (container.scrollTop === 0) {
+      loadOlderMessages();
+    }
+  }, [loadOlderMessages]);
 
   // Auto-scroll handling
   useEffect(() => {